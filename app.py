@@ -1,44 +1,80 @@
 
-from flask import Flask, send_from_directory, send_file, request, jsonify, render_template_string
+from flask import Flask, Response, stream_with_context, send_from_directory, send_file, request, jsonify, render_template_string
 from flask_cors import CORS
 from datetime import datetime
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.orm import load_only
+import base64
+import json
+import logging
 import os
 import sys
 import re
 
+# Logging strutturato e non bloccante, configurato prima degli altri moduli
+from python.logging_setup import setup_logging
+setup_logging()
+logger = logging.getLogger('app')
+
 # Security middleware
-from security_middleware import CloudflareSecurityMiddleware, SecurityHeadersMiddleware
+from security_middleware import CloudflareSecurityMiddleware, SecurityHeadersMiddleware, SECURITY_HEADERS
 
 # Aggiungi la directory app alla path per poter importare il modulo models
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
 from python.models import db, ScheduledPost
+from python.app_factory import configure_database
 from python.publisher import publisher
 from python.meta_generator import meta_generator
+from python.steem_client import steem_client
+from python.index_template import IndexTemplate
+from python.static_assets import StaticAssetEngine, StaticFastPathMiddleware
+from python.crawler_detect import CrawlerMatcher
+from python import metrics
 
 app = Flask(__name__)
 
 # Initialize security middleware
 cf_security = CloudflareSecurityMiddleware(app)
 security_headers = SecurityHeadersMiddleware(app)
+# Latenza per route esposta su /metrics
+metrics.init_app(app)
 
 # CORS configuration - restrict in production
 cors_origins = os.environ.get('CORS_ORIGINS', '*').split(',')
 CORS(app, origins=cors_origins)  # Restrict CORS in production
 
-# Configurazione database
-database_url = os.environ.get('DATABASE_URL', 'sqlite:///steemee.db')
-# Handle PostgreSQL URL format for some hosting services
-if database_url.startswith('postgres://'):
-    database_url = database_url.replace('postgres://', 'postgresql://')
-
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-change-in-production')
-db.init_app(app)
-
-# Inizializzazione del database
-with app.app_context():
-    db.create_all()
+# Configurazione database e migrazioni (condivise con il processo publisher)
+configure_database(app)
+
+# File statici della SPA serviti dalla memoria, con varianti gzip/brotli
+MODULE_DIRECTORIES = ('components', 'services', 'utils', 'views', 'models', 'controllers', 'config')
+asset_engine = StaticAssetEngine.from_env(
+    app.root_path,
+    MODULE_DIRECTORIES + ('assets', 'start'),
+    root_files={'manifest.json', 'sw.js', 'favicon.ico'},
+    cache_overrides={'sw.js': 'no-cache', 'manifest.json': 'no-cache'}
+)
+asset_engine.scan()
+
+# Fast path WSGI: i file statici non passano dal routing e dai middleware di Flask
+if os.environ.get('STATIC_FASTPATH', 'true').lower() == 'true':
+    app.wsgi_app = StaticFastPathMiddleware(
+        app.wsgi_app,
+        asset_engine,
+        extra_headers=SECURITY_HEADERS,
+        allow=cf_security.allows_environ,
+        cors_origins=cors_origins
+    )
+
+# index.html precompilato per i meta tag delle anteprime
+index_template = IndexTemplate(os.path.join(app.root_path, 'index.html'))
+
+# Meta tag dinamici solo per i crawler di anteprima (CRAWLER_ONLY_META=false li genera per tutti)
+crawler_only_meta = os.environ.get('CRAWLER_ONLY_META', 'true').lower() == 'true'
+crawler_matcher = CrawlerMatcher.from_env()
+
+# Snapshot delle anteprime nel database: restart e nuovi worker partono già caldi
+meta_generator.init_app(app)
 
 # Serve static files from the start directory (e.g., /start/style.css)
 @app.route('/start/<path:filename>')
@@ -52,7 +88,9 @@ def assets(filename):
 # Serve JavaScript modules with correct MIME type
 @app.route('/<path:filename>.js')
 def javascript_files(filename):
-    import os
+    response = asset_engine.make_response(f"{filename}.js", request)
+    if response is not None:
+        return response
     js_path = os.path.join(app.root_path, f"{filename}.js")
     if not os.path.isfile(js_path):
         return "File not found", 404
@@ -74,6 +112,9 @@ def favicon():
 # Serve files from specific directories with correct MIME types
 @app.route('/components/<path:filename>')
 def components(filename):
+    response = asset_engine.make_response(f"components/{filename}", request)
+    if response is not None:
+        return response
     if filename.endswith('.js'):
         return send_file(f'components/{filename}', mimetype='application/javascript')
     return send_from_directory('components', filename)
@@ -85,30 +126,45 @@ def serve_start_page():
 
 @app.route('/services/<path:filename>')
 def services(filename):
+    response = asset_engine.make_response(f"services/{filename}", request)
+    if response is not None:
+        return response
     if filename.endswith('.js'):
         return send_file(f'services/{filename}', mimetype='application/javascript')
     return send_from_directory('services', filename)
 
 @app.route('/utils/<path:filename>')
 def utils(filename):
+    response = asset_engine.make_response(f"utils/{filename}", request)
+    if response is not None:
+        return response
     if filename.endswith('.js'):
         return send_file(f'utils/{filename}', mimetype='application/javascript')
     return send_from_directory('utils', filename)
 
 @app.route('/views/<path:filename>')
 def views(filename):
+    response = asset_engine.make_response(f"views/{filename}", request)
+    if response is not None:
+        return response
     if filename.endswith('.js'):
         return send_file(f'views/{filename}', mimetype='application/javascript')
     return send_from_directory('views', filename)
 
 @app.route('/models/<path:filename>')
 def models(filename):
+    response = asset_engine.make_response(f"models/{filename}", request)
+    if response is not None:
+        return response
     if filename.endswith('.js'):
         return send_file(f'models/{filename}', mimetype='application/javascript')
     return send_from_directory('models', filename)
 
 @app.route('/controllers/<path:filename>')
 def controllers(filename):
+    response = asset_engine.make_response(f"controllers/{filename}", request)
+    if response is not None:
+        return response
     if filename.endswith('.js'):
         return send_file(f'controllers/{filename}', mimetype='application/javascript')
     return send_from_directory('controllers', filename)
@@ -155,41 +211,31 @@ def get_content_type_from_path(path):
 def render_index_with_meta(meta_tags_html):
     """Renderizza index.html con meta tag dinamici"""
     try:
-        with open('index.html', 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Sostituisci i meta tag esistenti con quelli dinamici
-        # Trova la posizione dei meta tag statici e sostituiscili
-        meta_start = content.find('<!-- Social Media Sharing Preview Metadata -->')
-        meta_end = content.find('<!-- Server-side rendered meta elements will be generated here -->')
-        
-        if meta_start != -1 and meta_end != -1:
-            # Mantieni il commento iniziale e aggiungi i nuovi meta tag
-            new_content = (
-                content[:meta_start] +
-                '<!-- Social Media Sharing Preview Metadata -->\n    ' +
-                meta_tags_html + '\n    ' +
-                content[meta_end:]
-            )
-            return new_content
-        else:
-            # Fallback: aggiungi i meta tag prima della chiusura del head
-            head_end = content.find('</head>')
-            if head_end != -1:
-                new_content = (
-                    content[:head_end] +
-                    '    ' + meta_tags_html + '\n' +
-                    content[head_end:]
-                )
-                return new_content
-        
-        return content
+        body, etag = index_template.render(meta_tags_html)
     except Exception as e:
-        print(f"Error rendering index with meta: {e}")
+        logger.error(f"Error rendering index with meta: {e}")
         return send_file('index.html')
+    
+    response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    # I crawler che ripetono la richiesta ricevono un 304 senza body
+    return response.make_conditional(request)
 
 
 
+def render_static_index():
+    """index.html così com'è, dalla memoria e con ETag"""
+    try:
+        body, etag = index_template.static()
+    except OSError as e:
+        logger.error(f"Error reading index.html: {e}")
+        return send_file('index.html')
+    
+    response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 # Serve la landing page solo su / e /start
 @app.route('/')
 def serve_landing():
@@ -201,15 +247,21 @@ def serve_landing():
 def serve_spa(path=None):
     # Se non c'è un path, serve la SPA normale
     if not path:
-        return send_file('index.html')
+        return render_static_index()
     
     # Determina il tipo di contenuto dal path
     content_type, params = get_content_type_from_path(path)
     
-    # Se è un post, genera meta tag dinamici per l'anteprima
+    # I browser ricevono l'index statico: la SPA carica il post da sola
+    if content_type == 'post' and crawler_only_meta and not crawler_matcher.classify(request.headers.get('User-Agent')):
+        response = render_static_index()
+        response.vary.add('User-Agent')
+        return response
+    
+    # Se è un post (richiesto da un crawler), genera meta tag dinamici per l'anteprima
     if content_type == 'post':
         try:
-            print(f"[DEBUG] Generating meta tags for post: @{params['author']}/{params['permlink']}")
+            logger.debug("Generating meta tags for post", extra=params)
             
             # Genera i meta tag per il post
             base_url = get_base_url(request)
@@ -228,70 +280,221 @@ def serve_spa(path=None):
                 # Genera l'HTML dei meta tag
                 meta_tags_html = meta_generator.generate_meta_tags_html(meta_data)
                 
-                print(f"[DEBUG] Generated meta tags for @{params['author']}/{params['permlink']}")
-                return render_index_with_meta(meta_tags_html)
+                logger.debug("Generated meta tags for post", extra=params)
+                response = render_index_with_meta(meta_tags_html)
+                response.vary.add('User-Agent')
+                return response
             else:
-                print(f"[DEBUG] No meta tags generated for @{params['author']}/{params['permlink']}, falling back to default")
+                logger.debug("No meta tags generated for post, falling back to default", extra=params)
                 
-        except Exception as e:
-            print(f"[DEBUG] Error generating meta tags for post: {e}")
+        except Exception:
+            logger.exception("Error generating meta tags for post", extra=params)
     
     # Per tutti gli altri casi (profili, tag, community, errori), serve la SPA normale
-    return send_file('index.html')
+    return render_static_index()
 
 # API per i post schedulati
+SCHEDULED_POSTS_DEFAULT_LIMIT = 100
+SCHEDULED_POSTS_MAX_LIMIT = 500
+
+def encode_cursor(post):
+    """Cursore opaco per la paginazione keyset su (scheduled_datetime, id)"""
+    raw = json.dumps([post.scheduled_datetime.isoformat(), post.id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    scheduled_datetime, post_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return datetime.fromisoformat(scheduled_datetime), int(post_id)
+
 @app.route('/api/scheduled_posts', methods=['GET'])
 def get_scheduled_posts():
+    """
+    Post schedulati di un utente, ordinati per (scheduled_datetime, id).
+    Parametri: username, status, limit, cursor, fields (es. fields=id,title,scheduled_datetime).
+    Senza limit né cursor ritorna la lista completa, come prima della paginazione;
+    altrimenti il cursore della pagina successiva è nell'header X-Next-Cursor.
+    """
     username = request.args.get('username')
     if not username:
         return jsonify({"error": "Username required"}), 400
-    posts = ScheduledPost.query.filter_by(username=username).all()
-    return jsonify([p.to_dict() for p in posts])
+    
+    limit = None
+    if 'limit' in request.args or 'cursor' in request.args:
+        try:
+            limit = int(request.args.get('limit', SCHEDULED_POSTS_DEFAULT_LIMIT))
+        except ValueError:
+            return jsonify({"error": "Invalid limit"}), 400
+        limit = max(1, min(limit, SCHEDULED_POSTS_MAX_LIMIT))
+    
+    fields = None
+    if request.args.get('fields'):
+        fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+        unknown = set(fields) - set(ScheduledPost.SERIALIZABLE_FIELDS)
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+    
+    query = ScheduledPost.query.filter_by(username=username)
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+    
+    if request.args.get('cursor'):
+        try:
+            after_datetime, after_id = decode_cursor(request.args['cursor'])
+        except (ValueError, TypeError):
+            return jsonify({"error": "Invalid cursor"}), 400
+        query = query.filter(or_(
+            ScheduledPost.scheduled_datetime > after_datetime,
+            and_(ScheduledPost.scheduled_datetime == after_datetime, ScheduledPost.id > after_id)
+        ))
+    
+    if fields:
+        # Le colonne non richieste (es. body) restano fuori dalla SELECT
+        columns = set(fields) | {'id', 'scheduled_datetime'}
+        query = query.options(load_only(*[getattr(ScheduledPost, name) for name in columns]))
+    
+    query = query.order_by(ScheduledPost.scheduled_datetime, ScheduledPost.id)
+    if limit is None:
+        return jsonify([p.to_dict(fields) for p in query.all()])
+    posts = query.limit(limit + 1).all()
+    
+    response = jsonify([p.to_dict(fields) for p in posts[:limit]])
+    if len(posts) > limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(posts[limit - 1])
+    return response
+
+POST_REQUIRED_FIELDS = ('username', 'title', 'body', 'scheduled_datetime')
+POST_PATCHABLE_FIELDS = ('title', 'body', 'tags', 'community', 'permlink', 'scheduled_datetime', 'status')
+# Optional text fields: a string or null
+POST_OPTIONAL_TEXT_FIELDS = ('community', 'permlink')
+BULK_MAX_ITEMS = 500
+
+def parse_scheduled_datetime(value):
+    """Parse an ISO datetime; a trailing Z is treated as UTC"""
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid datetime format: {value}")
+    try:
+        # Try parsing ISO format with Z suffix
+        if value.endswith('Z'):
+            return datetime.fromisoformat(value[:-1])
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid datetime format: {value}")
+
+def validate_post_fields(data):
+    """Type checks shared by create and patch payloads; returns an error message or None"""
+    for field in ('username', 'title', 'body', 'status'):
+        if field in data and not isinstance(data[field], str):
+            return f"Invalid {field}: must be a string"
+    for field in POST_OPTIONAL_TEXT_FIELDS:
+        if data.get(field) is not None and not isinstance(data[field], str):
+            return f"Invalid {field}: must be a string or null"
+    if 'tags' in data:
+        tags = data['tags']
+        # Stored comma-separated, so a tag cannot contain a comma
+        if not isinstance(tags, list) or not all(isinstance(t, str) and ',' not in t for t in tags):
+            return "Invalid tags: must be a list of strings without commas"
+    return None
+
+def build_post_values(data):
+    """Validate a new post payload; returns (column values, error message)"""
+    if not isinstance(data, dict) or not all(data.get(f) for f in POST_REQUIRED_FIELDS):
+        return None, "Missing required fields"
+    error = validate_post_fields(data)
+    if error:
+        return None, error
+    try:
+        scheduled_datetime = parse_scheduled_datetime(data['scheduled_datetime'])
+    except ValueError as e:
+        return None, str(e)
+    return {
+        'username': data['username'],
+        'title': data['title'],
+        'body': data['body'],
+        'tags': ','.join(data.get('tags', [])),
+        'community': data.get('community'),
+        'permlink': data.get('permlink'),
+        'scheduled_datetime': scheduled_datetime
+    }, None
+
+def build_post_patch(data):
+    """Validate a partial update payload; returns (column values, error message)"""
+    if not isinstance(data, dict):
+        return None, "Invalid patch"
+    error = validate_post_fields(data)
+    if error:
+        return None, error
+    values = {}
+    for field in POST_PATCHABLE_FIELDS:
+        if field not in data:
+            continue
+        if field == 'tags':
+            values['tags'] = ','.join(data['tags'])
+        elif field == 'scheduled_datetime':
+            try:
+                values['scheduled_datetime'] = parse_scheduled_datetime(data['scheduled_datetime'])
+                # A new time chosen by the user replaces any pending retry slot
+                values['next_attempt_at'] = None
+            except ValueError as e:
+                return None, str(e)
+        else:
+            values[field] = data[field]
+    return values, None
 
 @app.route('/api/scheduled_posts', methods=['POST'])
 def create_scheduled_post():
     try:
         data = request.json
-        print(f"[DEBUG] Received data: {data}")
-        
-        if not data or not data.get('username') or not data.get('title') or not data.get('body') or not data.get('scheduled_datetime'):
-            return jsonify({"error": "Missing required fields"}), 400
+        logger.debug("Received scheduled post", extra={'data': data})
         
-        # Parse the scheduled datetime - handle different formats
-        scheduled_datetime_str = data['scheduled_datetime']
-        print(f"[DEBUG] Parsing datetime: {scheduled_datetime_str}")
-        
-        try:
-            # Try parsing ISO format with Z suffix
-            if scheduled_datetime_str.endswith('Z'):
-                # Remove Z and parse as UTC
-                scheduled_datetime_str = scheduled_datetime_str[:-1]
-                scheduled_datetime = datetime.fromisoformat(scheduled_datetime_str)
-            else:
-                scheduled_datetime = datetime.fromisoformat(scheduled_datetime_str)
-        except ValueError as e:
-            print(f"[DEBUG] DateTime parsing error: {e}")
-            return jsonify({"error": f"Invalid datetime format: {scheduled_datetime_str}"}), 400
+        values, error = build_post_values(data)
+        if error:
+            logger.info("Invalid scheduled post", extra={'error': error})
+            return jsonify({"error": error}), 400
             
-        post = ScheduledPost(
-            username=data['username'],
-            title=data['title'],
-            body=data['body'],
-            tags=','.join(data.get('tags', [])),
-            community=data.get('community'),
-            permlink=data.get('permlink'),
-            scheduled_datetime=scheduled_datetime
-        )
+        post = ScheduledPost(**values)
         db.session.add(post)
         db.session.commit()
+        publisher.notify(post)
         
-        print(f"[DEBUG] Successfully created scheduled post: {post.id}")
+        logger.info("Created scheduled post", extra={'post_id': post.id, 'username': post.username})
         return jsonify(post.to_dict()), 201
     except Exception as e:
-        print(f"[DEBUG] Error creating scheduled post: {e}")
+        logger.exception("Error creating scheduled post")
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+EXPORT_BATCH_SIZE = 500
+
+@app.route('/api/scheduled_posts/export', methods=['GET'])
+def export_scheduled_posts():
+    """
+    Stream a user's scheduled posts as newline-delimited JSON.
+    Parameters: username (required), status, from, to (bounds on scheduled_datetime, ISO format).
+    Rows are fetched in yield_per batches (a server-side cursor on PostgreSQL),
+    so memory use does not grow with the table.
+    """
+    username = request.args.get('username')
+    if not username:
+        return jsonify({"error": "Username required"}), 400
+    
+    stmt = select(ScheduledPost).where(ScheduledPost.username == username).order_by(ScheduledPost.id)
+    if request.args.get('status'):
+        stmt = stmt.where(ScheduledPost.status == request.args['status'])
+    try:
+        if request.args.get('from'):
+            stmt = stmt.where(ScheduledPost.scheduled_datetime >= parse_scheduled_datetime(request.args['from']))
+        if request.args.get('to'):
+            stmt = stmt.where(ScheduledPost.scheduled_datetime < parse_scheduled_datetime(request.args['to']))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    def generate():
+        result = db.session.scalars(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for post in result:
+            yield json.dumps(post.to_dict()) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/scheduled_posts/<int:post_id>', methods=['GET'])
 def get_scheduled_post(post_id):
     post = ScheduledPost.query.get_or_404(post_id)
@@ -304,22 +507,14 @@ def update_scheduled_post(post_id):
         data = request.json
         
         # Aggiorna i campi se presenti nei dati
-        if 'title' in data:
-            post.title = data['title']
-        if 'body' in data:
-            post.body = data['body']
-        if 'tags' in data:
-            post.tags = ','.join(data['tags'])
-        if 'community' in data:
-            post.community = data['community']
-        if 'permlink' in data:
-            post.permlink = data['permlink']
-        if 'scheduled_datetime' in data:
-            post.scheduled_datetime = datetime.fromisoformat(data['scheduled_datetime'])
-        if 'status' in data:
-            post.status = data['status']
+        values, error = build_post_patch(data)
+        if error:
+            return jsonify({"error": error}), 400
+        for field, value in values.items():
+            setattr(post, field, value)
             
         db.session.commit()
+        publisher.notify(post)
         return jsonify(post.to_dict())
     except Exception as e:
         db.session.rollback()
@@ -331,14 +526,151 @@ def delete_scheduled_post(post_id):
         post = ScheduledPost.query.get_or_404(post_id)
         db.session.delete(post)
         db.session.commit()
+        publisher.forget(post_id)
         return jsonify({"success": True, "message": f"Post {post_id} deleted"})
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+def get_bulk_items(key):
+    """Items of a bulk request: either a JSON array or an object with the given key"""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list) or not data:
+        return None, (jsonify({"error": f"Expected a non-empty array of {key}"}), 400)
+    if len(data) > BULK_MAX_ITEMS:
+        return None, (jsonify({"error": f"At most {BULK_MAX_ITEMS} items per request"}), 400)
+    return data, None
+
+@app.route('/api/scheduled_posts/bulk', methods=['POST'])
+def bulk_create_scheduled_posts():
+    """Create many posts in a single transaction; nothing is written if any item is invalid"""
+    items, error_response = get_bulk_items('posts')
+    if error_response:
+        return error_response
+    
+    rows = []
+    errors = []
+    for index, item in enumerate(items):
+        values, error = build_post_values(item)
+        if error:
+            errors.append({"index": index, "error": error})
+        else:
+            rows.append(values)
+    if errors:
+        return jsonify({"error": "Validation failed", "items": errors}), 400
+    
+    try:
+        ids = db.session.scalars(
+            insert(ScheduledPost).returning(ScheduledPost.id, sort_by_parameter_order=True),
+            rows
+        ).all()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+    
+    publisher.schedule_many([(post_id, values['scheduled_datetime']) for post_id, values in zip(ids, rows)])
+    return jsonify({
+        "success": True,
+        "items": [{"index": index, "id": post_id, "status": "created"} for index, post_id in enumerate(ids)]
+    }), 201
+
+@app.route('/api/scheduled_posts/bulk', methods=['PATCH'])
+def bulk_update_scheduled_posts():
+    """Apply many partial updates ({"id": ..., fields}) in a single transaction"""
+    items, error_response = get_bulk_items('posts')
+    if error_response:
+        return error_response
+    
+    patches = []
+    errors = []
+    for index, item in enumerate(items):
+        post_id = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(post_id, int):
+            errors.append({"index": index, "error": "Missing id"})
+            continue
+        values, error = build_post_patch(item)
+        if error:
+            errors.append({"index": index, "id": post_id, "error": error})
+        else:
+            patches.append((index, dict(values, id=post_id)))
+    
+    ids = [patch['id'] for _, patch in patches]
+    existing = set(db.session.scalars(select(ScheduledPost.id).where(ScheduledPost.id.in_(ids))))
+    for index, patch in patches:
+        if patch['id'] not in existing:
+            errors.append({"index": index, "id": patch['id'], "error": "Not found"})
+    if errors:
+        return jsonify({"error": "Validation failed", "items": errors}), 400
+    
+    try:
+        # Bulk UPDATE by primary key
+        rows = [patch for _, patch in patches if len(patch) > 1]
+        if rows:
+            db.session.execute(update(ScheduledPost), rows)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+    
+    # Posts no longer scheduled are dropped from the publisher (due time None)
+    publisher.schedule_many([
+        (post_id, due if status == 'scheduled' else None)
+        for post_id, status, due in db.session.execute(
+            select(ScheduledPost.id, ScheduledPost.status, ScheduledPost.due_time)
+            .where(ScheduledPost.id.in_(ids))
+        )
+    ])
+    return jsonify({
+        "success": True,
+        "items": [{"index": index, "id": patch['id'], "status": "updated"} for index, patch in patches]
+    })
+
+@app.route('/api/scheduled_posts/bulk', methods=['DELETE'])
+def bulk_delete_scheduled_posts():
+    """Delete many posts by id with a single DELETE statement"""
+    ids, error_response = get_bulk_items('ids')
+    if error_response:
+        return error_response
+    if not all(isinstance(post_id, int) for post_id in ids):
+        return jsonify({"error": "ids must be integers"}), 400
+    
+    try:
+        deleted = set(db.session.scalars(
+            delete(ScheduledPost).where(ScheduledPost.id.in_(ids)).returning(ScheduledPost.id)
+        ).all())
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+    
+    publisher.schedule_many([(post_id, None) for post_id in deleted])
+    return jsonify({
+        "success": True,
+        "items": [
+            {"index": index, "id": post_id, "status": "deleted" if post_id in deleted else "not_found"}
+            for index, post_id in enumerate(ids)
+        ]
+    })
+
 # Initialize publisher with app context
 publisher.init_app(app)
 
+# Liveness probe: no database or upstream access
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok"})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metriche in formato Prometheus, aggregate su tutti i worker gunicorn"""
+    body = metrics.exporter.render()
+    if body is None:
+        return jsonify({"error": "prometheus_client is not installed"}), 503
+    return Response(body, content_type=metrics.exporter.content_type)
+
 # API endpoints for publisher management
 @app.route('/api/publisher/status', methods=['GET'])
 def get_publisher_status():
@@ -354,22 +686,37 @@ def retry_failed_posts():
         "message": f"Marked {retry_count} posts for retry"
     })
 
+@app.route('/api/meta/status', methods=['GET'])
+def get_meta_status():
+    """Get preview meta cache and Steem connection pool counters"""
+    return jsonify({
+        "cache": meta_generator.get_stats(),
+        "steem_client": steem_client.get_stats(),
+        "static_assets": asset_engine.stats(),
+        "spa_routing": crawler_matcher.stats()
+    })
+
 # Production-ready startup
 def create_app():
     """Factory function for creating the app"""
     return app
 
-# Start publisher service
+# Il publisher gira nel suo processo (python -m python.publisher_main, Procfile "worker:").
+# PUBLISHER_IN_WEB=true lo avvia anche qui, utile in sviluppo con un solo processo.
+publisher_in_web = os.environ.get(
+    'PUBLISHER_IN_WEB', 'true' if __name__ == '__main__' else 'false'
+).lower() == 'true'
+
 if __name__ == '__main__':
     # Development mode
-    publisher.start()
+    if publisher_in_web:
+        publisher.start()
     try:
         port = int(os.environ.get('PORT', 5000))
         debug_mode = os.environ.get('FLASK_ENV', 'development') == 'development'
         app.run(host='0.0.0.0', port=port, debug=debug_mode)
     finally:
         publisher.stop()
-else:
-    # Production mode - publisher will be started by the WSGI server
+elif publisher_in_web:
     publisher.start()
 
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: Cloudflare IP check, per-request ip_network loop vs IPRangeTable
+
+Usage: python benchmarks/ip_matcher_bench.py [lookups]
+"""
+import os
+import random
+import sys
+import time
+from ipaddress import ip_address, ip_network
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from security_middleware import CLOUDFLARE_IP_RANGES, IPRangeTable
+
+LEGACY_RANGES = [r for r in CLOUDFLARE_IP_RANGES if ':' not in r]
+
+
+def legacy_is_cloudflare_ip(remote_addr):
+    """The original check_cloudflare_ip loop (IPv4 ranges only)"""
+    client_ip = ip_address(remote_addr)
+    for cf_range in LEGACY_RANGES:
+        if client_ip in ip_network(cf_range):
+            return True
+    return False
+
+
+def sample_addresses(count):
+    rng = random.Random(42)
+    inside = [str(ip_network('104.16.0.0/13')[rng.randrange(2 ** 19)]) for _ in range(count // 2)]
+    outside = [f"{rng.randrange(1, 100)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}"
+               for _ in range(count - len(inside))]
+    addresses = inside + outside
+    rng.shuffle(addresses)
+    return addresses
+
+
+def bench(name, func, addresses):
+    start = time.perf_counter()
+    hits = sum(1 for address in addresses if func(address))
+    elapsed = time.perf_counter() - start
+    rate = len(addresses) / elapsed
+    print(f"{name:<14} {rate:>12,.0f} lookups/s  ({hits} matches)")
+    return rate
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    addresses = sample_addresses(count)
+    table = IPRangeTable(CLOUDFLARE_IP_RANGES)
+
+    # Sanity check: both implementations agree on IPv4
+    assert all(legacy_is_cloudflare_ip(a) == (a in table) for a in addresses[:2000])
+
+    legacy = bench('legacy loop', legacy_is_cloudflare_ip, addresses)
+    compiled = bench('IPRangeTable', table.__contains__, addresses)
+    print(f"speedup        {compiled / legacy:>12.1f}x")
+
+
+if __name__ == '__main__':
+    main()
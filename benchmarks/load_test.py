@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+HTTP load benchmark for the Flask app under gunicorn
+
+Starts benchmarks/steem_stub.py and gunicorn (gunicorn.conf.py) on local ports,
+drives one or more request mixes with N concurrent keep-alive clients and
+prints throughput and p50/p95/p99 latency per scenario as JSON.
+
+Scenarios:
+  crawler   link-preview bursts on /app/@author/permlink (Twitterbot, Telegrambot, ...)
+  static    SPA module loads (/components/*.js, /services/*.js, ...) with gzip/br
+  crud      scheduled-post create, list, update and delete
+  mixed     60% static, 25% crawler, 15% crud
+  upstream  crawler previews of always-new posts: every request waits on the Steem stub
+
+Examples:
+  python benchmarks/load_test.py --duration 20 --concurrency 32 --output results.json
+  python benchmarks/load_test.py --scenarios crawler --stub-latency-ms 200
+  python benchmarks/load_test.py --compare baseline.json --output results.json
+  python benchmarks/load_test.py --base-url http://127.0.0.1:8000   (server already running)
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+STATIC_DIRECTORIES = ('components', 'services', 'utils', 'views', 'models', 'controllers', 'config')
+CRAWLER_USER_AGENTS = (
+    'Twitterbot/1.0',
+    'TelegramBot (like TwitterBot)',
+    'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)',
+    'Mozilla/5.0 (compatible; Discordbot/2.0; +https://discordapp.com)',
+)
+BROWSER_USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36'
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def find_static_paths(limit=200):
+    paths = []
+    for directory in STATIC_DIRECTORIES:
+        for dirpath, _, filenames in os.walk(os.path.join(ROOT, directory)):
+            for filename in sorted(filenames):
+                if filename.endswith('.js'):
+                    rel = os.path.relpath(os.path.join(dirpath, filename), ROOT).replace(os.sep, '/')
+                    paths.append('/' + rel)
+    return sorted(paths)[:limit]
+
+
+class Recorder:
+    """Latenze e status di uno scenario, condivisi tra i thread client"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+        self.recording = False
+
+    def add(self, seconds, status):
+        if not self.recording:
+            return
+        with self.lock:
+            self.latencies.append(seconds)
+            self.statuses[status] += 1
+            if status == 'error' or status >= 500:
+                self.errors += 1
+
+    def summary(self, duration):
+        latencies = sorted(ms * 1000.0 for ms in self.latencies)
+        total = len(latencies)
+
+        def rounded(value):
+            return round(value, 3) if value is not None else None
+
+        return {
+            'requests': total,
+            'errors': self.errors,
+            'error_rate': round(self.errors / total, 5) if total else 0.0,
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(total / duration, 2) if duration else 0.0,
+            'latency_ms': {
+                'mean': rounded(sum(latencies) / total) if total else None,
+                'p50': rounded(percentile(latencies, 0.50)),
+                'p95': rounded(percentile(latencies, 0.95)),
+                'p99': rounded(percentile(latencies, 0.99)),
+                'max': rounded(latencies[-1]) if total else None,
+            },
+            'status_counts': {str(k): v for k, v in sorted(self.statuses.items(), key=str)},
+        }
+
+
+class Client:
+    """Un client con connessione keep-alive, usato da un solo thread"""
+
+    def __init__(self, base_url, recorder, rng, timeout):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.recorder = recorder
+        self.rng = rng
+        self.timeout = timeout
+        self.conn = None
+        self.created_ids = []
+
+    def request(self, method, path, headers=None, body=None):
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            if response.will_close:
+                self.close()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            self.recorder.add(time.perf_counter() - start, 'error')
+            return None, None
+        self.recorder.add(time.perf_counter() - start, response.status)
+        return response.status, data
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+# --- Scenari: ogni step esegue una o più richieste ---
+
+def crawler_step(client, options):
+    """80% dei preview su pochi post popolari (cache calda), 20% su post nuovi (miss)"""
+    rng = client.rng
+    if rng.random() < 0.8:
+        n = rng.randrange(options.hot_posts)
+        path = f'/app/@author{n % 7}/hot-post-{n}'
+    else:
+        path = f'/app/@author{rng.randrange(100)}/post-{rng.getrandbits(40):x}'
+    client.request('GET', path, {'User-Agent': rng.choice(CRAWLER_USER_AGENTS)})
+
+
+def upstream_step(client, options):
+    """Post sempre diversi: nessun hit in cache, ogni richiesta chiama il nodo Steem"""
+    rng = client.rng
+    path = f'/app/@author{rng.randrange(100)}/uncached-{rng.getrandbits(48):x}'
+    client.request('GET', path, {'User-Agent': rng.choice(CRAWLER_USER_AGENTS)})
+
+
+def static_step(client, options):
+    rng = client.rng
+    headers = {'User-Agent': BROWSER_USER_AGENT, 'Accept-Encoding': 'gzip, deflate, br'}
+    if rng.random() < 0.05:
+        client.request('GET', '/app', headers)
+    else:
+        client.request('GET', rng.choice(options.static_paths), headers)
+
+
+def crud_step(client, options):
+    """Crea un post schedulato (tra un giorno), lo aggiorna, legge la lista e ne cancella uno"""
+    rng = client.rng
+    when = (datetime.now(timezone.utc) + timedelta(days=1, seconds=rng.randrange(86400)))
+    username = f'bench{rng.randrange(50)}'
+    status, data = client.request('POST', '/api/scheduled_posts', body={
+        'username': username,
+        'title': 'Benchmark scheduled post',
+        'body': 'Lorem ipsum dolor sit amet. ' * 20,
+        'tags': ['cur8', 'benchmark'],
+        'permlink': f'bench-{rng.getrandbits(48):x}',
+        'scheduled_datetime': when.strftime('%Y-%m-%dT%H:%M:%S'),
+    })
+    if status == 201:
+        client.created_ids.append(json.loads(data)['id'])
+        client.request('PUT', f"/api/scheduled_posts/{client.created_ids[-1]}",
+                       body={'title': 'Benchmark scheduled post (edited)'})
+    client.request('GET', f'/api/scheduled_posts?username={username}&limit=50'
+                          '&fields=id,title,scheduled_datetime,status')
+    if len(client.created_ids) > 5:
+        client.request('DELETE', f'/api/scheduled_posts/{client.created_ids.pop(0)}')
+
+
+def mixed_step(client, options):
+    roll = client.rng.random()
+    if roll < 0.60:
+        static_step(client, options)
+    elif roll < 0.85:
+        crawler_step(client, options)
+    else:
+        crud_step(client, options)
+
+
+SCENARIOS = {
+    'crawler': crawler_step,
+    'static': static_step,
+    'crud': crud_step,
+    'mixed': mixed_step,
+    'upstream': upstream_step,
+}
+
+
+def run_scenario(name, base_url, options):
+    step = SCENARIOS[name]
+    recorder = Recorder()
+    stop = threading.Event()
+
+    def worker(index):
+        client = Client(base_url, recorder, random.Random(f'{options.seed}-{name}-{index}'), options.timeout)
+        try:
+            while not stop.is_set():
+                step(client, options)
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(options.concurrency)]
+    for thread in threads:
+        thread.start()
+    time.sleep(options.warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    time.sleep(options.duration)
+    recorder.recording = False
+    duration = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=options.timeout + 1)
+    return recorder.summary(duration)
+
+
+# --- Avvio di stub e gunicorn ---
+
+def wait_for(url, timeout=30.0):
+    parsed = urllib.parse.urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=2)
+            conn.request('GET', parsed.path or '/')
+            if conn.getresponse().status < 500:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Stack:
+    """Steem stub + gunicorn come sottoprocessi, con database e directory temporanei"""
+
+    def __init__(self, options):
+        self.options = options
+        self.workdir = tempfile.mkdtemp(prefix='cur8fun_bench_')
+        self.processes = []
+        self.base_url = f'http://127.0.0.1:{options.port}'
+        self.stub_url = f'http://127.0.0.1:{options.stub_port}'
+
+    def app_env(self):
+        env = dict(os.environ)
+        env.update({
+            'PORT': str(self.options.port),
+            'WORKERS': str(self.options.workers),
+            'STEEM_API_URL': self.stub_url,
+            'DATABASE_URL': self.options.database_url or f"sqlite:///{os.path.join(self.workdir, 'bench.db')}",
+            'PROMETHEUS_MULTIPROC_DIR': os.path.join(self.workdir, 'prometheus'),
+            'LOG_LEVEL': 'WARNING',
+            'CLOUDFLARE_ONLY': 'false',
+        })
+        if self.options.worker_class:
+            env['GUNICORN_WORKER_CLASS'] = self.options.worker_class
+        if self.options.threads:
+            env['GUNICORN_THREADS'] = str(self.options.threads)
+        env.update(self.options.env)
+        return env
+
+    def start(self):
+        stub_cmd = [sys.executable, os.path.join(ROOT, 'benchmarks', 'steem_stub.py'),
+                    '--port', str(self.options.stub_port),
+                    '--latency-ms', str(self.options.stub_latency_ms),
+                    '--jitter-ms', str(self.options.stub_jitter_ms),
+                    '--error-rate', str(self.options.stub_error_rate)]
+        self.processes.append(subprocess.Popen(stub_cmd, cwd=ROOT))
+        if not wait_for(self.stub_url + '/'):
+            raise RuntimeError('Steem stub did not start')
+
+        log = open(os.path.join(self.workdir, 'gunicorn.log'), 'wb')
+        self.processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+            cwd=ROOT, env=self.app_env(), stdout=log, stderr=subprocess.STDOUT
+        ))
+        if not wait_for(self.base_url + '/healthz', timeout=60):
+            raise RuntimeError(f"gunicorn did not start, see {log.name}")
+
+    def stop(self):
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if not self.options.keep_workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def git_revision():
+    try:
+        revision = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+        dirty = subprocess.call(['git', 'diff', '--quiet', 'HEAD'], cwd=ROOT) != 0
+        return revision + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Differenze percentuali di throughput e p95/p99 rispetto a un risultato precedente"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    deltas = {}
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+
+        def change(new, old):
+            return round((new - old) / old * 100.0, 1) if new is not None and old else None
+
+        deltas[name] = {
+            'throughput_pct': change(current['throughput_rps'], previous['throughput_rps']),
+            'p95_pct': change(current['latency_ms']['p95'], previous['latency_ms']['p95']),
+            'p99_pct': change(current['latency_ms']['p99'], previous['latency_ms']['p99']),
+        }
+    return {'baseline': baseline.get('meta', {}).get('git_revision'), 'scenarios': deltas}
+
+
+def parse_env(values):
+    env = {}
+    for item in values or []:
+        key, _, value = item.partition('=')
+        env[key] = value
+    return env
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='HTTP load benchmark for cur8.fun',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__.split('Scenarios:', 1)[1])
+    parser.add_argument('--scenarios', default='crawler,static,crud,mixed',
+                        help='comma separated list (default: all)')
+    parser.add_argument('--duration', type=float, default=15.0, help='measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=3.0, help='unmeasured seconds before each scenario')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--hot-posts', type=int, default=20, help='distinct posts in crawler bursts')
+    parser.add_argument('--base-url', help='benchmark a running server instead of starting one')
+    parser.add_argument('--port', type=int, default=18000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--worker-class', choices=('sync', 'gthread'), help='GUNICORN_WORKER_CLASS')
+    parser.add_argument('--threads', type=int, help='GUNICORN_THREADS (gthread only)')
+    parser.add_argument('--database-url', help='default: a temporary SQLite file')
+    parser.add_argument('--env', action='append', metavar='KEY=VALUE',
+                        help='extra environment for gunicorn (repeatable)')
+    parser.add_argument('--stub-port', type=int, default=18765)
+    parser.add_argument('--stub-latency-ms', type=float, default=50.0)
+    parser.add_argument('--stub-jitter-ms', type=float, default=10.0)
+    parser.add_argument('--stub-error-rate', type=float, default=0.0)
+    parser.add_argument('--keep-workdir', action='store_true', help='keep the temp dir (logs, db)')
+    parser.add_argument('--output', help='also write the JSON results to this file')
+    parser.add_argument('--compare', metavar='BASELINE_JSON', help='add deltas against an earlier run')
+    return parser
+
+
+def parse_options(parser, argv=None):
+    options = parser.parse_args(argv)
+    options.env = parse_env(options.env)
+    options.static_paths = find_static_paths()
+    return options
+
+
+def main(argv=None):
+    parser = build_parser()
+    options = parse_options(parser, argv)
+
+    scenarios = [s.strip() for s in options.scenarios.split(',') if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    stack = None
+    base_url = options.base_url
+    if not base_url:
+        stack = Stack(options)
+        stack.start()
+        base_url = stack.base_url
+
+    results = {
+        'meta': {
+            'git_revision': git_revision(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'base_url': base_url,
+            'config': {
+                'concurrency': options.concurrency,
+                'duration_s': options.duration,
+                'warmup_s': options.warmup,
+                'workers': None if options.base_url else options.workers,
+                'worker_class': None if options.base_url else (options.worker_class or 'sync'),
+                'threads': options.threads,
+                'env': options.env,
+                'stub_latency_ms': None if options.base_url else options.stub_latency_ms,
+                'stub_error_rate': None if options.base_url else options.stub_error_rate,
+            },
+        },
+        'scenarios': {},
+    }
+    try:
+        for name in scenarios:
+            print(f"Running {name} for {options.duration:.0f}s with {options.concurrency} clients...",
+                  file=sys.stderr, flush=True)
+            results['scenarios'][name] = run_scenario(name, base_url, options)
+    finally:
+        if stack is not None:
+            stack.stop()
+
+    if options.compare:
+        results['comparison'] = compare(results, options.compare)
+
+    output = json.dumps(results, indent=2)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Local Steem JSON-RPC stub for benchmarks
+
+Answers condenser_api.get_content and condenser_api.get_accounts (single and
+batch requests) with canned data, after a configurable latency. A fraction of
+the calls can fail with a JSON-RPC error or an HTTP 503.
+
+Usage: python benchmarks/steem_stub.py --port 8765 --latency-ms 50 --error-rate 0.01
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+POST_BODY = """![cover](https://cdn.steemitimages.com/DQm/cover.jpg)
+
+# {title}
+
+Questo è un post di prova per il benchmark. **Markdown**, [link](https://cur8.fun)
+e <center>un po' di HTML</center> per rendere realistica l'estrazione della descrizione.
+
+""" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40
+
+
+def make_post(author, permlink):
+    title = f"Benchmark post {permlink}"
+    return {
+        'id': zlib.crc32(f'{author}/{permlink}'.encode()),
+        'author': author,
+        'permlink': permlink,
+        'category': 'cur8',
+        'parent_author': '',
+        'parent_permlink': 'cur8',
+        'title': title,
+        'body': POST_BODY.format(title=title),
+        'json_metadata': json.dumps({
+            'tags': ['cur8', 'benchmark'],
+            'image': ['https://cdn.steemitimages.com/DQm/cover.jpg'],
+            'app': 'steemee/1.0',
+            'format': 'markdown'
+        }),
+        'created': '2024-01-01T12:00:00',
+        'last_update': '2024-01-01T12:00:00',
+        'net_votes': 42,
+        'children': 3,
+        'pending_payout_value': '1.234 SBD',
+    }
+
+
+def make_account(name):
+    return {
+        'id': zlib.crc32(name.encode()) % 10 ** 6,
+        'name': name,
+        'reputation': '123456789012',
+        'post_count': 321,
+        'json_metadata': '',
+        'posting_json_metadata': json.dumps({'profile': {
+            'name': name.title(),
+            'about': f'Profilo di prova di {name}',
+            'profile_image': f'https://steemitimages.com/u/{name}/avatar',
+        }}),
+        'last_root_post': '1970-01-01T00:00:00',
+    }
+
+
+class StubConfig:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=None):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.calls = 0
+        self.errors = 0
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + jitter)
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+
+    def should_drop(self):
+        """Una piccola parte degli errori simula il nodo irraggiungibile (HTTP 503)"""
+        if not self.error_rate:
+            return False
+        with self.lock:
+            return self.random.random() < self.error_rate / 10
+
+
+def answer(config, call):
+    """Risposta JSON-RPC per una singola chiamata"""
+    method = call.get('method', '')
+    params = call.get('params') or []
+    response = {'jsonrpc': '2.0', 'id': call.get('id')}
+    if config.should_fail():
+        response['error'] = {'code': -32000, 'message': 'stub: simulated upstream error'}
+    elif method.endswith('get_content') and len(params) == 2:
+        response['result'] = make_post(params[0], params[1])
+    elif method.endswith('get_accounts') and params:
+        response['result'] = [make_account(name) for name in params[0]]
+    else:
+        response['error'] = {'code': -32601, 'message': f'stub: method not supported: {method}'}
+    return response
+
+
+def make_handler(config):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                payload = json.loads(self.rfile.read(length))
+            except ValueError:
+                return self._send(400, {'error': 'invalid json'})
+
+            calls = payload if isinstance(payload, list) else [payload]
+            with config.lock:
+                config.requests += 1
+                config.calls += len(calls)
+            time.sleep(config.delay())
+
+            if config.should_drop():
+                return self._send(503, {'error': 'stub: service unavailable'})
+
+            results = [answer(config, call) for call in calls]
+            self._send(200, results if isinstance(payload, list) else results[0])
+
+        def do_GET(self):
+            self._send(200, {
+                'requests': config.requests,
+                'calls': config.calls,
+                'errors': config.errors
+            })
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Il default (5) fa perdere connessioni quando molti worker si collegano insieme
+    request_queue_size = 1024
+
+
+def serve(port, config, host='127.0.0.1'):
+    return StubServer((host, port), make_handler(config))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    server = serve(args.port, config, args.host)
+    print(f"Steem stub listening on http://{args.host}:{args.port} "
+          f"(latency {args.latency_ms} ms, error rate {args.error_rate})", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
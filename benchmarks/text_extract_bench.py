@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: preview image + description, legacy regex passes vs python.text_extract
+
+Usage: python benchmarks/text_extract_bench.py [repeat]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from python.text_extract import extract_preview
+
+
+def legacy_extract_image(post_body):
+    """The original SteemClient.extract_image_from_post body scans (metadata excluded)"""
+    if not post_body:
+        return None
+    for pattern, group, flags in (
+        (r'!\[.*?\]\((https?://[^\s\)]+)\)', 1, 0),
+        (r'<img[^>]+src=["\'](https?://[^"\']+)["\'][^>]*>', 1, re.IGNORECASE),
+        (r'(https?://[^\s<>"\']+\.(?:jpg|jpeg|png|gif|webp)(?:\?[^\s<>"\']*)?)', 1, re.IGNORECASE),
+        (r'https?://(?:steemitimages\.com|images\.hive\.blog|gateway\.pinata\.cloud|ipfs\.io)/[^\s<>"\']+', 0,
+         re.IGNORECASE),
+    ):
+        match = re.search(pattern, post_body, flags)
+        if match:
+            return match.group(group)
+    return None
+
+
+def legacy_create_description(content, max_length=160):
+    """The original SteemClient.create_description"""
+    clean_content = re.sub(r'!\[.*?\]\(.*?\)', '', content)
+    clean_content = re.sub(r'\[.*?\]\(.*?\)', '', clean_content)
+    clean_content = re.sub(r'<[^>]*>', '', clean_content)
+    clean_content = re.sub(r'#{1,6}\s', '', clean_content)
+    clean_content = re.sub(r'\*{1,2}(.*?)\*{1,2}', r'\1', clean_content)
+    clean_content = re.sub(r'`{1,3}(.*?)`{1,3}', r'\1', clean_content)
+    clean_content = re.sub(r'\n+', ' ', clean_content)
+    clean_content = re.sub(r'\s+', ' ', clean_content)
+    clean_content = clean_content.strip()
+    if len(clean_content) > max_length:
+        clean_content = clean_content[:max_length] + '...'
+    return clean_content
+
+
+def legacy(body):
+    return legacy_extract_image(body), legacy_create_description(body)
+
+
+def compiled(body):
+    return extract_preview(body, 160)
+
+
+PARAGRAPH = ("Questo è un paragrafo con **grassetto**, `codice` e un [link](https://cur8.fun/@micro.cur8). "
+             "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor. ")
+HTML_BLOCK = ('<div class="pull-left"><table><tr><td><a href="https://cur8.fun">cella</a></td>'
+              '<td><b>valore</b></td></tr></table></div>\n')
+
+
+def corpus():
+    """(name, body): post reali per dimensione più input patologici"""
+    return [
+        ('short 1 KB', '![cover](https://cdn.steemitimages.com/DQm/cover.jpg)\n\n# Titolo\n\n' + PARAGRAPH * 6),
+        ('long 60 KB', '# Titolo\n\n' + (PARAGRAPH + '\n\n') * 300
+         + '![tail](https://cdn.steemitimages.com/DQm/tail.png)'),
+        ('html 100 KB', HTML_BLOCK * 750 + '<img src="https://images.hive.blog/p/abc.jpg">'),
+        ('no image 80 KB', (PARAGRAPH + '\n') * 400),
+        ('unclosed < 20 KB', '<a ' * 7000),
+        ('stars 20 KB', '*x ' * 7000),
+        ('brackets 20 KB', '![' * 10000),
+    ]
+
+
+def bench(func, body, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(body)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    # Sanity check: same preview image (descriptions differ on purpose: links keep their text)
+    assert all(legacy_extract_image(body) == extract_preview(body).image for _, body in corpus())
+    print(f"{'corpus':<18} {'legacy ms':>10} {'single ms':>10} {'speedup':>8}")
+    for name, body in corpus():
+        legacy_ms = bench(legacy, body, repeat)
+        compiled_ms = bench(compiled, body, repeat)
+        print(f"{name:<18} {legacy_ms:>10.3f} {compiled_ms:>10.3f} {legacy_ms / compiled_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
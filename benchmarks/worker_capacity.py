@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Concurrent-request capacity of the gunicorn worker modes while Steem is slow
+
+For each worker class, starts the stack from load_test.py with a slow Steem stub
+and runs two client groups at the same time:
+  upstream  crawler previews of uncached posts (each one waits on the stub)
+  probe     /healthz, to see whether fast requests queue behind the slow ones
+
+With sync workers capacity is about workers / stub latency requests per second;
+with gthread it grows with workers * threads.
+
+Usage: python benchmarks/worker_capacity.py --stub-latency-ms 500 --concurrency 64 --output capacity.json
+"""
+import copy
+import json
+import sys
+import threading
+
+import load_test
+
+
+def probe_step(client, options):
+    client.request('GET', '/healthz')
+
+
+load_test.SCENARIOS.setdefault('probe', probe_step)
+
+
+def run_mode(worker_class, options):
+    run_options = copy.copy(options)
+    run_options.worker_class = worker_class
+    run_options.threads = options.threads if worker_class == 'gthread' else None
+    probe_options = copy.copy(run_options)
+    probe_options.concurrency = options.probe_concurrency
+
+    stack = load_test.Stack(run_options)
+    stack.start()
+    results = {}
+    try:
+        probe = threading.Thread(
+            target=lambda: results.__setitem__('probe', load_test.run_scenario('probe', stack.base_url, probe_options))
+        )
+        probe.start()
+        results['upstream'] = load_test.run_scenario('upstream', stack.base_url, run_options)
+        probe.join()
+    finally:
+        stack.stop()
+    return results
+
+
+def main(argv=None):
+    parser = load_test.build_parser()
+    parser.description = __doc__.strip().splitlines()[0]
+    parser.add_argument('--modes', default='sync,gthread', help='worker classes to compare')
+    parser.add_argument('--probe-concurrency', type=int, default=2)
+    parser.set_defaults(workers=2, threads=16, concurrency=64, duration=10.0, warmup=2.0,
+                        stub_latency_ms=500.0, stub_jitter_ms=0.0)
+    options = load_test.parse_options(parser, argv)
+
+    report = {
+        'meta': {
+            'git_revision': load_test.git_revision(),
+            'workers': options.workers,
+            'threads': options.threads,
+            'concurrency': options.concurrency,
+            'stub_latency_ms': options.stub_latency_ms,
+            'duration_s': options.duration,
+        },
+        'modes': {}
+    }
+    for worker_class in [m.strip() for m in options.modes.split(',') if m.strip()]:
+        print(f"Measuring {worker_class} workers...", file=sys.stderr, flush=True)
+        report['modes'][worker_class] = run_mode(worker_class, options)
+
+    output = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 # Gunicorn configuration file for production
 import os
+import tempfile
 
 # Server socket
 bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
@@ -7,8 +8,15 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.environ.get('WORKERS', 4))
-worker_class = "sync"
+# "sync" (one request per worker) or "gthread" (GUNICORN_THREADS requests per
+# worker). gthread keeps accepting requests while threads wait on slow Steem
+# API calls; the app's shared caches, pools and the publisher are thread-safe.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.environ.get('GUNICORN_THREADS', 8 if worker_class == 'gthread' else 1))
+# Maximum keep-alive connections per gthread worker (also used by async workers)
 worker_connections = 1000
+# One idle upstream connection per request thread
+os.environ.setdefault('STEEM_POOL_SIZE', str(max(4, threads)))
 timeout = 30
 keepalive = 2
 
@@ -22,6 +30,24 @@ errorlog = "-"
 loglevel = "info"
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
 
+# Prometheus multiprocess mode: each worker writes its metrics to this
+# directory and /metrics aggregates them. The directory is emptied when the
+# master loads this file, before the application is preloaded.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'cur8fun_prometheus'))
+_metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+os.makedirs(_metrics_dir, exist_ok=True)
+for _name in os.listdir(_metrics_dir):
+    if _name.endswith('.db'):
+        os.remove(os.path.join(_metrics_dir, _name))
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited"""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
 # Process naming
 proc_name = 'cur8fun_app'
 
@@ -0,0 +1,44 @@
+"""
+Configurazione Flask condivisa dal processo web (app.py) e dal publisher
+
+configure_database() imposta il database e aggiorna lo schema. create_base_app()
+crea un'app con solo quella configurazione, per i processi che non servono HTTP
+(publisher, fase di release del Procfile): niente scansione né compressione degli
+asset statici, niente middleware.
+"""
+import os
+
+from flask import Flask
+
+from python.models import db
+from python.migrations import upgrade_schema
+
+# Stessa root di app.py, così anche il percorso relativo di SQLite è lo stesso
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def database_url_from_env():
+    database_url = os.environ.get('DATABASE_URL', 'sqlite:///steemee.db')
+    # Handle PostgreSQL URL format for some hosting services
+    if database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://')
+    return database_url
+
+
+def configure_database(app):
+    """Configura SQLAlchemy sull'app e porta lo schema alla versione dei modelli"""
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url_from_env()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-change-in-production')
+    db.init_app(app)
+
+    # Inizializzazione del database (tabelle mancanti + migrazioni di colonne/indici)
+    with app.app_context():
+        upgrade_schema()
+
+
+def create_base_app():
+    """App Flask con il solo database configurato"""
+    app = Flask('cur8fun', root_path=PROJECT_ROOT)
+    configure_database(app)
+    return app
@@ -0,0 +1,374 @@
+"""
+Broadcasters used by the scheduled post publisher
+
+A broadcaster turns a group of posts into one Steem transaction: every post
+becomes a `comment` operation, followed by its `comment_options` when it has
+beneficiaries. A transaction holds at most one root post per account (Steem
+enforces a minimum interval between root posts of the same account).
+
+PUBLISHER_BROADCASTER selects the implementation:
+- stub (default): no network, configurable latency and failure rate
+- steem: signed transactions sent through the Steem JSON-RPC API
+"""
+import calendar
+import hashlib
+import json
+import logging
+import os
+import random
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from http.client import HTTPException
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    import ecdsa
+    from ecdsa.ellipticcurve import Point
+    from ecdsa.numbertheory import inverse_mod
+    from ecdsa.util import sigencode_string
+except ImportError:  # ecdsa is only needed by SteemBroadcaster
+    ecdsa = None
+
+logger = logging.getLogger(__name__)
+
+# Steem mainnet chain id
+STEEM_CHAIN_ID = bytes(32)
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+# Steem rejects transactions larger than STEEM_MAX_TRANSACTION_SIZE (64 KiB)
+STEEM_MAX_TRANSACTION_SIZE = 64 * 1024
+
+# Graphene operation ids (position in steem::protocol::operation)
+OPERATION_IDS = {'comment': 1, 'comment_options': 19}
+
+
+class BroadcastError(Exception):
+    """A transaction was not accepted; transient errors are worth retrying as they are"""
+
+    def __init__(self, message: str, transient: bool = False):
+        super().__init__(message)
+        self.transient = transient
+
+    @property
+    def rate_limited(self) -> bool:
+        """The node rejected a root post sent too soon after the previous one of the same author"""
+        message = str(self)
+        return 'STEEM_MIN_ROOT_COMMENT_INTERVAL' in message or 'once every 5 minutes' in message
+
+
+def parse_beneficiaries(spec: str) -> List[dict]:
+    """'account:weight,account:weight' -> [{'account': ..., 'weight': ...}] (weight in basis points)"""
+    beneficiaries = []
+    for part in (spec or '').split(','):
+        account, sep, weight = part.strip().partition(':')
+        if account and sep:
+            beneficiaries.append({'account': account, 'weight': int(weight)})
+    # Steem requires beneficiaries sorted by account name
+    return sorted(beneficiaries, key=lambda b: b['account'])
+
+
+def build_operations(post_data: dict, default_beneficiaries: Optional[List[dict]] = None) -> list:
+    """comment (+ comment_options) operations for one post, in condenser_api format"""
+    operations = [['comment', {
+        'parent_author': '',
+        'parent_permlink': post_data['parent_permlink'],
+        'author': post_data['username'],
+        'permlink': post_data['permlink'],
+        'title': post_data['title'],
+        'body': post_data['body'],
+        'json_metadata': json.dumps(post_data['metadata'], separators=(',', ':')),
+    }]]
+
+    beneficiaries = post_data.get('beneficiaries', default_beneficiaries)
+    beneficiaries = [b for b in beneficiaries or [] if b['account'] != post_data['username']]
+    if beneficiaries:
+        operations.append(['comment_options', {
+            'author': post_data['username'],
+            'permlink': post_data['permlink'],
+            'max_accepted_payout': '1000000.000 SBD',
+            'percent_steem_dollars': 10000,
+            'allow_votes': True,
+            'allow_curation_rewards': True,
+            'extensions': [[0, {'beneficiaries': beneficiaries}]],
+        }])
+    return operations
+
+
+class Broadcaster(ABC):
+    """
+    Base class: subclasses implement send(operations, authors).
+
+    publish() sends a group of posts as a single transaction. If the node rejects
+    it for a non-transient reason, the posts are retried one per transaction so a
+    single invalid post does not fail the others. split_batches() keeps groups
+    within max_posts_per_transaction and max_transaction_bytes of operations
+    (half the chain limit by default, leaving room for the header and signatures).
+    """
+
+    def __init__(self, max_posts_per_transaction: int = 10, default_beneficiaries=None,
+                 max_transaction_bytes: int = STEEM_MAX_TRANSACTION_SIZE // 2):
+        self.max_posts_per_transaction = max(1, max_posts_per_transaction)
+        self.max_transaction_bytes = max_transaction_bytes
+        self.default_beneficiaries = default_beneficiaries or []
+        self.transactions = 0
+        self.fallbacks = 0
+
+    @abstractmethod
+    def send(self, operations: list, authors: List[str]):
+        """Send the operations as one transaction; raise BroadcastError if it is not accepted"""
+
+    def operations_size(self, post: dict) -> int:
+        """Serialized size in bytes of the operations of one post"""
+        return sum(len(_serialize_operation(name, op))
+                   for name, op in build_operations(post, self.default_beneficiaries))
+
+    def split_batches(self, posts: List[dict]) -> List[List[dict]]:
+        """Group posts into transactions by count and serialized size (a larger post goes alone)"""
+        batches, batch, batch_bytes = [], [], 0
+        for post in posts:
+            size = self.operations_size(post)
+            if batch and (len(batch) >= self.max_posts_per_transaction
+                          or batch_bytes + size > self.max_transaction_bytes):
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append(post)
+            batch_bytes += size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def publish(self, posts: List[dict]) -> List[Tuple[bool, Optional[BroadcastError]]]:
+        """Publish posts (at most one per account) in one transaction; returns (ok, error) per post"""
+        operations = [op for post in posts for op in build_operations(post, self.default_beneficiaries)]
+        authors = sorted({post['username'] for post in posts})
+        try:
+            self.transactions += 1
+            self.send(operations, authors)
+            return [(True, None)] * len(posts)
+        except BroadcastError as e:
+            if len(posts) == 1 or e.transient:
+                return [(False, e)] * len(posts)
+            self.fallbacks += 1
+            logger.warning(f"Transaction with {len(posts)} posts rejected ({e}), retrying them one by one")
+            return [self.publish([post])[0] for post in posts]
+
+
+class StubBroadcaster(Broadcaster):
+    """Local broadcaster for development and tests: records transactions instead of sending them"""
+
+    def __init__(self, latency: float = 1.0, failure_rate: float = 0.05, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, operations: list, authors: List[str]):
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise BroadcastError('Simulated blockchain error', transient=True)
+        with self._lock:
+            self.sent.append(operations)
+
+
+def _varint(value: int) -> bytes:
+    data = bytearray()
+    while True:
+        byte, value = value & 0x7F, value >> 7
+        data.append(byte | (0x80 if value else 0))
+        if not value:
+            return bytes(data)
+
+
+def _string(value: str) -> bytes:
+    data = value.encode('utf-8')
+    return _varint(len(data)) + data
+
+
+def _asset(value: str) -> bytes:
+    """'1000000.000 SBD' -> int64 amount, precision, 7-byte symbol"""
+    amount, symbol = value.split()
+    whole, _, fraction = amount.partition('.')
+    return (struct.pack('<qB', int(whole + fraction), len(fraction))
+            + symbol.encode('ascii').ljust(7, b'\x00'))
+
+
+def _serialize_operation(name: str, op: dict) -> bytes:
+    if name == 'comment':
+        data = b''.join(_string(op[field]) for field in (
+            'parent_author', 'parent_permlink', 'author', 'permlink', 'title', 'body', 'json_metadata'))
+    elif name == 'comment_options':
+        data = (_string(op['author']) + _string(op['permlink']) + _asset(op['max_accepted_payout'])
+                + struct.pack('<H??', op['percent_steem_dollars'], op['allow_votes'], op['allow_curation_rewards'])
+                + _varint(len(op['extensions'])))
+        for extension_id, extension in op['extensions']:
+            beneficiaries = extension['beneficiaries']
+            data += _varint(extension_id) + _varint(len(beneficiaries))
+            data += b''.join(_string(b['account']) + struct.pack('<H', b['weight']) for b in beneficiaries)
+    else:
+        raise ValueError(f"Cannot serialize operation {name}")
+    return _varint(OPERATION_IDS[name]) + data
+
+
+def serialize_transaction(transaction: dict) -> bytes:
+    """Graphene binary form of a transaction without its signatures (the bytes that get signed)"""
+    expiration = calendar.timegm(datetime.strptime(transaction['expiration'], '%Y-%m-%dT%H:%M:%S').timetuple())
+    data = struct.pack('<HII', transaction['ref_block_num'], transaction['ref_block_prefix'], expiration)
+    data += _varint(len(transaction['operations']))
+    data += b''.join(_serialize_operation(name, op) for name, op in transaction['operations'])
+    if transaction['extensions']:
+        raise ValueError('Transaction extensions are not supported')
+    return data + _varint(0)
+
+
+def _base58_decode(text: str) -> bytes:
+    number = 0
+    for char in text:
+        number = number * 58 + BASE58_ALPHABET.index(char)
+    data = number.to_bytes((number.bit_length() + 7) // 8, 'big')
+    padding = len(text) - len(text.lstrip('1'))
+    return b'\x00' * padding + data
+
+
+def wif_to_private_key(wif: str) -> bytes:
+    """Decode a WIF private key (0x80 prefix, double-SHA256 checksum)"""
+    raw = _base58_decode(wif)
+    payload, checksum = raw[:-4], raw[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum or payload[0] != 0x80:
+        raise ValueError('Invalid WIF private key')
+    return payload[1:33]
+
+
+def _is_canonical(signature: bytes) -> bool:
+    # Graphene rejects signatures whose r or s would need a padding byte in DER
+    return (not signature[0] & 0x80 and not (signature[0] == 0 and not signature[1] & 0x80)
+            and not signature[32] & 0x80 and not (signature[32] == 0 and not signature[33] & 0x80))
+
+
+def _recovery_id(digest: bytes, signature: bytes, public_point) -> int:
+    curve = ecdsa.SECP256k1
+    field = curve.curve.p()
+    order = curve.order
+    r = int.from_bytes(signature[:32], 'big')
+    s = int.from_bytes(signature[32:], 'big')
+    e = int.from_bytes(digest, 'big')
+    for recid in range(4):
+        x = r + (recid // 2) * order
+        if x >= field:
+            continue
+        alpha = (pow(x, 3, field) + 7) % field
+        beta = pow(alpha, (field + 1) // 4, field)
+        y = beta if (beta - recid) % 2 == 0 else field - beta
+        point = Point(curve.curve, x, y, order)
+        candidate = inverse_mod(r, order) * (s * point + (-e % order) * curve.generator)
+        if candidate.x() == public_point.x() and candidate.y() == public_point.y():
+            return recid
+    raise ValueError('Could not compute the signature recovery id')
+
+
+def sign_digest(digest: bytes, private_key: bytes) -> str:
+    """Compact, canonical secp256k1 signature (hex) as expected by Steem"""
+    key = ecdsa.SigningKey.from_string(private_key, curve=ecdsa.SECP256k1)
+    public_point = key.get_verifying_key().pubkey.point
+    counter = 0
+    while True:
+        signature = key.sign_digest_deterministic(
+            digest, hashfunc=hashlib.sha256, sigencode=sigencode_string,
+            extra_entropy=counter.to_bytes(32, 'big') if counter else b''
+        )
+        if _is_canonical(signature):
+            break
+        counter += 1
+    recid = _recovery_id(digest, signature, public_point)
+    return bytes([27 + 4 + recid]).hex() + signature.hex()
+
+
+class SteemBroadcaster(Broadcaster):
+    """
+    Signs transactions with the posting keys in STEEM_POSTING_KEYS and broadcasts
+    them with condenser_api.broadcast_transaction_synchronous.
+
+    STEEM_POSTING_KEYS is a comma-separated list of account=WIF. The account '*'
+    is a key with posting authority over every author (e.g. the app account
+    that users granted posting authority to).
+    Transactions are serialized locally, so the node only sees what was signed;
+    the node URL must still be https because it receives the signed transactions.
+    """
+
+    def __init__(self, client, keys: Dict[str, str], expiration: int = 60, **kwargs):
+        if ecdsa is None:
+            raise RuntimeError('SteemBroadcaster requires the ecdsa package')
+        if keys and urlparse(client.api_url).scheme != 'https':
+            raise RuntimeError(f"STEEM_POSTING_KEYS are configured: STEEM_API_URL must use https, not {client.api_url}")
+        super().__init__(**kwargs)
+        self.client = client
+        self.keys = {account: wif_to_private_key(wif) for account, wif in keys.items()}
+        self.expiration = expiration
+
+    @staticmethod
+    def parse_keys(spec: str) -> Dict[str, str]:
+        keys = {}
+        for part in (spec or '').split(','):
+            account, sep, wif = part.strip().partition('=')
+            if sep:
+                keys[account.strip()] = wif.strip()
+        return keys
+
+    def _signing_keys(self, authors: List[str]) -> List[bytes]:
+        if '*' in self.keys:
+            return [self.keys['*']]
+        missing = [author for author in authors if author not in self.keys]
+        if missing:
+            raise BroadcastError(f"No posting key for {', '.join('@' + a for a in missing)}")
+        return list(dict.fromkeys(self.keys[author] for author in authors))
+
+    def _rpc(self, method: str, params: list):
+        try:
+            response = self.client.call(method, params)
+        except (OSError, HTTPException, ValueError) as e:
+            raise BroadcastError(f"{method}: {e}", transient=True)
+        if 'error' in response:
+            error = response['error']
+            raise BroadcastError(f"{method}: {error.get('message', error) if isinstance(error, dict) else error}")
+        return response.get('result')
+
+    def send(self, operations: list, authors: List[str]):
+        keys = self._signing_keys(authors)
+        props = self._rpc('condenser_api.get_dynamic_global_properties', [])
+        head_time = datetime.strptime(props['time'], '%Y-%m-%dT%H:%M:%S')
+        transaction = {
+            'ref_block_num': props['head_block_number'] & 0xFFFF,
+            'ref_block_prefix': struct.unpack_from('<I', bytes.fromhex(props['head_block_id']), 4)[0],
+            'expiration': (head_time + timedelta(seconds=self.expiration)).strftime('%Y-%m-%dT%H:%M:%S'),
+            'operations': operations,
+            'extensions': [],
+            'signatures': [],
+        }
+        digest = hashlib.sha256(STEEM_CHAIN_ID + serialize_transaction(transaction)).digest()
+        transaction['signatures'] = [sign_digest(digest, key) for key in keys]
+        return self._rpc('condenser_api.broadcast_transaction_synchronous', [transaction])
+
+
+def create_broadcaster() -> Broadcaster:
+    """Broadcaster configured from the environment"""
+    options = {
+        'max_posts_per_transaction': int(os.environ.get('PUBLISHER_POSTS_PER_TRANSACTION', 10)),
+        'max_transaction_bytes': int(os.environ.get('PUBLISHER_MAX_TRANSACTION_BYTES',
+                                                    STEEM_MAX_TRANSACTION_SIZE // 2)),
+        'default_beneficiaries': parse_beneficiaries(os.environ.get('PUBLISHER_BENEFICIARIES', 'micro.cur8:500')),
+    }
+    kind = os.environ.get('PUBLISHER_BROADCASTER', 'stub').lower()
+    if kind == 'steem':
+        from python.steem_client import steem_client
+        return SteemBroadcaster(steem_client, SteemBroadcaster.parse_keys(os.environ.get('STEEM_POSTING_KEYS', '')),
+                                **options)
+    return StubBroadcaster(
+        latency=float(os.environ.get('PUBLISHER_STUB_LATENCY', 1.0)),
+        failure_rate=float(os.environ.get('PUBLISHER_STUB_FAILURE_RATE', 0.05)),
+        **options
+    )
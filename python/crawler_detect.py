@@ -0,0 +1,100 @@
+"""
+Riconoscimento dei crawler di anteprima link tramite User-Agent
+"""
+import os
+import re
+import threading
+
+from python import metrics
+
+# Bot che generano anteprime dei link (social, chat, motori di ricerca)
+DEFAULT_CRAWLER_PATTERNS = (
+    'Telegrambot',
+    'Twitterbot',
+    'facebookexternalhit',
+    'Facebot',
+    'Discordbot',
+    'Slackbot',
+    'Slack-ImgProxy',
+    'LinkedInBot',
+    'WhatsApp',
+    'Pinterest',
+    'redditbot',
+    'Applebot',
+    'Googlebot',
+    'Google-InspectionTool',
+    'bingbot',
+    'DuckDuckBot',
+    'YandexBot',
+    'Embedly',
+    'Iframely',
+    'SkypeUriPreview',
+    'vkShare',
+    'Mastodon',
+    'Bluesky',
+    'Viber',
+    'Snapchat',
+    'Quora Link Preview',
+    'TumblrBot',
+)
+
+
+class CrawlerMatcher:
+    """
+    Classifica lo User-Agent con una sola regex precompilata.
+    I risultati vengono memorizzati per User-Agent (i valori si ripetono molto).
+    """
+
+    CACHE_SIZE = 2048
+
+    def __init__(self, patterns=DEFAULT_CRAWLER_PATTERNS):
+        self.patterns = tuple(p for p in patterns if p)
+        self._regex = re.compile('|'.join(re.escape(p) for p in self.patterns), re.IGNORECASE)
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.crawler_requests = 0
+        self.browser_requests = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        CRAWLER_USER_AGENTS sostituisce la lista predefinita,
+        CRAWLER_USER_AGENTS_EXTRA la estende (valori separati da virgola).
+        """
+        patterns = DEFAULT_CRAWLER_PATTERNS
+        if os.environ.get('CRAWLER_USER_AGENTS'):
+            patterns = tuple(p.strip() for p in os.environ['CRAWLER_USER_AGENTS'].split(','))
+        if os.environ.get('CRAWLER_USER_AGENTS_EXTRA'):
+            patterns += tuple(p.strip() for p in os.environ['CRAWLER_USER_AGENTS_EXTRA'].split(','))
+        return cls(patterns)
+
+    def is_crawler(self, user_agent):
+        if not user_agent:
+            return False
+        result = self._cache.get(user_agent)
+        if result is None:
+            result = self._regex.search(user_agent) is not None
+            with self._lock:
+                if len(self._cache) >= self.CACHE_SIZE:
+                    self._cache.clear()
+                self._cache[user_agent] = result
+        return result
+
+    def classify(self, user_agent):
+        """Come is_crawler, ma conta la decisione di routing"""
+        crawler = self.is_crawler(user_agent)
+        # Con gthread più thread del worker contano insieme
+        with self._lock:
+            if crawler:
+                self.crawler_requests += 1
+            else:
+                self.browser_requests += 1
+        metrics.SPA_ROUTING.labels('crawler' if crawler else 'browser').inc()
+        return crawler
+
+    def stats(self):
+        return {
+            'crawler': self.crawler_requests,
+            'browser': self.browser_requests,
+            'patterns': len(self.patterns)
+        }
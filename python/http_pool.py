@@ -0,0 +1,116 @@
+"""
+Pool di connessioni HTTP keep-alive basato solo sulla libreria standard
+"""
+import http.client
+import os
+import ssl
+import threading
+import urllib.parse
+
+# Errori tipici di una connessione keep-alive chiusa dal server mentre era inattiva
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+
+class HTTPConnectionPool:
+    """
+    Pool thread-safe di connessioni persistenti verso un singolo host.
+
+    pool_size limita le connessioni inattive conservate; le richieste concorrenti
+    oltre questo limite aprono connessioni aggiuntive che vengono chiuse al rilascio.
+    Dopo un fork (worker gunicorn) il pool viene svuotato, così ogni processo usa
+    le proprie connessioni.
+    """
+
+    def __init__(self, url, pool_size=4, connect_timeout=3.0, read_timeout=10.0):
+        parsed = urllib.parse.urlsplit(url)
+        self.scheme = parsed.scheme or 'https'
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.path = parsed.path or '/'
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._ssl_context = ssl.create_default_context() if self.scheme == 'https' else None
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def _new_connection(self):
+        if self.scheme == 'https':
+            conn = http.client.HTTPSConnection(self.host, self.port, timeout=self.connect_timeout,
+                                               context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        return conn
+
+    def _acquire(self):
+        """Ritorna (connection, reused)"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Processo figlio: le connessioni ereditate appartengono al padre
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop(), True
+            self.opened += 1
+        return self._new_connection(), False
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.pool_size and self._pid == os.getpid():
+                self._idle.append(conn)
+                return
+            self.discarded += 1
+        conn.close()
+
+    def request(self, method, body=None, headers=None):
+        """Esegue una richiesta e ritorna (status, body_bytes)"""
+        headers = headers or {}
+        for attempt in range(2):
+            conn, reused = self._acquire()
+            try:
+                conn.request(method, self.path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused and attempt == 0:
+                    # Il server ha chiuso la connessione inattiva: riprova su una nuova
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return response.status, data
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        return {
+            'opened': self.opened,
+            'reused': self.reused,
+            'discarded': self.discarded,
+            'idle': len(self._idle),
+            'pool_size': self.pool_size
+        }
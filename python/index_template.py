@@ -0,0 +1,70 @@
+"""
+Template di index.html precompilato per l'inserimento dei meta tag dinamici
+"""
+import hashlib
+import os
+import threading
+
+
+class IndexTemplate:
+    """
+    Divide index.html una sola volta in prefisso e suffisso (bytes) attorno al
+    blocco dei meta tag social. Il file viene riletto solo quando cambia l'mtime.
+    """
+
+    START_MARKER = '<!-- Social Media Sharing Preview Metadata -->'
+    END_MARKER = '<!-- Server-side rendered meta elements will be generated here -->'
+
+    def __init__(self, path='index.html'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        # (prefix, suffix, raw, version) sostituiti in blocco ad ogni ricarica
+        self._segments = (b'', b'', b'', '')
+
+    def _compile(self, content):
+        meta_start = content.find(self.START_MARKER)
+        meta_end = content.find(self.END_MARKER)
+
+        if meta_start != -1 and meta_end != -1:
+            # Mantieni il commento iniziale e sostituisci i meta tag statici
+            prefix = content[:meta_start] + self.START_MARKER + '\n    '
+            suffix = '\n    ' + content[meta_end:]
+        else:
+            # Fallback: aggiungi i meta tag prima della chiusura del head
+            head_end = content.find('</head>')
+            if head_end != -1:
+                prefix = content[:head_end] + '    '
+                suffix = '\n' + content[head_end:]
+            else:
+                prefix, suffix = content, ''
+
+        raw = content.encode('utf-8')
+        version = hashlib.sha1(raw).hexdigest()[:16]
+        return prefix.encode('utf-8'), suffix.encode('utf-8'), raw, version
+
+    def refresh(self):
+        """Ricarica il template se il file è cambiato su disco"""
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._segments = self._compile(f.read())
+            self._mtime = mtime
+
+    def render(self, meta_tags_html):
+        """Ritorna (body, etag) con i meta tag inseriti nel template"""
+        self.refresh()
+        prefix, suffix, _, version = self._segments
+        meta = meta_tags_html.encode('utf-8')
+        etag = f"{version}-{hashlib.blake2b(meta, digest_size=8).hexdigest()}"
+        return prefix + meta + suffix, etag
+
+    def static(self):
+        """Ritorna (body, etag) del file originale senza modifiche"""
+        self.refresh()
+        _, _, raw, version = self._segments
+        return raw, version
@@ -0,0 +1,160 @@
+"""
+Logging strutturato e non bloccante
+
+I record vengono messi in coda dal thread della richiesta e scritti su stdout
+da un thread dedicato (QueueListener), in JSON oppure in testo. Il livello si
+imposta con LOG_LEVEL; LOG_SAMPLING campiona per logger i record sotto WARNING
+(es. "security_middleware.cf=0.01" tiene l'1% delle righe degli header CF).
+Warning ed errori non vengono mai scartati.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+DEFAULT_SAMPLING = 'security_middleware.cf=0.01'
+
+# Attributi standard di LogRecord: tutto il resto arriva da extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Un oggetto JSON per riga con i campi passati in extra"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Tiene una frazione dei record sotto WARNING per i logger configurati"""
+
+    def __init__(self, rates):
+        super().__init__()
+        # Prefissi più lunghi prima: 'a.b' prevale su 'a'
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+        self.dropped = 0
+
+    @staticmethod
+    def parse(spec):
+        """'logger=rate,logger=rate' -> dict"""
+        rates = {}
+        for part in (spec or '').split(','):
+            name, sep, rate = part.partition('=')
+            if sep and name.strip():
+                rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+        return rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                if rate < 1.0 and random.random() >= rate:
+                    self.dropped += 1
+                    return False
+                return True
+        return True
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Come QueueHandler, ma conserva i campi extra e la traceback separata
+    dal messaggio invece di pre-formattare il record nel thread chiamante.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass  # Mai bloccare la richiesta per un log
+
+
+_state = {}
+_lock = threading.Lock()
+
+
+def _restart_after_fork():
+    """I thread non sopravvivono al fork: ogni worker riparte con coda e listener propri"""
+    if not _state:
+        return
+    new_queue = queue.Queue(_state['queue_size'])
+    _state['handler'].queue = new_queue
+    listener = logging.handlers.QueueListener(new_queue, *_state['listener'].handlers,
+                                              respect_handler_level=True)
+    listener.start()
+    _state['listener'] = listener
+
+
+def setup_logging():
+    """
+    Configura il logger root una sola volta per processo.
+    LOG_LEVEL (INFO), LOG_FORMAT (json|text), LOG_SAMPLING, LOG_QUEUE_SIZE.
+    """
+    with _lock:
+        if _state:
+            return _state['handler']
+
+        level = os.environ.get('LOG_LEVEL', 'INFO').upper()
+        queue_size = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+        stream = logging.StreamHandler(sys.stdout)
+        if os.environ.get('LOG_FORMAT', 'json').lower() == 'text':
+            stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        else:
+            stream.setFormatter(JsonFormatter())
+
+        log_queue = queue.Queue(queue_size)
+        handler = StructuredQueueHandler(log_queue)
+        handler.addFilter(SamplingFilter(SamplingFilter.parse(os.environ.get('LOG_SAMPLING', DEFAULT_SAMPLING))))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level)
+
+        listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+        listener.start()
+
+        _state.update(handler=handler, listener=listener, queue_size=queue_size)
+        atexit.register(shutdown_logging)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_after_fork)
+        return handler
+
+
+def shutdown_logging():
+    """Svuota la coda e ferma il listener (chiamata all'uscita del processo)"""
+    with _lock:
+        listener = _state.get('listener')
+        if listener is not None and listener._thread is not None:
+            listener.stop()
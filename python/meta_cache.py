@@ -0,0 +1,275 @@
+"""
+Cache TTL/LRU per i meta tag delle anteprime dei post
+
+Le richieste concorrenti per la stessa chiave vengono collassate in una sola
+chiamata upstream (single-flight). Opzionalmente i valori vengono condivisi
+tra i worker gunicorn tramite un file SQLite. Le voci scadute restano
+disponibili per stale_ttl secondi, per servirle mentre si ricaricano.
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from python import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    """LRU in memoria con scadenza per voce"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Ritorna (value, expires_at) oppure None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[1], entry[0]
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SqliteCacheBackend:
+    """Backend condiviso tra processi basato su un file SQLite"""
+
+    EVICT_EVERY = 64
+
+    def __init__(self, path, max_entries=10000, stale_ttl=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._local = threading.local()
+        self._writes = 0
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS meta_cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+
+    def _connect(self):
+        # Una connessione per thread e per processo (i worker sono forkati dal master)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _key(self, key):
+        return '/'.join(key) if isinstance(key, tuple) else str(key)
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute('SELECT value, expires_at FROM meta_cache WHERE key = ?',
+                           (self._key(key),)).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE meta_cache SET accessed_at = ? WHERE key = ?',
+                     (time.time(), self._key(key)))
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, expires_at):
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO meta_cache (key, value, expires_at, accessed_at) '
+                     'VALUES (?, ?, ?, ?)',
+                     (self._key(key), json.dumps(value), expires_at, time.time()))
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self._evict(conn)
+
+    def _evict(self, conn):
+        conn.execute('DELETE FROM meta_cache WHERE expires_at < ?', (time.time() - self.stale_ttl,))
+        conn.execute(
+            'DELETE FROM meta_cache WHERE key IN ('
+            'SELECT key FROM meta_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM meta_cache WHERE key = ?', (self._key(key),))
+
+    def clear(self):
+        self._connect().execute('DELETE FROM meta_cache')
+
+
+class MetaCache:
+    """
+    Cache a due livelli (memoria locale + backend condiviso opzionale)
+    con single-flight sulle chiavi mancanti.
+    """
+
+    def __init__(self, ttl=300, max_entries=1024, shared_backend=None, stale_ttl=86400):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.local = MemoryCacheBackend(max_entries)
+        self.shared = shared_backend
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @classmethod
+    def from_env(cls):
+        """Crea la cache leggendo la configurazione dalle variabili d'ambiente"""
+        ttl = int(os.environ.get('META_CACHE_TTL', 300))
+        stale_ttl = int(os.environ.get('META_CACHE_STALE_TTL', 86400))
+        max_entries = int(os.environ.get('META_CACHE_SIZE', 1024))
+        shared = None
+        if os.environ.get('META_CACHE_BACKEND', 'memory').lower() == 'sqlite':
+            path = os.environ.get('META_CACHE_PATH',
+                                  os.path.join(tempfile.gettempdir(), 'cur8fun_meta_cache.sqlite'))
+            try:
+                shared = SqliteCacheBackend(path, max_entries=max_entries * 10, stale_ttl=stale_ttl)
+            except sqlite3.Error as e:
+                logger.warning(f"Meta cache: shared backend disabled ({e})")
+        return cls(ttl=ttl, max_entries=max_entries, shared_backend=shared, stale_ttl=stale_ttl)
+
+    def _lookup(self, key, min_expires_at):
+        """Valore con scadenza successiva a min_expires_at, dalla memoria o dal backend condiviso"""
+        entry = self.local.get(key)
+        if entry is not None and entry[1] > min_expires_at:
+            return dict(entry[0])
+        if self.shared is not None:
+            try:
+                entry = self.shared.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"Meta cache: shared backend read failed: {e}")
+                entry = None
+            if entry is not None and entry[1] > min_expires_at:
+                self.local.set(key, entry[0], entry[1])
+                return dict(entry[0])
+        return None
+
+    def get(self, key):
+        """Ritorna una copia del valore se presente e non scaduto"""
+        return self._lookup(key, time.time())
+
+    def get_stale(self, key):
+        """Ritorna il valore anche se scaduto, purché entro stale_ttl"""
+        return self._lookup(key, time.time() - self.stale_ttl)
+
+    def lookup(self, key):
+        """Come get, ma conta l'esito come hit (i miss li conta chi poi carica la chiave)"""
+        value = self.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            metrics.META_CACHE_REQUESTS.labels('hit').inc()
+        return value
+
+    def set(self, key, value, expires_at=None):
+        if expires_at is None:
+            expires_at = time.time() + self.ttl
+        self.local.set(key, value, expires_at)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, expires_at)
+            except sqlite3.Error as e:
+                logger.warning(f"Meta cache: shared backend write failed: {e}")
+
+    def _begin_load(self, key):
+        """Ritorna (future, leader): solo il leader deve eseguire il loader"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                metrics.META_CACHE_REQUESTS.labels('coalesced').inc()
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self.misses += 1
+        metrics.META_CACHE_REQUESTS.labels('miss').inc()
+        return future, True
+
+    def _run_loader(self, key, loader, future):
+        try:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+            future.set_result(value)
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get_or_load(self, key, loader):
+        """
+        Ritorna il valore in cache oppure lo carica con loader().
+        Un solo thread per chiave esegue il loader, gli altri ne attendono il risultato.
+        I valori None non vengono memorizzati.
+        """
+        value = self.lookup(key)
+        if value is not None:
+            return value
+
+        future, leader = self._begin_load(key)
+        if leader:
+            self._run_loader(key, loader, future)
+        value = future.result()
+        return dict(value) if value is not None else None
+
+    def get_or_load_async(self, key, loader, executor):
+        """
+        Come get_or_load, ma il loader gira su executor e viene ritornato un Future.
+        Il caricamento prosegue (e riempie la cache) anche se il chiamante smette di attendere.
+        Il risultato del Future è condiviso: va copiato prima di modificarlo.
+        """
+        value = self.lookup(key)
+        if value is not None:
+            future = Future()
+            future.set_result(value)
+            return future
+
+        future, leader = self._begin_load(key)
+        if leader:
+            executor.submit(self._run_loader, key, loader, future)
+        return future
+
+    def invalidate(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def stats(self):
+        return {
+            'entries': len(self.local),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'ttl': self.ttl,
+            'stale_ttl': self.stale_ttl,
+            'shared_backend': type(self.shared).__name__ if self.shared else None
+        }
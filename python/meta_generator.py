@@ -1,8 +1,19 @@
 """
 Servizio per generare meta tag dinamici HTML
 """
+import html
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
 from python.steem_client import steem_client
+from python.meta_cache import MetaCache
+from python.preview_store import PreviewSnapshotStore
+from python import metrics
+
+logger = logging.getLogger(__name__)
 
 class MetaTagGenerator:
     def __init__(self):
@@ -13,36 +24,137 @@ class MetaTagGenerator:
             'url': 'https://cur8.fun/',
             'type': 'website'
         }
+        # Cache condivisa dei meta dei post, chiave (author, permlink)
+        self.cache = MetaCache.from_env()
+        # Snapshot persistenti nel database (attivi dopo init_app)
+        self.snapshots = PreviewSnapshotStore.from_env()
+        self.use_snapshots = os.environ.get('META_SNAPSHOTS', 'true').lower() == 'true'
+        self.snapshot_hits = 0
+        # Tempo massimo di attesa dei meta freschi (0 = attendi sempre la risposta upstream)
+        self.render_deadline = float(os.environ.get('META_RENDER_DEADLINE_MS', 0)) / 1000.0
+        self.refresh_workers = int(os.environ.get('META_REFRESH_WORKERS', 4))
+        self.deadline_misses = 0
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+    
+    def init_app(self, app):
+        """Abilita gli snapshot delle anteprime nel database dell'app"""
+        if self.use_snapshots:
+            self.snapshots.init_app(app)
     
     def generate_post_meta(self, author, permlink, base_url='https://cur8.fun'):
         """Genera meta tag per un post specifico"""
+        url = f"{base_url}/@{author}/{permlink}"
+        key = (author, permlink)
+        loader = lambda: self._fetch_post_meta(author, permlink)
         try:
-            post = steem_client.get_content(author, permlink)
-            
-            if not post or post.get('id', 0) == 0:
-                print(f"Warning: Post not found @{author}/{permlink}, using default meta")
-                return self.generate_default_meta(f"{base_url}/@{author}/{permlink}")
-            
-            # Estrai immagine e metadata
-            metadata = steem_client.parse_metadata(post.get('json_metadata', ''))
-            image_url = steem_client.extract_image_from_post(post.get('body', ''), metadata)
-            
-            # Crea descrizione
-            description = steem_client.create_description(post.get('body', ''), 160)
-            
-            return {
-                'title': post.get('title', 'Post su Steem'),
-                'description': description,
-                'image': image_url or self.default_meta['image'],
-                'url': f"{base_url}/@{author}/{permlink}",
-                'type': 'article',
-                'author': author,
-                'published_time': post.get('created', ''),
-                'site_name': 'cur8.fun'
-            }
+            # Memoria, poi snapshot nel database, poi Steem
+            meta = self.cache.lookup(key)
+            if meta is None and self.snapshots.enabled:
+                meta = self._get_snapshot(key, loader)
+            if meta is None and self.render_deadline > 0:
+                meta = self._get_within_deadline(key, loader)
+            elif meta is None:
+                meta = self.cache.get_or_load(key, loader)
         except Exception as e:
-            print(f"Error generating post meta for @{author}/{permlink}: {e}")
-            return self.generate_default_meta(f"{base_url}/@{author}/{permlink}")
+            logger.error(f"Error generating post meta for @{author}/{permlink}: {e}")
+            return self.generate_default_meta(url)
+
+        if not meta:
+            return self.generate_default_meta(url)
+
+        # L'URL dipende dalla richiesta, quindi non fa parte del valore in cache:
+        # si lavora su una copia (lo snapshot è lo stesso oggetto messo in cache)
+        meta = dict(meta)
+        meta['url'] = url
+        return meta
+
+    def _get_snapshot(self, key, loader):
+        """
+        Meta dallo snapshot persistente, anche se vecchio: in quel caso il fetch
+        parte in background (single-flight) e aggiorna cache e snapshot.
+        """
+        snapshot = self.snapshots.get(*key)
+        if snapshot is None:
+            return None
+        meta, fetched_at = snapshot
+        with self._stats_lock:
+            self.snapshot_hits += 1
+        metrics.META_CACHE_REQUESTS.labels('snapshot').inc()
+        age = (datetime.utcnow() - fetched_at).total_seconds()
+        if age < self.cache.ttl:
+            self.cache.set(key, meta, expires_at=time.time() + self.cache.ttl - age)
+        else:
+            self.cache.get_or_load_async(key, loader, self._get_executor())
+        return meta
+    
+    def _get_within_deadline(self, key, loader):
+        """
+        Meta fresca se arriva entro render_deadline, altrimenti l'ultima in cache
+        (anche scaduta) oppure None. Il fetch continua in background e riempie la cache.
+        """
+        future = self.cache.get_or_load_async(key, loader, self._get_executor())
+        try:
+            value = future.result(timeout=self.render_deadline)
+            return dict(value) if value is not None else None
+        except FutureTimeout:
+            with self._stats_lock:
+                self.deadline_misses += 1
+            metrics.META_DEADLINE_MISSES.inc()
+            logger.info(f"Meta for @{key[0]}/{key[1]} not ready within {self.render_deadline * 1000:.0f} ms, serving cached/default meta")
+            return self.cache.get_stale(key)
+    
+    def _get_executor(self):
+        # Creato per processo: i thread del master non sopravvivono al fork dei worker
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._executor_lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.refresh_workers,
+                                                        thread_name_prefix='meta-refresh')
+                    self._executor_pid = os.getpid()
+        return self._executor
+    
+    def get_stats(self):
+        """Statistiche della cache e della modalità con deadline"""
+        return dict(self.cache.stats(),
+                    render_deadline_ms=self.render_deadline * 1000,
+                    deadline_misses=self.deadline_misses,
+                    snapshot_hits=self.snapshot_hits,
+                    snapshots=self.snapshots.stats())
+    
+    def _fetch_post_meta(self, author, permlink):
+        """Scarica il post e costruisce i meta tag (senza url); None se non trovato"""
+        post = steem_client.get_content(author, permlink)
+
+        if not post or post.get('id', 0) == 0:
+            logger.warning(f"Post not found @{author}/{permlink}, using default meta")
+            return None
+
+        # Estrai metadata, poi immagine e descrizione con una sola scansione del body
+        metadata = steem_client.parse_metadata(post.get('json_metadata', ''))
+        image_url, description = steem_client.build_preview(post.get('body', ''), metadata, 160)
+
+        meta = {
+            'title': post.get('title', 'Post su Steem'),
+            'description': description,
+            'image': image_url or self.default_meta['image'],
+            'type': 'article',
+            'author': author,
+            'published_time': post.get('created', ''),
+            'site_name': 'cur8.fun'
+        }
+        if self.snapshots.enabled:
+            self.snapshots.save(author, permlink, meta, self._parse_time(post.get('last_update')))
+        return meta
+    
+    @staticmethod
+    def _parse_time(value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S')
+        except (TypeError, ValueError):
+            return None
     
     def generate_profile_meta(self, username, base_url='https://cur8.fun'):
         """Genera meta tag per un profilo utente"""
@@ -50,7 +162,7 @@ class MetaTagGenerator:
             accounts = steem_client.get_accounts([username])
             
             if not accounts:
-                print(f"Warning: Profile not found @{username}, using default meta")
+                logger.warning(f"Profile not found @{username}, using default meta")
                 return self.generate_default_meta(f"{base_url}/@{username}")
             
             account = accounts[0]
@@ -73,7 +185,7 @@ class MetaTagGenerator:
                 'site_name': 'cur8.fun'
             }
         except Exception as e:
-            print(f"Error generating profile meta for @{username}: {e}")
+            logger.error(f"Error generating profile meta for @{username}: {e}")
             return self.generate_default_meta(f"{base_url}/@{username}")
     
     def generate_default_meta(self, url=None):
@@ -85,40 +197,46 @@ class MetaTagGenerator:
     
     def generate_meta_tags_html(self, meta_data):
         """Genera HTML per i meta tag"""
+        # Ogni campo viene escapato una sola volta
+        title = self.escape_html(meta_data["title"])
+        description = self.escape_html(meta_data["description"])
+        image = self.escape_html(meta_data["image"])
+        url = self.escape_html(meta_data["url"])
+        
         html_parts = []
         
         # Title
-        html_parts.append(f'<title>{self.escape_html(meta_data["title"])}</title>')
+        html_parts.append(f'<title>{title}</title>')
         
         # Open Graph
-        html_parts.append(f'<meta property="og:title" content="{self.escape_html(meta_data["title"])}" />')
-        html_parts.append(f'<meta property="og:description" content="{self.escape_html(meta_data["description"])}" />')
-        html_parts.append(f'<meta property="og:image" content="{self.escape_html(meta_data["image"])}" />')
-        html_parts.append(f'<meta property="og:url" content="{self.escape_html(meta_data["url"])}" />')
-        html_parts.append(f'<meta property="og:type" content="{meta_data["type"]}" />')
-        html_parts.append(f'<meta property="og:site_name" content="{meta_data.get("site_name", "cur8.fun")}" />')
+        html_parts.append(f'<meta property="og:title" content="{title}" />')
+        html_parts.append(f'<meta property="og:description" content="{description}" />')
+        html_parts.append(f'<meta property="og:image" content="{image}" />')
+        html_parts.append(f'<meta property="og:url" content="{url}" />')
+        html_parts.append(f'<meta property="og:type" content="{self.escape_html(meta_data["type"])}" />')
+        html_parts.append(f'<meta property="og:site_name" content="{self.escape_html(meta_data.get("site_name", "cur8.fun"))}" />')
         
         # Open Graph image dimensions
         html_parts.append('<meta property="og:image:width" content="1200" />')
         html_parts.append('<meta property="og:image:height" content="630" />')
-        html_parts.append(f'<meta property="og:image:alt" content="{self.escape_html(meta_data["title"])}" />')
+        html_parts.append(f'<meta property="og:image:alt" content="{title}" />')
         
         # Twitter Card
         card_type = 'summary_large_image' if meta_data.get('image') else 'summary'
         html_parts.append(f'<meta name="twitter:card" content="{card_type}" />')
-        html_parts.append(f'<meta name="twitter:title" content="{self.escape_html(meta_data["title"])}" />')
-        html_parts.append(f'<meta name="twitter:description" content="{self.escape_html(meta_data["description"])}" />')
-        html_parts.append(f'<meta name="twitter:image" content="{self.escape_html(meta_data["image"])}" />')
+        html_parts.append(f'<meta name="twitter:title" content="{title}" />')
+        html_parts.append(f'<meta name="twitter:description" content="{description}" />')
+        html_parts.append(f'<meta name="twitter:image" content="{image}" />')
         
         # Article specific tags
         if meta_data.get('type') == 'article':
             if meta_data.get('author'):
-                html_parts.append(f'<meta property="article:author" content="https://cur8.fun/@{meta_data["author"]}" />')
+                html_parts.append(f'<meta property="article:author" content="https://cur8.fun/@{self.escape_html(meta_data["author"])}" />')
             if meta_data.get('published_time'):
-                html_parts.append(f'<meta property="article:published_time" content="{meta_data["published_time"]}" />')
+                html_parts.append(f'<meta property="article:published_time" content="{self.escape_html(meta_data["published_time"])}" />')
         
         # Description meta tag
-        html_parts.append(f'<meta name="description" content="{self.escape_html(meta_data["description"])}" />')
+        html_parts.append(f'<meta name="description" content="{description}" />')
         
         return '\n    '.join(html_parts)
     
@@ -126,12 +244,7 @@ class MetaTagGenerator:
         """Escape caratteri HTML"""
         if not text:
             return ''
-        return (str(text)
-                .replace('&', '&amp;')
-                .replace('<', '&lt;')
-                .replace('>', '&gt;')
-                .replace('"', '&quot;')
-                .replace("'", '&#x27;'))
+        return html.escape(str(text), quote=True)
 
 # Istanza globale
 meta_generator = MetaTagGenerator()
@@ -0,0 +1,146 @@
+"""
+Metriche Prometheus per /metrics
+
+Con PROMETHEUS_MULTIPROC_DIR impostata (gunicorn.conf.py lo fa di default)
+ogni worker scrive i propri valori in file mmap nella directory e /metrics li
+aggrega tutti. Senza prometheus_client le funzioni di registrazione non fanno nulla.
+"""
+import os
+import threading
+import time
+
+from flask import request
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                                   Histogram, generate_latest, multiprocess)
+except ImportError:  # prometheus_client è opzionale: senza, /metrics risponde 503
+    Counter = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+enabled = Counter is not None
+
+if enabled:
+    HTTP_REQUEST_LATENCY = Histogram(
+        'cur8fun_http_request_duration_seconds', 'Flask request latency by route',
+        ['method', 'route', 'status'], buckets=LATENCY_BUCKETS)
+    STEEM_RPC_LATENCY = Histogram(
+        'cur8fun_steem_rpc_duration_seconds', 'Steem JSON-RPC call latency by method',
+        ['method'], buckets=LATENCY_BUCKETS)
+    STEEM_RPC_ERRORS = Counter(
+        'cur8fun_steem_rpc_errors_total', 'Failed Steem JSON-RPC calls by method', ['method'])
+    META_CACHE_REQUESTS = Counter(
+        'cur8fun_meta_cache_requests_total', 'Meta cache lookups by result (hit, snapshot, miss, coalesced)',
+        ['result'])
+    SPA_ROUTING = Counter(
+        'cur8fun_spa_routing_total', 'SPA page requests by routing decision (crawler, browser)', ['route'])
+    META_DEADLINE_MISSES = Counter(
+        'cur8fun_meta_render_deadline_misses_total', 'Post previews served before fresh meta was ready')
+    PUBLISHER_TICK = Histogram(
+        'cur8fun_publisher_tick_duration_seconds', 'Duration of a publisher claim-and-publish pass',
+        buckets=LAG_BUCKETS)
+    PUBLISHER_DUE_BACKLOG = Gauge(
+        'cur8fun_publisher_due_backlog', 'Scheduled posts already due and not yet published',
+        multiprocess_mode='livemax')
+    PUBLISHER_LAG = Histogram(
+        'cur8fun_publisher_publish_lag_seconds', 'Publish time minus scheduled_datetime',
+        buckets=LAG_BUCKETS)
+    PUBLISHER_RESULTS = Counter(
+        'cur8fun_publisher_posts_total', 'Publish attempts by result', ['result'])
+else:
+    HTTP_REQUEST_LATENCY = STEEM_RPC_LATENCY = STEEM_RPC_ERRORS = _NoopMetric()
+    META_CACHE_REQUESTS = META_DEADLINE_MISSES = SPA_ROUTING = _NoopMetric()
+    PUBLISHER_TICK = PUBLISHER_DUE_BACKLOG = PUBLISHER_LAG = PUBLISHER_RESULTS = _NoopMetric()
+
+
+def observe_steem_call(method, seconds, error=False):
+    STEEM_RPC_LATENCY.labels(method).observe(seconds)
+    if error:
+        STEEM_RPC_ERRORS.labels(method).inc()
+
+
+def init_app(app):
+    """Registra la latenza di ogni richiesta Flask, etichettata con la regola di routing"""
+    if not enabled:
+        return
+
+    @app.before_request
+    def start_timer():
+        request.environ['cur8fun.start_time'] = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        start = request.environ.get('cur8fun.start_time')
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            HTTP_REQUEST_LATENCY.labels(request.method, route, str(response.status_code)) \
+                .observe(time.perf_counter() - start)
+        return response
+
+
+def start_http_server(port, addr='0.0.0.0'):
+    """
+    Espone le metriche di questo processo su http://addr:port/ in un thread.
+    Serve ai processi fuori da gunicorn (il publisher), che /metrics non vede.
+    """
+    if not enabled:
+        return False
+    from prometheus_client import start_http_server as serve
+    serve(port, addr)
+    return True
+
+
+class MetricsExporter:
+    """
+    Produce il testo per /metrics. L'output viene riutilizzato per cache_seconds,
+    così scrape ravvicinati non rileggono i file di tutti i worker.
+    """
+
+    def __init__(self, cache_seconds=None):
+        if cache_seconds is None:
+            cache_seconds = float(os.environ.get('METRICS_CACHE_SECONDS', 1))
+        self.cache_seconds = cache_seconds
+        self._lock = threading.Lock()
+        self._output = None
+        self._output_at = 0.0
+
+    @property
+    def content_type(self):
+        return CONTENT_TYPE_LATEST if enabled else 'text/plain; charset=utf-8'
+
+    def _collect(self):
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return generate_latest(registry)
+        return generate_latest(REGISTRY)
+
+    def render(self):
+        """Ritorna i bytes in formato testo Prometheus, oppure None se prometheus_client manca"""
+        if not enabled:
+            return None
+        with self._lock:
+            if self._output is None or time.monotonic() - self._output_at >= self.cache_seconds:
+                self._output = self._collect()
+                self._output_at = time.monotonic()
+            return self._output
+
+
+exporter = MetricsExporter()
@@ -0,0 +1,53 @@
+"""
+Lightweight schema migrations.
+
+db.create_all() only creates missing tables, so columns and indexes added to
+existing models are applied here. Every step is idempotent and safe to run at
+each startup (and from the Procfile release phase).
+"""
+import logging
+
+from sqlalchemy import inspect, text
+
+from python.models import db, PostPreview, PublisherHeartbeat, ScheduledPost
+
+logger = logging.getLogger(__name__)
+
+# Models whose tables are upgraded in place
+MIGRATED_MODELS = [ScheduledPost, PostPreview, PublisherHeartbeat]
+
+
+def _add_missing_columns(conn, table, existing_columns):
+    preparer = conn.dialect.identifier_preparer
+    for column in table.columns:
+        if column.name in existing_columns:
+            continue
+        ddl = (f"ALTER TABLE {preparer.format_table(table)} "
+               f"ADD COLUMN {preparer.format_column(column)} "
+               f"{column.type.compile(dialect=conn.dialect)}")
+        if column.server_default is not None:
+            ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+        conn.execute(text(ddl))
+        logger.info(f"Migration: added column {table.name}.{column.name}")
+
+
+def _add_missing_indexes(conn, table, existing_indexes):
+    for index in table.indexes:
+        if index.name not in existing_indexes:
+            index.create(conn)
+            logger.info(f"Migration: created index {index.name}")
+
+
+def upgrade_schema():
+    """Bring existing tables up to date with the models (requires an app context)"""
+    db.create_all()
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for model in MIGRATED_MODELS:
+            table = model.__table__
+            existing_columns = {c['name'] for c in inspector.get_columns(table.name)}
+            existing_indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+            _add_missing_columns(conn, table, existing_columns)
+            _add_missing_indexes(conn, table, existing_indexes)
@@ -1,9 +1,21 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy.ext.hybrid import hybrid_property
 
 db = SQLAlchemy()
 
 class ScheduledPost(db.Model):
+    __table_args__ = (
+        # Publisher hot query: status == 'scheduled' AND scheduled_datetime <= now
+        db.Index('ix_scheduled_post_status_datetime', 'status', 'scheduled_datetime'),
+        # Per-user keyset pagination ordered by (scheduled_datetime, id)
+        db.Index('ix_scheduled_post_username_datetime', 'username', 'scheduled_datetime'),
+        # Posts waiting for a retry or for their account's next posting slot
+        db.Index('ix_scheduled_post_status_next_attempt', 'status', 'next_attempt_at'),
+        # Recent root posts per account, for the publisher's rate limit
+        db.Index('ix_scheduled_post_username_published', 'username', 'published_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), nullable=False, index=True)
     title = db.Column(db.String(255), nullable=False)
@@ -14,17 +26,59 @@ class ScheduledPost(db.Model):
     scheduled_datetime = db.Column(db.DateTime, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(32), default='scheduled')  # scheduled, published, failed
+    # Lease held by the publisher instance currently publishing the post
+    claimed_by = db.Column(db.String(128))
+    claimed_until = db.Column(db.DateTime)
+    # Broadcasts that failed so far and the last error, kept while the post is retried
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_error = db.Column(db.Text)
+    # Set by the publisher when a retry or the account rate limit postpones the post;
+    # scheduled_datetime always keeps the time chosen by the user
+    next_attempt_at = db.Column(db.DateTime)
+    published_at = db.Column(db.DateTime)
+
+    @hybrid_property
+    def due_time(self):
+        """When the publisher should next try the post"""
+        return self.next_attempt_at or self.scheduled_datetime
+
+    @due_time.expression
+    def due_time(cls):
+        return db.func.coalesce(cls.next_attempt_at, cls.scheduled_datetime)
+
+    # Fields exposed by to_dict, in output order
+    SERIALIZABLE_FIELDS = ('id', 'username', 'title', 'body', 'tags', 'community', 'permlink',
+                           'scheduled_datetime', 'created_at', 'status', 'attempts', 'last_error',
+                           'next_attempt_at', 'published_at')
+
+    def to_dict(self, fields=None):
+        # Only the requested fields are read, so deferred columns are never loaded
+        data = {}
+        for name in fields or self.SERIALIZABLE_FIELDS:
+            value = getattr(self, name)
+            if name == 'tags':
+                value = value.split(',') if value else []
+            elif name in ('scheduled_datetime', 'created_at', 'next_attempt_at', 'published_at'):
+                value = value.isoformat() if value is not None else None
+            data[name] = value
+        return data
+
+
+class PublisherHeartbeat(db.Model):
+    """Liveness of each running publisher process, read by /api/publisher/status"""
+    # hostname:pid:random, written by the instance itself
+    instance = db.Column(db.String(128), primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False)
+    last_seen = db.Column(db.DateTime, nullable=False, index=True)
+    # Seconds between database reconciles of the instance (check_interval in the status)
+    reconcile_interval = db.Column(db.Integer)
+
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "username": self.username,
-            "title": self.title,
-            "body": self.body,
-            "tags": self.tags.split(',') if self.tags else [],
-            "community": self.community,
-            "permlink": self.permlink,
-            "scheduled_datetime": self.scheduled_datetime.isoformat(),
-            "created_at": self.created_at.isoformat(),
-            "status": self.status
-        }
\ No newline at end of file
+class PostPreview(db.Model):
+    """Snapshot dei meta di anteprima di un post: sopravvive a restart e riciclo dei worker"""
+    author = db.Column(db.String(64), primary_key=True)
+    permlink = db.Column(db.String(255), primary_key=True)
+    meta_json = db.Column(db.Text, nullable=False)
+    # last_update del post su Steem al momento del fetch
+    last_update = db.Column(db.DateTime)
+    fetched_at = db.Column(db.DateTime, nullable=False, index=True)
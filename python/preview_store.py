@@ -0,0 +1,119 @@
+"""
+Snapshot persistenti dei meta di anteprima dei post (tabella post_preview)
+
+Le cache in memoria si perdono a ogni deploy e quando gunicorn ricicla un worker
+(max_requests): gli snapshot nel database permettono di servire subito i link
+già visti, mentre quelli vecchi vengono aggiornati in background da meta_generator.
+Gli errori del database vengono solo loggati: l'anteprima ricade sul fetch da Steem.
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from python.models import db, PostPreview
+
+logger = logging.getLogger(__name__)
+
+UPSERT_INSERTS = {'postgresql': postgresql_insert, 'sqlite': sqlite_insert}
+
+
+class PreviewSnapshotStore:
+    def __init__(self, retention_days=30, prune_every=1000):
+        self.app = None
+        self.retention = timedelta(days=retention_days)
+        self.prune_every = prune_every
+        self.reads = 0
+        self.found = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(retention_days=int(os.environ.get('META_SNAPSHOT_RETENTION_DAYS', 30)))
+
+    @property
+    def enabled(self):
+        return self.app is not None
+
+    def init_app(self, app):
+        self.app = app
+
+    def get(self, author, permlink):
+        """(meta, fetched_at) dello snapshot, oppure None"""
+        with self.app.app_context():
+            try:
+                row = db.session.execute(
+                    select(PostPreview.meta_json, PostPreview.fetched_at)
+                    .where(PostPreview.author == author, PostPreview.permlink == permlink)
+                ).first()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                logger.warning(f"Preview snapshot read failed for @{author}/{permlink}: {e}")
+                return None
+        with self._lock:
+            self.reads += 1
+            self.found += row is not None
+        if row is None:
+            return None
+        return json.loads(row.meta_json), row.fetched_at
+
+    def save(self, author, permlink, meta, last_update=None):
+        """Inserisce o aggiorna lo snapshot (un solo statement su PostgreSQL e SQLite)"""
+        values = {
+            'author': author,
+            'permlink': permlink,
+            'meta_json': json.dumps(meta, separators=(',', ':')),
+            'last_update': last_update,
+            'fetched_at': datetime.utcnow(),
+        }
+        with self.app.app_context():
+            try:
+                insert = UPSERT_INSERTS.get(db.engine.dialect.name)
+                if insert is not None:
+                    stmt = insert(PostPreview).values(**values)
+                    db.session.execute(stmt.on_conflict_do_update(
+                        index_elements=['author', 'permlink'],
+                        set_={name: stmt.excluded[name] for name in ('meta_json', 'last_update', 'fetched_at')}
+                    ))
+                else:
+                    db.session.merge(PostPreview(**values))
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                logger.warning(f"Preview snapshot write failed for @{author}/{permlink}: {e}")
+                return
+            with self._lock:
+                self.writes += 1
+                prune = self.writes % self.prune_every == 0
+            if prune:
+                self.prune()
+
+    def prune(self):
+        """Elimina gli snapshot non aggiornati da più di retention (richiede un app context)"""
+        try:
+            result = db.session.execute(
+                delete(PostPreview).where(PostPreview.fetched_at < datetime.utcnow() - self.retention)
+            )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning(f"Preview snapshot prune failed: {e}")
+            return
+        if result.rowcount:
+            logger.info(f"Pruned {result.rowcount} preview snapshots older than {self.retention.days} days")
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'reads': self.reads,
+            'found': self.found,
+            'writes': self.writes,
+            'retention_days': self.retention.days
+        }
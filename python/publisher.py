@@ -2,35 +2,182 @@
 Scheduled Post Publisher Service
 
 This service handles the automatic publishing of scheduled posts.
-For testing purposes, this demonstrates the basic logic without actual blockchain publishing.
+
+In production it runs as its own process (Procfile `worker:`, see python.publisher_main):
+
+    python -m python.publisher_main
+
+Web processes wake a publisher running elsewhere with PostgreSQL NOTIFY on
+WAKEUP_CHANNEL (payload: [[post_id, due time or null], ...]); the periodic
+reconcile is only a safety net, and the only trigger on databases without NOTIFY.
+Each running instance refreshes its row in publisher_heartbeat, which is what
+/api/publisher/status reports; the standalone process also serves its own
+Prometheus metrics on PUBLISHER_METRICS_PORT (the web /metrics only aggregates
+gunicorn workers).
 """
 
+import heapq
+import json
+import os
+import queue
+import random
+import re
+import selectors
+import socket
+import uuid
 import time
 import threading
 import logging
-from datetime import datetime, timedelta
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional
 
-from python.models import db, ScheduledPost
+from sqlalchemy import and_, bindparam, func, or_, select, text, update
+from sqlalchemy.exc import SQLAlchemyError
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+from python.broadcaster import BroadcastError, create_broadcaster
+from python.models import db, PublisherHeartbeat, ScheduledPost
+from python import metrics
+
+# La configurazione (coda, formato JSON, livello) è in python.logging_setup
 logger = logging.getLogger(__name__)
 
+# PostgreSQL channel on which other processes announce due-time changes
+WAKEUP_CHANNEL = 'cur8fun_scheduled_posts'
+# Entries per NOTIFY, keeping the payload well under PostgreSQL's 8000 bytes
+WAKEUP_BATCH = 100
+
+
+class PublishResult(NamedTuple):
+    """Outcome of one post: published, retry (backoff), deferred (rate limit) or failed"""
+    post_id: int
+    kind: str
+    error: Optional[str] = None
+    retry_at: Optional[datetime] = None
+
+
+class AccountRateLimiter:
+    """
+    Token bucket per account for root posts, rebuilt from the database.
+    
+    Each account holds up to `burst` tokens and regains one every `interval` seconds
+    (Steem: one root post every 5 minutes). Before every publish pass load() replays
+    the accounts' recent published_at times, so all publisher instances apply the same
+    limit; during the pass acquire() also counts the posts being sent. Posts that another
+    instance is broadcasting at that same moment are not visible yet: the node rejects
+    them (BroadcastError.rate_limited) and they are deferred like the others.
+    """
+    
+    def __init__(self, interval: float = 300, burst: int = 1):
+        self.interval = interval
+        self.burst = max(1, burst)
+        self._buckets = {}  # account -> (tokens, updated_at)
+        self._lock = threading.Lock()
+        
+    @property
+    def window(self) -> timedelta:
+        """How far back published posts still affect a bucket"""
+        return timedelta(seconds=self.interval * self.burst)
+        
+    def load(self, history: Dict[str, List[datetime]], now: datetime):
+        """Replace the buckets with the ones implied by recent publish times (account -> times)"""
+        buckets = {}
+        for account, times in history.items():
+            tokens, updated_at = float(self.burst), now - self.window
+            for published_at in sorted(times):
+                elapsed = max(0.0, (published_at - updated_at).total_seconds())
+                tokens = min(self.burst, tokens + elapsed / self.interval) - 1
+                updated_at = published_at
+            buckets[account] = (tokens, updated_at)
+        with self._lock:
+            self._buckets = buckets
+            
+    def _refill(self, account: str, now: datetime) -> float:
+        tokens, updated_at = self._buckets.get(account, (self.burst, now))
+        elapsed = max(0.0, (now - updated_at).total_seconds())
+        return min(self.burst, tokens + elapsed / self.interval)
+        
+    def acquire(self, account: str, now: datetime) -> Optional[datetime]:
+        """Take a token; returns None on success, otherwise the time the next token is available"""
+        with self._lock:
+            tokens = self._refill(account, now)
+            if tokens >= 1:
+                self._buckets[account] = (tokens - 1, now)
+                return None
+            self._buckets[account] = (tokens, now)
+            return now + timedelta(seconds=(1 - tokens) * self.interval)
+            
+    def refund(self, account: str, now: datetime):
+        """Give back a token taken for a post that was not published"""
+        with self._lock:
+            self._buckets[account] = (min(self.burst, self._refill(account, now) + 1), now)
+            
+    def exhaust(self, account: str, now: datetime) -> datetime:
+        """The node says the account posted recently: empty its bucket, return the next slot"""
+        with self._lock:
+            self._buckets[account] = (0.0, now)
+        return now + timedelta(seconds=self.interval)
+
+
+def is_due(now: datetime):
+    """
+    Condition for posts to try at or before now: next_attempt_at when set (retry or
+    rate limit), otherwise the user's scheduled_datetime. Written as an OR, not as
+    due_time <= now, so both (status, ...) indexes stay usable.
+    """
+    return or_(
+        and_(ScheduledPost.next_attempt_at.is_(None), ScheduledPost.scheduled_datetime <= now),
+        ScheduledPost.next_attempt_at <= now
+    )
+
 
 class ScheduledPostPublisher:
     """
     Service responsible for publishing scheduled posts at their designated time.
     
-    This is a test implementation that demonstrates the logic flow without
-    actually publishing to the blockchain.
+    Posts are sent through a broadcaster (python.broadcaster, PUBLISHER_BROADCASTER):
+    the default stub does not touch the blockchain.
     """
     
     def __init__(self, app=None):
         self.app = app
         self.running = False
         self.publisher_thread = None
-        self.check_interval = 30  # Check every 30 seconds for more responsive testing
+        self.listener_thread = None
+        self._reconcile_now = False
+        # Safety-net DB scan; normal wakeups come from notify() and the due-time heap
+        self.reconcile_interval = int(os.environ.get('PUBLISHER_RECONCILE_INTERVAL', 300))
+        self._heap = []        # (due time, post_id), min-heap of due times
+        self._due_times = {}   # post_id -> current due time; stale heap entries are skipped
+        self._wakeup = threading.Condition()
+        # Concurrent publishing: one task per user, status updates committed in batches
+        self.max_workers = int(os.environ.get('PUBLISHER_MAX_WORKERS', 8))
+        self.commit_batch_size = int(os.environ.get('PUBLISHER_COMMIT_BATCH', 20))
+        self.commit_interval = 1.0
+        self._executor = None
+        # Lease-based claiming so several publisher instances can share the work
+        self.lease_seconds = int(os.environ.get('PUBLISHER_LEASE_SECONDS', 300))
+        self.claim_batch_size = int(os.environ.get('PUBLISHER_CLAIM_BATCH', 100))
+        # Short-lived snapshot of the per-status counts returned by get_status
+        self.status_cache_ttl = float(os.environ.get('PUBLISHER_STATUS_CACHE_TTL', 5))
+        self._status = None
+        self._status_at = 0.0
+        # Each running instance refreshes its publisher_heartbeat row at this interval
+        self.heartbeat_interval = float(os.environ.get('PUBLISHER_HEARTBEAT_INTERVAL', 60))
+        self.instance_id = None
+        self.started_at = None
+        # Posts of different users due together share one transaction
+        self.broadcaster = create_broadcaster()
+        # Root posts per account are rate limited on chain: posts that would be rejected
+        # are moved to the account's next slot instead of being broadcast
+        self.rate_limiter = AccountRateLimiter(
+            interval=float(os.environ.get('PUBLISHER_ROOT_POST_INTERVAL', 300)),
+            burst=int(os.environ.get('PUBLISHER_ROOT_POST_BURST', 1))
+        )
+        # Failed broadcasts are retried with exponential backoff (and jitter) up to max_attempts
+        self.max_attempts = int(os.environ.get('PUBLISHER_MAX_ATTEMPTS', 5))
+        self.backoff_base = float(os.environ.get('PUBLISHER_BACKOFF_BASE', 30))
+        self.backoff_max = float(os.environ.get('PUBLISHER_BACKOFF_MAX', 1800))
         
     def init_app(self, app):
         """Initialize the publisher with Flask app context"""
@@ -47,78 +194,451 @@ class ScheduledPostPublisher:
             return
             
         self.running = True
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.started_at = datetime.utcnow()
         self.publisher_thread = threading.Thread(target=self._run_publisher, daemon=True)
         self.publisher_thread.start()
+        if self.supports_wakeup():
+            self.listener_thread = threading.Thread(target=self._listen, daemon=True)
+            self.listener_thread.start()
         logger.info("Scheduled post publisher started")
         
-    def stop(self):
-        """Stop the publisher service"""
-        self.running = False
-        if self.publisher_thread:
-            self.publisher_thread.join(timeout=5)
+    def stop(self, timeout: float = 5):
+        """
+        Stop the publisher service.
+        
+        No new posts are claimed; posts already being published get up to
+        timeout seconds to finish and have their status committed.
+        """
+        if self.publisher_thread is None:
+            return
+        with self._wakeup:
+            self.running = False
+            self._wakeup.notify_all()
+        self.publisher_thread.join(timeout=timeout)
+        if self.publisher_thread.is_alive():
+            logger.warning(f"Publisher did not drain within {timeout}s; unfinished leases will expire")
+        self.publisher_thread = None
+        if self.listener_thread is not None:
+            self.listener_thread.join(timeout=2)
+            self.listener_thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._remove_heartbeat()
         logger.info("Scheduled post publisher stopped")
         
-    def _run_publisher(self):
-        """Main publisher loop"""
-        logger.info(f"Publisher loop started, checking every {self.check_interval} seconds")
+    def notify(self, post: ScheduledPost):
+        """Tell the scheduler that a post was created or changed"""
+        if post.status != 'scheduled':
+            self.forget(post.id)
+            return
+        self.schedule(post.id, post.due_time)
+        
+    def schedule(self, post_id: int, due_time: datetime):
+        """Register (or move) the due time of a scheduled post"""
+        self.schedule_many([(post_id, due_time)])
+        
+    def forget(self, post_id: int):
+        """Tell the scheduler that a post no longer needs publishing"""
+        self.schedule_many([(post_id, None)])
+        
+    def schedule_many(self, entries: List[tuple]):
+        """
+        Apply (post_id, due time) changes; a due time of None drops the post.
+        When the publisher runs in another process they are sent to it with NOTIFY.
+        """
+        entries = [(post_id, self._to_utc_naive(due) if due is not None else None) for post_id, due in entries]
+        if not self.running:
+            self._send_wakeup(entries)
+            return
+        with self._wakeup:
+            for post_id, due in entries:
+                if due is None:
+                    # The heap entry becomes stale and is dropped lazily
+                    self._due_times.pop(post_id, None)
+                    continue
+                self._due_times[post_id] = due
+                heapq.heappush(self._heap, (due, post_id))
+            self._wakeup.notify()
+            
+    def supports_wakeup(self) -> bool:
+        """True when other processes can wake this publisher (PostgreSQL through psycopg2)"""
+        if self.app is None:
+            return False
+        with self.app.app_context():
+            dialect = db.engine.dialect
+        return dialect.name == 'postgresql' and dialect.driver == 'psycopg2'
+        
+    def _send_wakeup(self, entries: List[tuple]):
+        """NOTIFY the publisher process; without PostgreSQL it finds the changes at its next reconcile"""
+        if not entries or not self.supports_wakeup():
+            return
+        with self.app.app_context():
+            try:
+                for i in range(0, len(entries), WAKEUP_BATCH):
+                    payload = json.dumps([[post_id, due.isoformat() if due is not None else None]
+                                          for post_id, due in entries[i:i + WAKEUP_BATCH]])
+                    db.session.execute(text('SELECT pg_notify(:channel, :payload)'),
+                                       {'channel': WAKEUP_CHANNEL, 'payload': payload})
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                logger.warning(f"Could not notify the publisher of {len(entries)} post changes: {e}")
+                
+    def _apply_wakeup(self, payload: str):
+        try:
+            entries = [(post_id, datetime.fromisoformat(due) if due else None)
+                       for post_id, due in json.loads(payload)]
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Ignoring malformed publisher wakeup {payload[:100]!r}: {e}")
+            return
+        self.schedule_many(entries)
+        
+    def _listen(self):
+        """Receive due-time changes from other processes (LISTEN on WAKEUP_CHANNEL)"""
         while self.running:
+            connection = None
             try:
-                logger.info("Publisher: Checking for scheduled posts...")
                 with self.app.app_context():
-                    self._check_and_publish_posts()
+                    connection = db.engine.raw_connection()
+                driver = connection.driver_connection
+                # A LISTENing connection must not go back to the pool
+                connection.detach()
+                driver.rollback()
+                driver.autocommit = True
+                with driver.cursor() as cursor:
+                    cursor.execute(f'LISTEN {WAKEUP_CHANNEL}')
+                # Changes sent while nobody was listening are found by a reconcile
+                with self._wakeup:
+                    self._reconcile_now = True
+                    self._wakeup.notify()
+                logger.info(f"Publisher listening for post changes on {WAKEUP_CHANNEL}")
+                
+                with selectors.DefaultSelector() as selector:
+                    selector.register(driver, selectors.EVENT_READ)
+                    while self.running:
+                        if not selector.select(timeout=1):
+                            continue
+                        driver.poll()
+                        while driver.notifies:
+                            self._apply_wakeup(driver.notifies.pop(0).payload)
+            except Exception as e:
+                logger.warning(f"Publisher wakeup listener failed: {e}; polling until it reconnects")
+                with self._wakeup:
+                    if self.running:
+                        self._wakeup.wait(5)
+            finally:
+                if connection is not None:
+                    connection.close()
+                    
+
+    @staticmethod
+    def _to_utc_naive(value: datetime) -> datetime:
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+        
+    def _next_due_locked(self) -> Optional[datetime]:
+        """Earliest valid due time; caller must hold self._wakeup"""
+        while self._heap:
+            due, post_id = self._heap[0]
+            if self._due_times.get(post_id) == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+        
+    def _pop_due(self, now: datetime) -> bool:
+        """Remove every heap entry due at or before now; True if any was valid"""
+        found = False
+        with self._wakeup:
+            while self._heap and self._heap[0][0] <= now:
+                due, post_id = heapq.heappop(self._heap)
+                if self._due_times.get(post_id) == due:
+                    del self._due_times[post_id]
+                    found = True
+        return found
+        
+    def _reconcile(self):
+        """Rebuild the due-time heap from the database (safety net for missed notifications)"""
+        horizon = datetime.utcnow() + timedelta(seconds=2 * self.reconcile_interval)
+        rows = db.session.query(ScheduledPost.id, ScheduledPost.due_time).filter(
+            ScheduledPost.status == 'scheduled',
+            is_due(horizon)
+        ).all()
+        
+        with self._wakeup:
+            for post_id, due in rows:
+                due = self._to_utc_naive(due)
+                if self._due_times.get(post_id) != due:
+                    self._due_times[post_id] = due
+                    heapq.heappush(self._heap, (due, post_id))
+        logger.info(f"Publisher: reconciled {len(rows)} scheduled posts due before {horizon.strftime('%Y-%m-%d %H:%M:%S')} UTC")
+        
+    def _run_publisher(self):
+        """Main publisher loop: sleep until the next due time or a notification"""
+        logger.info(f"Publisher loop started, reconciling with the database every {self.reconcile_interval} seconds")
+        next_reconcile = 0.0
+        next_heartbeat = 0.0
+        while self.running:
+            try:
+                if time.monotonic() >= next_heartbeat:
+                    next_heartbeat = time.monotonic() + self.heartbeat_interval
+                    with self.app.app_context():
+                        self._heartbeat()
+                        
+                if self._reconcile_now or time.monotonic() >= next_reconcile:
+                    self._reconcile_now = False
+                    next_reconcile = time.monotonic() + self.reconcile_interval
+                    with self.app.app_context():
+                        self._reconcile()
+                        
+                if self._pop_due(datetime.utcnow()):
+                    tick_start = time.perf_counter()
+                    with self.app.app_context():
+                        self._check_and_publish_posts()
+                    metrics.PUBLISHER_TICK.observe(time.perf_counter() - tick_start)
             except Exception as e:
                 logger.error(f"Error in publisher loop: {e}")
                 
-            # Sleep but check every few seconds if we should stop
-            for _ in range(self.check_interval):
+            with self._wakeup:
                 if not self.running:
                     break
-                time.sleep(1)
+                timeout = max(0.0, min(next_reconcile, next_heartbeat) - time.monotonic())
+                next_due = self._next_due_locked()
+                if next_due is not None:
+                    timeout = min(timeout, max(0.0, (next_due - datetime.utcnow()).total_seconds()))
+                if not self._reconcile_now:
+                    self._wakeup.wait(timeout)
         logger.info("Publisher loop ended")
             
+    def _heartbeat(self):
+        """Record that this instance is alive; rows of instances gone for an hour are dropped"""
+        now = datetime.utcnow()
+        try:
+            db.session.merge(PublisherHeartbeat(instance=self.instance_id, started_at=self.started_at,
+                                                last_seen=now, reconcile_interval=self.reconcile_interval))
+            db.session.execute(
+                PublisherHeartbeat.__table__.delete().where(
+                    PublisherHeartbeat.last_seen < now - timedelta(hours=1))
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Publisher heartbeat failed: {e}")
+            
+    def _remove_heartbeat(self):
+        if self.instance_id is None or self.app is None:
+            return
+        with self.app.app_context():
+            try:
+                db.session.execute(
+                    PublisherHeartbeat.__table__.delete().where(PublisherHeartbeat.instance == self.instance_id)
+                )
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Could not remove publisher heartbeat: {e}")
+        self.instance_id = None
+        
     def _check_and_publish_posts(self):
-        """Check for posts that need to be published and publish them"""
+        """Check for posts that need to be published and publish them concurrently"""
         now = datetime.utcnow()
+        if metrics.enabled:
+            metrics.PUBLISHER_DUE_BACKLOG.set(self._count_due_posts(now))
+        
+        while True:
+            # Atomically take a lease on a batch of due posts
+            posts_to_publish = self._claim_due_posts(now)
+            
+            if not posts_to_publish:
+                logger.info(f"No unclaimed posts to publish at {now.strftime('%Y-%m-%d %H:%M:%S')} UTC")
+                break
+                
+            logger.info(f"Claimed {len(posts_to_publish)} posts to publish")
+            self._publish_claimed_posts(posts_to_publish)
+            
+            if len(posts_to_publish) < self.claim_batch_size or not self.running:
+                break
+                
+        if metrics.enabled:
+            metrics.PUBLISHER_DUE_BACKLOG.set(self._count_due_posts(datetime.utcnow()))
+                
+    def _count_due_posts(self, now: datetime) -> int:
+        """Due posts still waiting to be published (for the backlog gauge)"""
+        return db.session.scalar(
+            select(func.count(ScheduledPost.id)).where(
+                ScheduledPost.status == 'scheduled',
+                is_due(now)
+            )
+        )
+        
+    def _claim_due_posts(self, now: datetime) -> List[ScheduledPost]:
+        """
+        Claim up to claim_batch_size due posts for this instance.
         
-        # Query for posts that should be published
-        posts_to_publish = ScheduledPost.query.filter(
-            ScheduledPost.scheduled_datetime <= now,
-            ScheduledPost.status == 'scheduled'
+        Candidates are selected with FOR UPDATE SKIP LOCKED (PostgreSQL; ignored on
+        SQLite) and then taken with a conditional UPDATE that only succeeds while the
+        lease is free, so concurrent publishers never claim the same row.
+        Leases left behind by a crashed instance expire after lease_seconds.
+        """
+        token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        lease_free = or_(ScheduledPost.claimed_until.is_(None), ScheduledPost.claimed_until < now)
+        
+        candidates = db.session.scalars(
+            select(ScheduledPost.id)
+            .where(
+                ScheduledPost.status == 'scheduled',
+                is_due(now),
+                lease_free
+            )
+            .order_by(ScheduledPost.due_time, ScheduledPost.id)
+            .limit(self.claim_batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not candidates:
+            db.session.commit()
+            return []
+            
+        db.session.execute(
+            update(ScheduledPost)
+            .where(
+                ScheduledPost.id.in_(candidates),
+                ScheduledPost.status == 'scheduled',
+                lease_free
+            )
+            .values(claimed_by=token, claimed_until=now + timedelta(seconds=self.lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        
+        return ScheduledPost.query.filter_by(claimed_by=token).order_by(
+            ScheduledPost.due_time, ScheduledPost.id
         ).all()
         
-        if not posts_to_publish:
-            logger.info(f"No posts to publish at {now.strftime('%Y-%m-%d %H:%M:%S')} UTC")
+    def _publish_claimed_posts(self, posts_to_publish: List[ScheduledPost]):
+        """Publish claimed posts as batched transactions on the worker pool"""
+        # Wave n holds the n-th due post of every user: one root post per account
+        # per transaction, and each user's posts stay in scheduled order.
+        # Tasks only receive plain dicts, so no ORM object crosses threads.
+        # The permlink is stored before broadcasting, so a retry reuses the same one.
+        for post in posts_to_publish:
+            if not post.permlink:
+                post.permlink = self._make_permlink(post)
+        db.session.commit()
+        
+        now = datetime.utcnow()
+        self._load_rate_limits({post.username for post in posts_to_publish}, now)
+        per_user = {}
+        deferred = []
+        queued = {}  # account -> posts already deferred in this pass
+        for post in posts_to_publish:
+            slot = self.rate_limiter.acquire(post.username, now)
+            if slot is not None:
+                # Later posts of the same account queue up behind each other, one interval apart
+                position = queued.get(post.username, 0)
+                queued[post.username] = position + 1
+                slot += timedelta(seconds=self.rate_limiter.interval * position)
+                deferred.append(PublishResult(post.id, 'deferred', retry_at=slot))
+                continue
+            per_user.setdefault(post.username, []).append(self._prepare_post_data(post))
+        if deferred:
+            metrics.PUBLISHER_RESULTS.labels('deferred').inc(len(deferred))
+            self._commit_results(deferred)
+        if not per_user:
             return
             
-        logger.info(f"Found {len(posts_to_publish)} posts to publish")
+        waves = [
+            [user_posts[i] for user_posts in per_user.values() if i < len(user_posts)]
+            for i in range(max(len(user_posts) for user_posts in per_user.values()))
+        ]
         
-        for post in posts_to_publish:
-            try:
-                self._publish_post(post)
-            except Exception as e:
-                logger.error(f"Failed to publish post {post.id}: {e}")
-                self._mark_post_failed(post, str(e))
-                
-    def _publish_post(self, post: ScheduledPost):
-        """
-        Publish a single scheduled post.
+        for wave in waves:
+            results = queue.Queue()
+            futures = [
+                self._get_executor().submit(self._publish_batch, batch, results)
+                for batch in self.broadcaster.split_batches(wave)
+            ]
+            self._collect_results(results, futures, len(wave))
         
-        For testing purposes, this simulates the publishing process
-        without actually posting to the blockchain.
-        """
-        logger.info(f"Publishing post: {post.id} - '{post.title}' by {post.username}")
+    def _load_rate_limits(self, accounts: set, now: datetime):
+        """Rebuild the accounts' token buckets from their recent published posts"""
+        rows = db.session.execute(
+            select(ScheduledPost.username, ScheduledPost.published_at).where(
+                ScheduledPost.username.in_(accounts),
+                ScheduledPost.published_at > now - self.rate_limiter.window
+            )
+        ).all()
+        history = {}
+        for account, published_at in rows:
+            history.setdefault(account, []).append(published_at)
+        self.rate_limiter.load(history, now)
+        
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='publisher')
+        return self._executor
         
-        # Simulate blockchain publication preparation
-        post_data = self._prepare_post_data(post)
+    def _publish_batch(self, batch: List[dict], results: queue.Queue):
+        """Worker task: publish posts of different users in one transaction"""
+        logger.info(f"Publishing posts {[p['post_id'] for p in batch]} in one transaction")
+        try:
+            outcomes = self.broadcaster.publish(batch)
+        except Exception as e:
+            logger.exception("Broadcaster failed")
+            outcomes = [(False, BroadcastError(str(e), transient=True))] * len(batch)
+        for post_data, (ok, error) in zip(batch, outcomes):
+            result = self._classify(post_data, ok, error)
+            if ok:
+                lag = datetime.utcnow() - self._to_utc_naive(post_data['scheduled_datetime'])
+                metrics.PUBLISHER_LAG.observe(max(0.0, lag.total_seconds()))
+            metrics.PUBLISHER_RESULTS.labels(result.kind).inc()
+            results.put(result)
+            
+    def _classify(self, post_data: dict, ok: bool, error: Optional[BroadcastError]) -> PublishResult:
+        """Decide what happens to a post after its broadcast"""
+        post_id, account = post_data['post_id'], post_data['username']
+        if ok:
+            return PublishResult(post_id, 'published')
+        now = datetime.utcnow()
+        if error.rate_limited:
+            # Predictable rejection: does not count as an attempt
+            return PublishResult(post_id, 'deferred', str(error), self.rate_limiter.exhaust(account, now))
+        # The post did not go on chain, its token is still usable
+        self.rate_limiter.refund(account, now)
+        attempts = post_data['attempts'] + 1
+        if not error.transient or attempts >= self.max_attempts:
+            return PublishResult(post_id, 'failed', str(error))
+        return PublishResult(post_id, 'retry', str(error), now + timedelta(seconds=self._backoff(attempts)))
         
-        # TODO: In production, this would call the actual Steem API
-        # For testing, we just simulate success
-        if self._simulate_blockchain_publish(post_data):
-            self._mark_post_published(post)
-            logger.info(f"Successfully published post {post.id}")
-        else:
-            self._mark_post_failed(post, "Simulated blockchain error")
-            logger.error(f"Failed to publish post {post.id}")
+    def _backoff(self, attempts: int) -> float:
+        """Exponential backoff with jitter: a random delay in [d/2, d], d = base * 2^(attempts-1)"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return random.uniform(delay / 2, delay)
+            
+    def _collect_results(self, results: queue.Queue, futures: list, expected: int):
+        """Commit status updates in batches (by size or age) as worker results arrive"""
+        pending = []
+        oldest = None
+        received = 0
+        while received < expected:
+            try:
+                pending.append(results.get(timeout=self.commit_interval))
+                received += 1
+                if oldest is None:
+                    oldest = time.monotonic()
+            except queue.Empty:
+                if all(f.done() for f in futures) and results.empty():
+                    logger.error(f"Publisher: {expected - received} results missing from worker tasks")
+                    break
+                    
+            if pending and (len(pending) >= self.commit_batch_size
+                            or time.monotonic() - oldest >= self.commit_interval):
+                self._commit_results(pending)
+                pending, oldest = [], None
+        if pending:
+            self._commit_results(pending)
             
     def _prepare_post_data(self, post: ScheduledPost) -> dict:
         """Prepare post data for blockchain publishing"""
@@ -149,76 +669,137 @@ class ScheduledPostPublisher:
             'parent_permlink': parent_permlink,
             'metadata': metadata,
             'scheduled_datetime': post.scheduled_datetime,
+            'attempts': post.attempts or 0,
             'post_id': post.id
         }
         
-    def _simulate_blockchain_publish(self, post_data: dict) -> bool:
+    @staticmethod
+    def _make_permlink(post: ScheduledPost) -> str:
         """
-        Simulate blockchain publishing for testing.
-        
-        In production, this would use the Steem API to actually publish the post.
-        For testing, we simulate success/failure scenarios.
+        Permlink from the title when the client did not provide one. The post id keeps
+        it unique: a repeated permlink would turn the comment into an edit of the
+        author's earlier post with the same title and time.
         """
-        # Simulate processing time
-        time.sleep(1)
-        
-        # Simulate 95% success rate for testing
-        import random
-        return random.random() < 0.95
+        slug = re.sub(r'[^a-z0-9]+', '-', post.title.lower()).strip('-')[:200] or 'post'
+        return f"{slug}-{post.scheduled_datetime.strftime('%Y%m%dt%H%M%Sz')}-{post.id}"
         
-    def _mark_post_published(self, post: ScheduledPost):
-        """Mark a post as successfully published"""
-        post.status = 'published'
-        try:
-            db.session.commit()
-            logger.info(f"Marked post {post.id} as published")
-        except Exception as e:
-            logger.error(f"Failed to update post {post.id} status: {e}")
-            db.session.rollback()
-            
-    def _mark_post_failed(self, post: ScheduledPost, error_message: str):
-        """Mark a post as failed to publish"""
-        post.status = 'failed'
-        # In production, you might want to add an error_message field to the model
+    def _commit_results(self, results: List[PublishResult]):
+        """
+        Write a batch of publish results in a single commit: one UPDATE for the
+        published posts and one executemany UPDATE for retries, deferrals and failures.
+        Retried and deferred posts go back to 'scheduled' with next_attempt_at set;
+        scheduled_datetime always keeps the time chosen by the user.
+        """
+        now = datetime.utcnow()
+        published = [r.post_id for r in results if r.kind == 'published']
+        others = [r for r in results if r.kind != 'published']
+        table = ScheduledPost.__table__
         try:
+            if published:
+                db.session.execute(
+                    update(ScheduledPost)
+                    .where(ScheduledPost.id.in_(published))
+                    .values(status='published', published_at=now, next_attempt_at=None,
+                            claimed_by=None, claimed_until=None)
+                )
+            if others:
+                db.session.execute(
+                    update(table)
+                    .where(table.c.id == bindparam('b_id'))
+                    .values(
+                        status=bindparam('b_status'),
+                        attempts=table.c.attempts + bindparam('b_attempt', type_=db.Integer),
+                        last_error=func.coalesce(bindparam('b_error', type_=db.Text), table.c.last_error),
+                        next_attempt_at=bindparam('b_retry_at', type_=db.DateTime),
+                        claimed_by=None,
+                        claimed_until=None
+                    ),
+                    [{
+                        'b_id': r.post_id,
+                        'b_status': 'failed' if r.kind == 'failed' else 'scheduled',
+                        'b_attempt': 0 if r.kind == 'deferred' else 1,
+                        'b_error': r.error,
+                        'b_retry_at': r.retry_at,
+                    } for r in others]
+                )
             db.session.commit()
-            logger.error(f"Marked post {post.id} as failed: {error_message}")
         except Exception as e:
-            logger.error(f"Failed to update post {post.id} status: {e}")
+            logger.error(f"Failed to update status of posts {[r.post_id for r in results]}: {e}")
             db.session.rollback()
+            return
+        if published:
+            logger.info(f"Marked posts {published} as published")
+        for r in others:
+            if r.kind == 'failed':
+                logger.error(f"Marked post {r.post_id} as failed: {r.error}")
+                continue
+            retry_at = r.retry_at.strftime('%Y-%m-%d %H:%M:%S')
+            if r.kind == 'retry':
+                logger.warning(f"Post {r.post_id} will be retried at {retry_at} UTC: {r.error}")
+            else:
+                logger.info(f"Post {r.post_id} moved to the next posting slot of its account, {retry_at} UTC")
+            self.schedule(r.post_id, r.retry_at)
             
     def get_status(self) -> dict:
-        """Get publisher status information"""
-        with self.app.app_context():
-            scheduled_count = ScheduledPost.query.filter_by(status='scheduled').count()
-            published_count = ScheduledPost.query.filter_by(status='published').count()
-            failed_count = ScheduledPost.query.filter_by(status='failed').count()
-            
-        return {
-            'running': self.running,
-            'check_interval': self.check_interval,
-            'scheduled_posts': scheduled_count,
-            'published_posts': published_count,
-            'failed_posts': failed_count
-        }
+        """
+        Publisher status as recorded in the database, so any process can report it
+        (the publisher normally runs in its own process). Cached for status_cache_ttl seconds.
+        """
+        status = self._status
+        if status is None or time.monotonic() - self._status_at >= self.status_cache_ttl:
+            with self.app.app_context():
+                live_since = datetime.utcnow() - timedelta(seconds=3 * self.heartbeat_interval)
+                instances = db.session.query(PublisherHeartbeat).filter(
+                    PublisherHeartbeat.last_seen >= live_since
+                ).order_by(PublisherHeartbeat.started_at).all()
+                next_due = db.session.scalar(
+                    select(func.min(ScheduledPost.due_time)).where(ScheduledPost.status == 'scheduled')
+                )
+                # One GROUP BY instead of a count() query per status
+                counts = dict(db.session.query(ScheduledPost.status, func.count(ScheduledPost.id))
+                              .group_by(ScheduledPost.status).all())
+            # The running instances' reconcile interval (what the old polling loop reported
+            # as check_interval), or this process's own setting when none is running
+            intervals = [instance.reconcile_interval for instance in instances
+                         if instance.reconcile_interval is not None]
+            status = {
+                'running': bool(instances),
+                'check_interval': min(intervals, default=self.reconcile_interval),
+                'instances': [{
+                    'instance': instance.instance,
+                    'started_at': instance.started_at.isoformat(),
+                    'last_seen': instance.last_seen.isoformat()
+                } for instance in instances],
+                'next_due': next_due.isoformat() if next_due else None,
+                'scheduled_posts': counts.get('scheduled', 0),
+                'published_posts': counts.get('published', 0),
+                'failed_posts': counts.get('failed', 0)
+            }
+            self._status = status
+            self._status_at = time.monotonic()
+        return status
         
     def retry_failed_posts(self) -> int:
-        """Retry all failed posts (for testing/recovery)"""
+        """Retry all failed posts (for testing/recovery) with a single set-based UPDATE"""
         with self.app.app_context():
-            failed_posts = ScheduledPost.query.filter_by(status='failed').all()
-            retry_count = 0
-            
-            for post in failed_posts:
-                # Only retry posts that were supposed to be published in the last 24 hours
-                if post.scheduled_datetime > datetime.utcnow() - timedelta(hours=24):
-                    post.status = 'scheduled'
-                    retry_count += 1
-                    
-            if retry_count > 0:
-                db.session.commit()
-                logger.info(f"Marked {retry_count} failed posts for retry")
-                
-        return retry_count
+            # Only retry posts that were supposed to be published in the last 24 hours
+            rows = db.session.execute(
+                update(ScheduledPost)
+                .where(
+                    ScheduledPost.status == 'failed',
+                    ScheduledPost.scheduled_datetime > datetime.utcnow() - timedelta(hours=24)
+                )
+                .values(status='scheduled', attempts=0, next_attempt_at=None,
+                        claimed_by=None, claimed_until=None)
+                .returning(ScheduledPost.id, ScheduledPost.scheduled_datetime)
+                .execution_options(synchronize_session=False)
+            ).all()
+            db.session.commit()
+            
+        if rows:
+            logger.info(f"Marked {len(rows)} failed posts for retry")
+            self.schedule_many(rows)
+        return len(rows)
 
 # Global publisher instance
 publisher = ScheduledPostPublisher()
@@ -0,0 +1,62 @@
+"""
+Standalone publisher process (Procfile `worker:`)
+
+    python -m python.publisher_main
+
+Kept apart from python.publisher so that module is imported once, under its own
+name: running it with -m would load it twice and build a second publisher.
+SIGTERM/SIGINT stop claiming new posts and wait for in-flight publishes to be committed.
+"""
+import logging
+import os
+import signal
+import threading
+
+from python.logging_setup import setup_logging
+
+logger = logging.getLogger('python.publisher')
+
+
+def main():
+    setup_logging()
+
+    # Same database configuration and schema upgrade as the web app, without its
+    # static assets and HTTP middleware
+    from python.app_factory import create_base_app
+    from python.publisher import publisher
+    from python import metrics
+    publisher.init_app(create_base_app())
+
+    metrics_port = int(os.environ.get('PUBLISHER_METRICS_PORT', 9101))
+    if metrics_port:
+        try:
+            if metrics.start_http_server(metrics_port):
+                logger.info(f"Publisher metrics on port {metrics_port}")
+        except OSError as e:
+            logger.error(f"Publisher metrics server not started on port {metrics_port}: {e}")
+
+    # The web process wakes the publisher with PostgreSQL NOTIFY, so the reconcile is
+    # only a safety net; elsewhere it is how new posts are found, every 30 s by default
+    publisher.reconcile_interval = int(os.environ.get('PUBLISHER_RECONCILE_INTERVAL',
+                                                      300 if publisher.supports_wakeup() else 30))
+    drain_timeout = float(os.environ.get('PUBLISHER_DRAIN_TIMEOUT', 25))
+
+    stopping = threading.Event()
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received {signal.Signals(signum).name}, draining publisher")
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    publisher.start()
+    while not stopping.wait(1):
+        if not publisher.publisher_thread.is_alive():
+            logger.error("Publisher thread exited unexpectedly")
+            break
+    publisher.stop(timeout=drain_timeout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+"""
+Motore in memoria per i file statici della SPA
+
+All'avvio legge i file delle directory statiche e ne conserva i bytes insieme
+alle varianti gzip e brotli. Le risposte hanno ETag basati sul contenuto e
+rispettano If-None-Match e Accept-Encoding. StaticFastPathMiddleware serve gli
+stessi file direttamente a livello WSGI, senza passare dal routing di Flask.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from urllib.parse import parse_qs
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli è opzionale: senza, si servono solo gzip e identity
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/javascript',
+    'application/json',
+    'application/manifest+json',
+    'image/svg+xml',
+    'text/css',
+    'text/html',
+    'text/plain',
+}
+
+# Sotto questa dimensione la compressione non conviene
+MIN_COMPRESS_SIZE = 512
+
+MIMETYPE_OVERRIDES = {
+    '.js': 'application/javascript',
+    '.mjs': 'application/javascript',
+    '.json': 'application/json',
+}
+
+
+# Nome con impronta del contenuto, es. app.3f9a1c0d.js: l'URL cambia quando cambia il file
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+# Lunghezza minima di ?v= perché l'URL valga come versionato
+MIN_VERSION_LENGTH = 8
+
+
+def version_param(query_string):
+    """Valore di ?v= nella query string, oppure None"""
+    if not query_string or 'v=' not in query_string:
+        return None
+    return parse_qs(query_string).get('v', [None])[0]
+
+
+# Tipi a cui va aggiunto il charset nel Content-Type (come fa werkzeug)
+CHARSET_TYPES = {'application/javascript', 'application/json', 'image/svg+xml'}
+
+
+def guess_mimetype(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in MIMETYPE_OVERRIDES:
+        return MIMETYPE_OVERRIDES[ext]
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+class StaticAsset:
+    """Un file in memoria con le sue varianti compresse"""
+
+    __slots__ = ('path', 'mimetype', 'content_type', 'cache_control', 'versioned_cache_control',
+                 'mtime_ns', 'hash', 'variants')
+
+    def __init__(self, path, mimetype, mtime_ns, data, gzip_data=None, br_data=None,
+                 cache_control='no-cache', versioned_cache_control=None):
+        self.path = path
+        self.mimetype = mimetype
+        if mimetype.startswith('text/') or mimetype in CHARSET_TYPES:
+            self.content_type = f'{mimetype}; charset=utf-8'
+        else:
+            self.content_type = mimetype
+        self.cache_control = cache_control
+        self.versioned_cache_control = versioned_cache_control
+        self.mtime_ns = mtime_ns
+        self.hash = hashlib.blake2b(data, digest_size=8).hexdigest()
+        # encoding -> (body, etag)
+        self.variants = {None: (data, f'"{self.hash}"')}
+        if gzip_data is not None:
+            self.variants['gzip'] = (gzip_data, f'"{self.hash}-gz"')
+        if br_data is not None:
+            self.variants['br'] = (br_data, f'"{self.hash}-br"')
+
+    def select(self, accept_encoding):
+        """Ritorna (encoding, body, etag) per l'header Accept-Encoding dato"""
+        for encoding in parse_accept_encoding(accept_encoding):
+            if encoding in self.variants:
+                return (encoding,) + self.variants[encoding]
+        return (None,) + self.variants[None]
+
+    def cache_control_for(self, version):
+        """
+        Cache-Control per la richiesta: max-age lungo solo se ?v= è un prefisso
+        dell'hash del contenuto (l'URL cambia a ogni deploy che modifica il file)
+        """
+        if (version and self.versioned_cache_control and len(version) >= MIN_VERSION_LENGTH
+                and self.hash.startswith(version)):
+            return self.versioned_cache_control
+        return self.cache_control
+
+    def matches(self, if_none_match):
+        """True se If-None-Match corrisponde a una qualsiasi variante del file"""
+        if not if_none_match:
+            return False
+        return if_none_match.strip() == '*' or self.hash in if_none_match
+
+
+_accept_encoding_cache = {}
+
+
+def parse_accept_encoding(header):
+    """Ritorna le codifiche accettate in ordine di preferenza (br, gzip)"""
+    if not header:
+        return ()
+    cached = _accept_encoding_cache.get(header)
+    if cached is not None:
+        return cached
+
+    accepted = set()
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        params = params.replace(' ', '')
+        if params.startswith('q=') and params[2:] in ('0', '0.0', '0.00', '0.000'):
+            continue
+        accepted.add(token)
+    result = tuple(e for e in ('br', 'gzip') if e in accepted or ('*' in accepted and e != 'br'))
+
+    if len(_accept_encoding_cache) < 256:
+        _accept_encoding_cache[header] = result
+    return result
+
+
+class StaticAssetEngine:
+    """
+    Serve dalla memoria i file sotto le directory indicate, i file nella root con
+    le estensioni indicate e i singoli root_files.
+
+    mode='preload' legge tutto all'avvio; mode='mtime' (sviluppo) controlla l'mtime
+    ad ogni richiesta e ricarica i file modificati o nuovi.
+    Gli URL non versionati (i moduli ES si importano per nome) hanno no-cache: il
+    browser rivalida con l'ETag (304) e dopo un deploy non mescola moduli vecchi e
+    nuovi. max_age vale solo per nomi con impronta (app.3f9a1c0d.js) o ?v=<hash>.
+    cache_overrides permette una Cache-Control diversa per singoli file (es. sw.js).
+    """
+
+    def __init__(self, root, directories, root_extensions=('.js',), root_files=(), exclude=(),
+                 cache_overrides=None, mode='preload', max_age=3600, brotli_quality=11):
+        self.root = os.path.abspath(root)
+        self.directories = tuple(directories)
+        self.root_extensions = tuple(root_extensions)
+        self.root_files = set(root_files)
+        self.exclude = set(exclude)
+        self.cache_overrides = dict(cache_overrides or {})
+        self.mode = mode
+        self.brotli_quality = brotli_quality
+        self.cache_control = 'no-cache'
+        self.versioned_cache_control = None if mode == 'mtime' else f'public, max-age={max_age}, immutable'
+        self.assets = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, root, directories, **kwargs):
+        """Crea il motore leggendo modalità e cache policy dalle variabili d'ambiente"""
+        default_mode = 'mtime' if os.environ.get('FLASK_ENV') == 'development' else 'preload'
+        return cls(
+            root,
+            directories,
+            mode=os.environ.get('STATIC_ASSETS_MODE', default_mode).lower(),
+            max_age=int(os.environ.get('STATIC_MAX_AGE', 3600)),
+            brotli_quality=int(os.environ.get('STATIC_BROTLI_QUALITY', 11)),
+            **kwargs
+        )
+
+    def _is_servable(self, rel_path):
+        if rel_path in self.exclude or '..' in rel_path.split('/'):
+            return False
+        head, sep, _ = rel_path.partition('/')
+        if sep:
+            return head in self.directories
+        return rel_path in self.root_files or rel_path.endswith(self.root_extensions)
+
+    def _load(self, rel_path):
+        full_path = os.path.join(self.root, *rel_path.split('/'))
+        try:
+            mtime_ns = os.stat(full_path).st_mtime_ns
+            with open(full_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        mimetype = guess_mimetype(rel_path)
+        gzip_data = br_data = None
+        if mimetype in COMPRESSIBLE_TYPES and len(data) >= MIN_COMPRESS_SIZE:
+            gzip_data = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(gzip_data) >= len(data):
+                gzip_data = None
+            if brotli is not None:
+                br_data = brotli.compress(data, quality=self.brotli_quality)
+                if len(br_data) >= len(data):
+                    br_data = None
+        if rel_path in self.cache_overrides:
+            cache_control, versioned = self.cache_overrides[rel_path], None
+        elif self.versioned_cache_control and FINGERPRINT_RE.search(rel_path):
+            cache_control = versioned = self.versioned_cache_control
+        else:
+            cache_control, versioned = self.cache_control, self.versioned_cache_control
+        return StaticAsset(rel_path, mimetype, mtime_ns, data, gzip_data, br_data, cache_control, versioned)
+
+    def scan(self):
+        """Carica in memoria tutti i file serviti dal motore"""
+        assets = {}
+        for name in os.listdir(self.root):
+            if os.path.isfile(os.path.join(self.root, name)) and self._is_servable(name):
+                asset = self._load(name)
+                if asset:
+                    assets[name] = asset
+        for directory in self.directories:
+            base = os.path.join(self.root, directory)
+            for dirpath, _, filenames in os.walk(base):
+                for filename in filenames:
+                    rel_path = os.path.relpath(os.path.join(dirpath, filename), self.root)
+                    rel_path = rel_path.replace(os.sep, '/')
+                    if self._is_servable(rel_path):
+                        asset = self._load(rel_path)
+                        if asset:
+                            assets[rel_path] = asset
+        with self._lock:
+            self.assets = assets
+        return len(assets)
+
+    def get(self, rel_path):
+        """Ritorna lo StaticAsset per il path relativo oppure None"""
+        asset = self.assets.get(rel_path)
+        if self.mode != 'mtime':
+            return asset
+
+        if not self._is_servable(rel_path):
+            return None
+        full_path = os.path.join(self.root, *rel_path.split('/'))
+        try:
+            mtime_ns = os.stat(full_path).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self.assets.pop(rel_path, None)
+            return None
+        if asset is None or asset.mtime_ns != mtime_ns:
+            asset = self._load(rel_path)
+            if asset is not None:
+                with self._lock:
+                    self.assets[rel_path] = asset
+        return asset
+
+    def make_response(self, rel_path, request):
+        """Risposta Flask per il file richiesto, oppure None se non gestito"""
+        asset = self.get(rel_path)
+        if asset is None:
+            return None
+
+        headers = {
+            'Cache-Control': asset.cache_control_for(request.args.get('v')),
+            'Vary': 'Accept-Encoding',
+        }
+        if asset.matches(request.headers.get('If-None-Match')):
+            encoding, _, etag = asset.select(request.headers.get('Accept-Encoding'))
+            headers['ETag'] = etag
+            return Response(status=304, headers=headers)
+
+        encoding, body, etag = asset.select(request.headers.get('Accept-Encoding'))
+        headers['ETag'] = etag
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(body, mimetype=asset.mimetype, headers=headers)
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'files': len(self.assets),
+            'bytes': sum(len(a.variants[None][0]) for a in self.assets.values()),
+            'brotli': brotli is not None
+        }
+
+
+class StaticFastPathMiddleware:
+    """
+    Middleware WSGI che risponde ai file gestiti da StaticAssetEngine prima del
+    routing di Flask, dei before_request e degli after_request.
+
+    Le richieste non GET/HEAD, con Range, per file sconosciuti o rifiutate da
+    allow(environ) vengono passate all'applicazione Flask invariata.
+    extra_headers (es. gli header di sicurezza) è una lista precalcolata di tuple.
+    """
+
+    def __init__(self, app, engine, extra_headers=(), allow=None, cors_origins=None):
+        self.app = app
+        self.engine = engine
+        self.extra_headers = list(extra_headers)
+        self.allow = allow
+        cors_origins = [o.strip() for o in (cors_origins or []) if o.strip()]
+        self.cors_any = '*' in cors_origins
+        self.cors_origins = set(cors_origins)
+        self.hits = 0
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        if (method == 'GET' or method == 'HEAD') and 'HTTP_RANGE' not in environ:
+            asset = self.engine.get(environ.get('PATH_INFO', '')[1:])
+            if asset is not None and (self.allow is None or self.allow(environ)):
+                self.hits += 1
+                return self._serve(asset, method, environ, start_response)
+        return self.app(environ, start_response)
+
+    def _serve(self, asset, method, environ, start_response):
+        encoding, body, etag = asset.select(environ.get('HTTP_ACCEPT_ENCODING'))
+        headers = [
+            ('Content-Type', asset.content_type),
+            ('ETag', etag),
+            ('Cache-Control', asset.cache_control_for(version_param(environ.get('QUERY_STRING')))),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        headers.extend(self.extra_headers)
+        if self.cors_any:
+            headers.append(('Access-Control-Allow-Origin', '*'))
+        else:
+            origin = environ.get('HTTP_ORIGIN')
+            if origin in self.cors_origins:
+                headers.append(('Access-Control-Allow-Origin', origin))
+                headers[3] = ('Vary', 'Accept-Encoding, Origin')
+
+        if asset.matches(environ.get('HTTP_IF_NONE_MATCH')):
+            start_response('304 Not Modified', headers)
+            return []
+
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        headers.append(('Content-Length', str(len(body))))
+        start_response('200 OK', headers)
+        return [] if method == 'HEAD' else [body]
@@ -2,112 +2,268 @@
 Client per interagire con l'API Steem/Hive senza dipendenze esterne
 """
 import json
-import re
-import urllib.request
+import logging
+import os
+import threading
+import time
 import urllib.parse
-from urllib.error import URLError, HTTPError
+from concurrent.futures import Future
+from http.client import HTTPException
+
+from python.http_pool import HTTPConnectionPool
+from python.text_extract import extract_preview
+from python import metrics
+
+logger = logging.getLogger(__name__)
+
+class RequestCoalescer:
+    """
+    Raccoglie le chiamate JSON-RPC emesse entro una breve finestra temporale e le
+    invia in un'unica richiesta batch. Il primo thread che trova la coda vuota fa
+    da leader: attende la finestra (o che il batch sia pieno) e spedisce.
+    Le chiamate get_accounts concorrenti vengono fuse in una sola.
+    """
+
+    ACCOUNTS_METHOD = "condenser_api.get_accounts"
+
+    def __init__(self, send_batch, window=0.005, max_batch=50):
+        self.send_batch = send_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._lock = threading.Lock()
+        self._full = threading.Event()
+        self._leader_active = False
+        self.batches = 0
+        self.calls = 0
+
+    def submit(self, method, params):
+        """Accoda una chiamata e ne attende la risposta JSON-RPC"""
+        future = Future()
+        with self._lock:
+            self._pending.append((method, params, future))
+            self.calls += 1
+            leader = not self._leader_active
+            if leader:
+                self._leader_active = True
+                self._full.clear()
+            elif len(self._pending) >= self.max_batch:
+                self._full.set()
+
+        if leader:
+            self._full.wait(self.window)
+            self._flush()
+        return future.result()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._leader_active = False
+        for start in range(0, len(pending), self.max_batch):
+            self._dispatch(pending[start:start + self.max_batch])
+
+    def _dispatch(self, entries):
+        calls = []
+        slots = []
+        account_entries = []
+        for method, params, future in entries:
+            if method == self.ACCOUNTS_METHOD:
+                account_entries.append((params[0], future))
+            else:
+                slots.append((len(calls), future))
+                calls.append((method, params))
+
+        accounts_index = None
+        if account_entries:
+            names = list(dict.fromkeys(n for usernames, _ in account_entries for n in usernames))
+            accounts_index = len(calls)
+            calls.append((self.ACCOUNTS_METHOD, [names]))
+
+        try:
+            responses = self.send_batch(calls)
+        except Exception as e:
+            for _, _, future in entries:
+                future.set_exception(e)
+            return
+        self.batches += 1
+
+        for index, future in slots:
+            future.set_result(responses[index])
+
+        if account_entries:
+            response = responses[accounts_index]
+            by_name = {a.get('name'): a for a in response.get('result') or []}
+            for usernames, future in account_entries:
+                if 'result' not in response:
+                    future.set_result(response)
+                    continue
+                future.set_result({
+                    'result': [by_name[n] for n in usernames if n in by_name]
+                })
+
+    def stats(self):
+        return {
+            'window_ms': self.window * 1000,
+            'calls': self.calls,
+            'batches': self.batches
+        }
+
 
 class SteemClient:
-    def __init__(self):
-        self.api_url = "https://api.steemit.com"
+    def __init__(self, api_url=None, pool_size=None, connect_timeout=None, read_timeout=None):
+        self.api_url = api_url or os.environ.get('STEEM_API_URL', 'https://api.steemit.com')
+        self.pool = HTTPConnectionPool(
+            self.api_url,
+            pool_size=pool_size or int(os.environ.get('STEEM_POOL_SIZE', 4)),
+            connect_timeout=connect_timeout or float(os.environ.get('STEEM_CONNECT_TIMEOUT', 3)),
+            read_timeout=read_timeout or float(os.environ.get('STEEM_READ_TIMEOUT', 10))
+        )
+        self.headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'cur8.fun/1.0',
+            'Connection': 'keep-alive'
+        }
+        
+        # Coalescing opzionale delle chiamate concorrenti (STEEM_COALESCE_MS=0 lo disattiva)
+        coalesce_ms = float(os.environ.get('STEEM_COALESCE_MS', 0))
+        self.coalescer = None
+        if coalesce_ms > 0:
+            self.coalescer = RequestCoalescer(
+                self._call_batch,
+                window=coalesce_ms / 1000.0,
+                max_batch=int(os.environ.get('STEEM_BATCH_MAX', 50))
+            )
+    
+    def _call(self, method, params, coalesce=True):
+        """Esegue una chiamata JSON-RPC sulla connessione persistente"""
+        if coalesce and self.coalescer is not None:
+            return self.coalescer.submit(method, params)
+        
+        payload = {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params,
+            "id": 1
+        }
+        
+        data = json.dumps(payload).encode('utf-8')
+        status, raw = self.pool.request('POST', body=data, headers=self.headers)
+        if status != 200:
+            raise HTTPException(f"HTTP {status} from {self.api_url}")
+        return json.loads(raw.decode('utf-8'))
+    
+    def _call_batch(self, calls):
+        """
+        Invia più chiamate (method, params) in un unico array JSON-RPC.
+        Ritorna le risposte nello stesso ordine delle chiamate.
+        """
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": i}
+            for i, (method, params) in enumerate(calls)
+        ]
+        
+        data = json.dumps(payload).encode('utf-8')
+        status, raw = self.pool.request('POST', body=data, headers=self.headers)
+        if status != 200:
+            raise HTTPException(f"HTTP {status} from {self.api_url}")
+        responses = json.loads(raw.decode('utf-8'))
+        if not isinstance(responses, list):
+            # Il nodo ha rifiutato l'intero batch
+            error = responses.get('error') if isinstance(responses, dict) else responses
+            raise HTTPException(f"Batch request rejected: {error}")
+        
+        by_id = {r.get('id'): r for r in responses if isinstance(r, dict)}
+        return [by_id.get(i, {}) for i in range(len(calls))]
+    
+    def _timed_call(self, method, params, coalesce=True):
+        """_call con latenza ed errori registrati per metodo RPC"""
+        start = time.perf_counter()
+        error = True
+        try:
+            result = self._call(method, params, coalesce)
+            error = 'error' in result
+            return result
+        finally:
+            metrics.observe_steem_call(method, time.perf_counter() - start, error)
+    
+    def call(self, method, params):
+        """
+        Chiamata JSON-RPC generica (es. i broadcast del publisher): ritorna la risposta
+        completa, con 'result' o 'error'. Non passa dal coalescer, così un broadcast
+        lento non ritarda le letture raggruppate con lui.
+        """
+        return self._timed_call(method, params, coalesce=False)
     
     def get_content(self, author, permlink):
         """Ottiene il contenuto di un post"""
         try:
-            payload = {
-                "jsonrpc": "2.0",
-                "method": "condenser_api.get_content",
-                "params": [author, permlink],
-                "id": 1
-            }
-            
-            data = json.dumps(payload).encode('utf-8')
-            req = urllib.request.Request(
-                self.api_url,
-                data=data,
-                headers={
-                    'Content-Type': 'application/json',
-                    'User-Agent': 'cur8.fun/1.0'
-                }
-            )
-            
-            with urllib.request.urlopen(req, timeout=10) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                if 'result' in result and result['result']:
-                    return result['result']
-                return None
+            result = self._timed_call("condenser_api.get_content", [author, permlink])
+            if 'result' in result and result['result']:
+                return result['result']
+            return None
                 
-        except (URLError, HTTPError, json.JSONDecodeError) as e:
-            print(f"Error fetching content: {e}")
+        except (OSError, HTTPException, json.JSONDecodeError) as e:
+            logger.error(f"Error fetching content: {e}")
             return None
     
     def get_accounts(self, usernames):
         """Ottiene i profili utente"""
         try:
-            payload = {
-                "jsonrpc": "2.0",
-                "method": "condenser_api.get_accounts",
-                "params": [usernames],
-                "id": 1
-            }
-            
-            data = json.dumps(payload).encode('utf-8')
-            req = urllib.request.Request(
-                self.api_url,
-                data=data,
-                headers={
-                    'Content-Type': 'application/json',
-                    'User-Agent': 'cur8.fun/1.0'
-                }
-            )
-            
-            with urllib.request.urlopen(req, timeout=10) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                if 'result' in result and result['result']:
-                    return result['result']
-                return []
+            result = self._timed_call("condenser_api.get_accounts", [usernames])
+            if 'result' in result and result['result']:
+                return result['result']
+            return []
                 
-        except (URLError, HTTPError, json.JSONDecodeError) as e:
-            print(f"Error fetching accounts: {e}")
+        except (OSError, HTTPException, json.JSONDecodeError) as e:
+            logger.error(f"Error fetching accounts: {e}")
             return []
     
+    def get_contents(self, posts):
+        """Ottiene più post [(author, permlink), ...] con una sola richiesta batch"""
+        if not posts:
+            return []
+        start = time.perf_counter()
+        error = True
+        try:
+            responses = self._call_batch(
+                [("condenser_api.get_content", [author, permlink]) for author, permlink in posts]
+            )
+            error = any('error' in r for r in responses)
+            return [r.get('result') or None for r in responses]
+        
+        except (OSError, HTTPException, json.JSONDecodeError) as e:
+            logger.error(f"Error fetching contents: {e}")
+            return [None] * len(posts)
+        finally:
+            metrics.observe_steem_call("condenser_api.get_content:batch", time.perf_counter() - start, error)
+    
+    def get_stats(self):
+        """Contatori del pool di connessioni e del coalescer"""
+        return {
+            'api_url': self.api_url,
+            'connections': self.pool.stats(),
+            'coalescer': self.coalescer.stats() if self.coalescer else None
+        }
+    
     def extract_image_from_post(self, post_body, metadata=None):
         """Estrae la migliore immagine da un post"""
-        if not post_body:
-            return None
-            
+        return self.build_preview(post_body, metadata, max_length=0)[0]
+    
+    def build_preview(self, post_body, metadata=None, max_length=160):
+        """Immagine (ottimizzata) e descrizione di un post con una sola scansione del body"""
+        image = None
         # 1. Controlla metadata
         if metadata and isinstance(metadata, dict):
             if 'image' in metadata and metadata['image']:
-                return self.optimize_image_url(metadata['image'][0])
-            if 'thumbnail' in metadata and metadata['thumbnail']:
-                return self.optimize_image_url(metadata['thumbnail'])
-        
-        # 2. Estrai da markdown
-        markdown_pattern = r'!\[.*?\]\((https?://[^\s\)]+)\)'
-        markdown_match = re.search(markdown_pattern, post_body)
-        if markdown_match:
-            return self.optimize_image_url(markdown_match.group(1))
+                image = metadata['image'][0]
+            elif 'thumbnail' in metadata and metadata['thumbnail']:
+                image = metadata['thumbnail']
         
-        # 3. Estrai da HTML
-        html_pattern = r'<img[^>]+src=["\'](https?://[^"\']+)["\'][^>]*>'
-        html_match = re.search(html_pattern, post_body, re.IGNORECASE)
-        if html_match:
-            return self.optimize_image_url(html_match.group(1))
-        
-        # 4. Estrai URL diretti
-        direct_pattern = r'(https?://[^\s<>"\']+\.(?:jpg|jpeg|png|gif|webp)(?:\?[^\s<>"\']*)?)'
-        direct_match = re.search(direct_pattern, post_body, re.IGNORECASE)
-        if direct_match:
-            return self.optimize_image_url(direct_match.group(1))
-        
-        # 5. Estrai da servizi specifici
-        steem_pattern = r'https?://(?:steemitimages\.com|images\.hive\.blog|gateway\.pinata\.cloud|ipfs\.io)/[^\s<>"\']+' 
-        steem_match = re.search(steem_pattern, post_body, re.IGNORECASE)
-        if steem_match:
-            return self.optimize_image_url(steem_match.group(0))
-        
-        return None
+        # 2. Markdown, HTML, URL diretti e host di immagini (vedi python.text_extract)
+        preview = extract_preview(post_body, max_length, find_image=image is None)
+        image = image or preview.image
+        description = preview.description or "Your Steem community social platform"
+        return (self.optimize_image_url(image) if image else None), description
     
     def optimize_image_url(self, url):
         """Ottimizza URL immagine usando proxy Steem"""
@@ -126,24 +282,8 @@ class SteemClient:
     
     def create_description(self, content, max_length=160):
         """Crea descrizione pulita dal contenuto"""
-        if not content:
-            return "Your Steem community social platform"
-        
-        # Rimuovi markdown e HTML
-        clean_content = re.sub(r'!\[.*?\]\(.*?\)', '', content)  # Rimuovi immagini
-        clean_content = re.sub(r'\[.*?\]\(.*?\)', '', clean_content)  # Rimuovi link
-        clean_content = re.sub(r'<[^>]*>', '', clean_content)  # Rimuovi HTML
-        clean_content = re.sub(r'#{1,6}\s', '', clean_content)  # Rimuovi header
-        clean_content = re.sub(r'\*{1,2}(.*?)\*{1,2}', r'\1', clean_content)  # Rimuovi bold
-        clean_content = re.sub(r'`{1,3}(.*?)`{1,3}', r'\1', clean_content)  # Rimuovi code
-        clean_content = re.sub(r'\n+', ' ', clean_content)  # Sostituisci newline
-        clean_content = re.sub(r'\s+', ' ', clean_content)  # Rimuovi spazi multipli
-        clean_content = clean_content.strip()
-        
-        if len(clean_content) > max_length:
-            clean_content = clean_content[:max_length] + '...'
-        
-        return clean_content or "Your Steem community social platform"
+        return extract_preview(content, max_length, find_image=False).description \
+            or "Your Steem community social platform"
     
     def parse_metadata(self, json_metadata):
         """Parse metadata JSON"""
@@ -0,0 +1,144 @@
+"""
+Estrazione in un solo passaggio di descrizione e immagine di anteprima dal body di un post
+
+Il body (markdown + HTML) viene letto una volta sola: un tokenizer compilato
+produce il testo finché la descrizione raggiunge max_length, poi nel resto del
+body si cercano solo immagini migliori di quella già trovata. Ogni token ha una lunghezza massima,
+quindi il tempo resta lineare anche su input patologici (tag non chiusi,
+migliaia di '[' o '*').
+"""
+import re
+from typing import NamedTuple, Optional
+
+# Alternative in ordine di priorità; i limiti {0,N} tengono limitato il backtracking
+TOKEN_RE = re.compile(r'''
+    (?P<linkedimg> \[!\[[^\[\]\n]{0,500}\]\((?P<liurl>[^\s)]{0,2048})[^)\n]{0,300}\)\]\([^\s)]{0,2048}[^)\n]{0,300}\) )
+  | (?P<mdimg> !\[[^\[\]\n]{0,500}\]\((?P<mdurl>[^\s)]{0,2048})[^)\n]{0,300}\) )
+  | (?P<link> \[(?P<ltext>[^\[\]\n]{0,500})\]\((?P<lurl>[^\s)]{0,2048})[^)\n]{0,300}\) )
+  | (?P<tag> <[a-zA-Z/!][^<>]{0,4096}> )
+  | (?P<space> \s+ )
+  | (?P<word> [^\s!\[<]+ )
+  | (?P<other> . )
+''', re.VERBOSE | re.DOTALL)
+
+IMG_SRC_RE = re.compile(r'''\bsrc\s*=\s*["'](https?://[^"']{1,2048})["']''', re.IGNORECASE)
+MARKDOWN_IMAGE_RE = re.compile(r'''!\[[^\[\]\n]{0,500}\]\((https?://[^\s)]{1,2048})''')
+HTML_IMAGE_RE = re.compile(r'''<img\b[^<>]{0,4096}\bsrc\s*=\s*["'](https?://[^"']{1,2048})["']''', re.IGNORECASE)
+DIRECT_IMAGE_RE = re.compile(r'''(https?://[^\s<>"']{1,2048}?\.(?:jpg|jpeg|png|gif|webp)(?:\?[^\s<>"']{0,2048})?)''',
+                             re.IGNORECASE)
+IMAGE_HOST_RE = re.compile(
+    r'''(https?://(?:steemitimages\.com|images\.hive\.blog|gateway\.pinata\.cloud|ipfs\.io)/[^\s<>"']{1,2048})''',
+    re.IGNORECASE)
+# Dopo la descrizione resta da cercare solo l'immagine, in ordine di priorità.
+# Ricerche separate e non un'unica alternanza: re salta al prefisso letterale di
+# ciascuna (![, <img, http), un'alternanza prova ogni posizione del body
+IMAGE_SEARCHES = (MARKDOWN_IMAGE_RE, HTML_IMAGE_RE, DIRECT_IMAGE_RE, IMAGE_HOST_RE)
+HEADER_RE = re.compile(r'#{1,6}')
+
+# Priorità delle immagini: immagine markdown, <img>, URL di un file immagine, URL di un host di immagini
+RANK_MARKDOWN, RANK_HTML, RANK_DIRECT, RANK_HOST, RANK_NONE = range(5)
+
+
+class Preview(NamedTuple):
+    image: Optional[str]
+    description: str
+
+
+def _url_rank(text):
+    """Rank e URL di un'immagine trovata in un testo libero (link o parola)"""
+    if 'http' not in text:
+        return RANK_NONE, None
+    match = DIRECT_IMAGE_RE.search(text)
+    if match:
+        return RANK_DIRECT, match.group(0)
+    match = IMAGE_HOST_RE.search(text)
+    if match:
+        return RANK_HOST, match.group(0)
+    return RANK_NONE, None
+
+
+def extract_preview(body, max_length=160, find_image=True):
+    """
+    Prima immagine e descrizione in testo semplice (al massimo max_length caratteri,
+    più '...' se il testo continua). Markdown e tag HTML vengono rimossi; dei link
+    resta il testo visibile.
+    """
+    if not body:
+        return Preview(None, '')
+
+    pieces = []
+    length = 0
+    text_done = max_length <= 0
+    pending_space = False
+    image, rank = None, RANK_NONE
+    if not find_image:
+        rank = RANK_MARKDOWN  # niente da cercare
+
+    def add_text(text):
+        nonlocal length, text_done, pending_space
+        text = text.replace('*', '').replace('`', '')
+        if not text:
+            return
+        if pending_space and pieces:
+            pieces.append(' ')
+            length += 1
+        pending_space = False
+        pieces.append(text)
+        length += len(text)
+        # Un carattere oltre il limite basta a sapere che serve '...'
+        text_done = length > max_length
+
+    position = len(body)
+    for match in TOKEN_RE.finditer(body):
+        kind = match.lastgroup
+        if kind == 'word':
+            word = match.group('word')
+            if rank > RANK_DIRECT:
+                word_rank, url = _url_rank(word)
+                if word_rank < rank:
+                    image, rank = url, word_rank
+            if not text_done and not HEADER_RE.fullmatch(word):
+                add_text(word)
+        elif kind == 'space':
+            pending_space = True
+        elif kind == 'mdimg' or kind == 'linkedimg':
+            # Un'immagine dentro un link (es. la miniatura di un video) non lascia testo
+            url = match.group('mdurl' if kind == 'mdimg' else 'liurl')
+            if rank > RANK_MARKDOWN and url.startswith(('http://', 'https://')):
+                image, rank = url, RANK_MARKDOWN
+        elif kind == 'link':
+            if rank > RANK_DIRECT:
+                link_rank, url = _url_rank(match.group('lurl'))
+                if link_rank < rank:
+                    image, rank = url, link_rank
+            if not text_done:
+                add_text(match.group('ltext').strip())
+        elif kind == 'tag':
+            tag = match.group('tag')
+            if tag[1:4].lower() == 'img':
+                src = IMG_SRC_RE.search(tag) if rank > RANK_HTML else None
+                if src:
+                    image, rank = src.group(1), RANK_HTML
+            elif rank > RANK_DIRECT:
+                # es. <a href="https://.../foto.jpg">
+                tag_rank, url = _url_rank(tag)
+                if tag_rank < rank:
+                    image, rank = url, tag_rank
+        elif not text_done:
+            add_text(match.group('other'))
+
+        if text_done:
+            position = match.end()
+            break
+
+    # Descrizione completa: nel resto del body si cercano solo immagini migliori
+    for search_rank, pattern in enumerate(IMAGE_SEARCHES[:rank]):
+        found = pattern.search(body, position)
+        if found:
+            image, rank = found.group(1), search_rank
+            break
+
+    description = ''.join(pieces).strip()
+    if len(description) > max_length:
+        description = description[:max_length] + '...'
+    return Preview(image, description)
@@ -1,10 +1,86 @@
 """
 Security middleware for Cloudflare integration
 """
+import logging
 import os
+import time
+import threading
+from bisect import bisect_right
 from flask import request, abort
 from ipaddress import ip_address, ip_network
 
+logger = logging.getLogger(__name__)
+# Una riga per richiesta: campionata tramite LOG_SAMPLING (default 1%)
+cf_logger = logging.getLogger(__name__ + '.cf')
+
+# Cloudflare IP ranges (update these periodically, or use CLOUDFLARE_IPS_FILE)
+CLOUDFLARE_IP_RANGES = [
+    '173.245.48.0/20',
+    '103.21.244.0/22',
+    '103.22.200.0/22',
+    '103.31.4.0/22',
+    '141.101.64.0/18',
+    '108.162.192.0/18',
+    '190.93.240.0/20',
+    '188.114.96.0/20',
+    '197.234.240.0/22',
+    '198.41.128.0/17',
+    '162.158.0.0/15',
+    '104.16.0.0/13',
+    '104.24.0.0/14',
+    '172.64.0.0/13',
+    '131.0.72.0/22',
+    '2400:cb00::/32',
+    '2606:4700::/32',
+    '2803:f800::/32',
+    '2405:b500::/32',
+    '2405:8100::/32',
+    '2a06:98c0::/29',
+    '2c0f:f248::/32',
+]
+
+class IPRangeTable:
+    """
+    IPv4/IPv6 CIDR ranges compiled into sorted, merged integer intervals.
+    A lookup is one address parse plus a binary search.
+    """
+    def __init__(self, cidrs):
+        intervals = {4: [], 6: []}
+        for cidr in cidrs:
+            network = ip_network(cidr.strip(), strict=False)
+            intervals[network.version].append(
+                (int(network.network_address), int(network.broadcast_address))
+            )
+        
+        self._tables = {}
+        for version, ranges in intervals.items():
+            merged = []
+            for start, end in sorted(ranges):
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            self._tables[version] = ([r[0] for r in merged], [r[1] for r in merged])
+        self.size = sum(len(r) for r in intervals.values())
+    
+    def __contains__(self, address):
+        try:
+            ip = ip_address(address)
+        except ValueError:
+            return False
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        starts, ends = self._tables[ip.version]
+        value = int(ip)
+        index = bisect_right(starts, value) - 1
+        return index >= 0 and value <= ends[index]
+
+def load_ip_ranges(path):
+    """Read CIDR ranges from a file, one per line ('#' starts a comment)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = (line.split('#', 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
 class CloudflareSecurityMiddleware:
     def __init__(self, app=None):
         self.app = app
@@ -12,24 +88,15 @@ class CloudflareSecurityMiddleware:
             self.init_app(app)
     
     def init_app(self, app):
-        # Cloudflare IP ranges (update these periodically)
-        self.cloudflare_ips = [
-            '173.245.48.0/20',
-            '103.21.244.0/22',
-            '103.22.200.0/22',
-            '103.31.4.0/22',
-            '141.101.64.0/18',
-            '108.162.192.0/18',
-            '190.93.240.0/20',
-            '188.114.96.0/20',
-            '197.234.240.0/22',
-            '198.41.128.0/17',
-            '162.158.0.0/15',
-            '104.16.0.0/13',
-            '104.24.0.0/14',
-            '172.64.0.0/13',
-            '131.0.72.0/22'
-        ]
+        # Cloudflare IP ranges, optionally loaded (and hot-reloaded) from a local file
+        self.cloudflare_ips = list(CLOUDFLARE_IP_RANGES)
+        self.ips_file = os.environ.get('CLOUDFLARE_IPS_FILE')
+        self.reload_interval = float(os.environ.get('CLOUDFLARE_IPS_RELOAD_INTERVAL', 30))
+        self._ips_file_mtime = None
+        self._next_reload_check = 0.0
+        self._reload_lock = threading.Lock()
+        self.ip_table = IPRangeTable(self.cloudflare_ips)
+        self.reload_ip_ranges()
         
         self.cloudflare_only = os.environ.get('CLOUDFLARE_ONLY', 'false').lower() == 'true'
         
@@ -43,15 +110,43 @@ class CloudflareSecurityMiddleware:
         if not self.cloudflare_only:
             return
             
-        client_ip = ip_address(request.remote_addr)
-        
-        for cf_range in self.cloudflare_ips:
-            if client_ip in ip_network(cf_range):
-                return  # Valid Cloudflare IP
+        if self.is_cloudflare_ip(request.remote_addr):
+            return  # Valid Cloudflare IP
         
         # Not from Cloudflare, reject
         abort(403, "Access denied: requests must come through Cloudflare")
     
+    def reload_ip_ranges(self):
+        """Reload the ranges from CLOUDFLARE_IPS_FILE if it changed; keep the old table on errors"""
+        if not self.ips_file:
+            return False
+        with self._reload_lock:
+            try:
+                mtime = os.stat(self.ips_file).st_mtime_ns
+                if mtime == self._ips_file_mtime:
+                    return False
+                ranges = load_ip_ranges(self.ips_file)
+                table = IPRangeTable(ranges)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not load Cloudflare IP ranges from {self.ips_file}: {e}")
+                return False
+            self.cloudflare_ips = ranges
+            self.ip_table = table
+            self._ips_file_mtime = mtime
+        logger.info(f"Loaded {table.size} Cloudflare IP ranges from {self.ips_file}")
+        return True
+    
+    def is_cloudflare_ip(self, remote_addr):
+        """Return True if remote_addr belongs to a Cloudflare IP range"""
+        if self.ips_file and time.monotonic() >= self._next_reload_check:
+            self._next_reload_check = time.monotonic() + self.reload_interval
+            self.reload_ip_ranges()
+        return remote_addr in self.ip_table
+    
+    def allows_environ(self, environ):
+        """WSGI-level equivalent of check_cloudflare_ip, used by the static fast path"""
+        return not self.cloudflare_only or self.is_cloudflare_ip(environ.get('REMOTE_ADDR'))
+    
     def process_cf_headers(self):
         """Process Cloudflare headers to get real client IP and other info"""
         # Get real client IP from Cloudflare headers
@@ -68,8 +163,40 @@ class CloudflareSecurityMiddleware:
         request.cf_visitor = request.headers.get('CF-Visitor')
         
         # Log security info (optional)
-        if cf_connecting_ip:
-            print(f"[CF] Real IP: {cf_connecting_ip}, Country: {request.cf_country}, Ray: {request.cf_ray}")
+        if cf_connecting_ip and cf_logger.isEnabledFor(logging.INFO):
+            cf_logger.info("CF request", extra={
+                'client_ip': cf_connecting_ip,
+                'country': request.cf_country,
+                'ray': request.cf_ray
+            })
+
+# Security headers, precomputed once and shared with the WSGI static fast path
+SECURITY_HEADERS = [
+    # HTTPS redirect (Cloudflare usually handles this)
+    ('Strict-Transport-Security', 'max-age=31536000; includeSubDomains'),
+    
+    # Content Security Policy
+    ('Content-Security-Policy', (
+        "default-src 'self'; "
+        "script-src 'self' 'unsafe-inline' 'unsafe-eval' "
+        "https://cdn.jsdelivr.net https://unpkg.com https://www.googletagmanager.com "
+        "https://telegram.org https://cdnjs.cloudflare.com; "
+        "style-src 'self' 'unsafe-inline' "
+        "https://fonts.googleapis.com https://cdnjs.cloudflare.com https://cdn.jsdelivr.net https://unpkg.com; "
+        "font-src 'self' data: https://fonts.gstatic.com https://cdnjs.cloudflare.com; "
+        "img-src 'self' data: https: blob:; "
+        "connect-src 'self' https: wss:; "
+        "frame-src 'self' https://telegram.org; "
+        "object-src 'none'; "
+        "base-uri 'self';"
+    )),
+    
+    # Other security headers
+    ('X-Content-Type-Options', 'nosniff'),
+    ('X-Frame-Options', 'SAMEORIGIN'),
+    ('X-XSS-Protection', '1; mode=block'),
+    ('Referrer-Policy', 'strict-origin-when-cross-origin'),
+]
 
 # Security headers middleware
 class SecurityHeadersMiddleware:
@@ -80,29 +207,6 @@ class SecurityHeadersMiddleware:
     def init_app(self, app):
         @app.after_request
         def add_security_headers(response):
-            # HTTPS redirect (Cloudflare usually handles this)
-            response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-            
-            # Content Security Policy
-            response.headers['Content-Security-Policy'] = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' 'unsafe-eval' "
-                "https://cdn.jsdelivr.net https://unpkg.com https://www.googletagmanager.com "
-                "https://telegram.org https://cdnjs.cloudflare.com; "
-                "style-src 'self' 'unsafe-inline' "
-                "https://fonts.googleapis.com https://cdnjs.cloudflare.com https://cdn.jsdelivr.net https://unpkg.com; "
-                "font-src 'self' data: https://fonts.gstatic.com https://cdnjs.cloudflare.com; "
-                "img-src 'self' data: https: blob:; "
-                "connect-src 'self' https: wss:; "
-                "frame-src 'self' https://telegram.org; "
-                "object-src 'none'; "
-                "base-uri 'self';"
-            )
-            
-            # Other security headers
-            response.headers['X-Content-Type-Options'] = 'nosniff'
-            response.headers['X-Frame-Options'] = 'SAMEORIGIN'
-            response.headers['X-XSS-Protection'] = '1; mode=block'
-            response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-            
+            for name, value in SECURITY_HEADERS:
+                response.headers[name] = value
             return response
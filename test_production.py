@@ -15,6 +15,7 @@ def test_app_health(base_url):
     tests = [
         ("/", "Landing page"),
         ("/app", "SPA main page"),
+        ("/healthz", "Liveness probe"),
         ("/api/publisher/status", "API health"),
         ("/manifest.json", "PWA manifest"),
         ("/assets/css/main.css", "Static assets"),
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.app_factory import create_base_app
+from python.models import db, ScheduledPost
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App with only the database configured, on a fresh SQLite file"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    app = create_base_app()
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def web_app(tmp_path_factory):
+    """The app.py module, imported once with its own SQLite file"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp_path_factory.mktemp('web') / 'web.db'}"
+    import app as web
+    return web
+
+
+@pytest.fixture
+def client(web_app):
+    """Test client of the web app, with no scheduled posts"""
+    with web_app.app.app_context():
+        ScheduledPost.query.delete()
+        db.session.commit()
+    return web_app.app.test_client()
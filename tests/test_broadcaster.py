@@ -0,0 +1,134 @@
+import hashlib
+
+import ecdsa
+import pytest
+from ecdsa.util import sigdecode_string
+
+from python.broadcaster import (BASE58_ALPHABET, STEEM_CHAIN_ID, Broadcaster, SteemBroadcaster, StubBroadcaster,
+                                _is_canonical, serialize_transaction, sign_digest)
+
+PRIVATE_KEY = bytes(range(1, 33))
+
+
+def test_signature_verifies_against_the_public_key():
+    digest = hashlib.sha256(b'cur8.fun transaction').digest()
+    signature = bytes.fromhex(sign_digest(digest, PRIVATE_KEY))
+    public_key = ecdsa.SigningKey.from_string(PRIVATE_KEY, curve=ecdsa.SECP256k1).get_verifying_key()
+
+    assert len(signature) == 65 and 31 <= signature[0] <= 34
+    assert _is_canonical(signature[1:])
+    assert public_key.verify_digest(signature[1:], digest, sigdecode=sigdecode_string)
+    # The header byte lets the node recover the signing key
+    recovered = ecdsa.VerifyingKey.from_public_key_recovery_with_digest(
+        signature[1:], digest, ecdsa.SECP256k1, sigdecode=sigdecode_string)
+    assert public_key.to_string() in [key.to_string() for key in recovered]
+
+
+def test_signature_fails_for_another_digest():
+    digest = hashlib.sha256(STEEM_CHAIN_ID + b'transaction').digest()
+    signature = bytes.fromhex(sign_digest(digest, PRIVATE_KEY))
+    public_key = ecdsa.SigningKey.from_string(PRIVATE_KEY, curve=ecdsa.SECP256k1).get_verifying_key()
+
+    with pytest.raises(ecdsa.BadSignatureError):
+        public_key.verify_digest(signature[1:], hashlib.sha256(b'other').digest(), sigdecode=sigdecode_string)
+
+
+def test_comment_transaction_serialization():
+    transaction = {
+        'ref_block_num': 34294,
+        'ref_block_prefix': 3707022213,
+        'expiration': '2016-04-06T08:29:27',
+        'operations': [['comment', {
+            'parent_author': 'foobara', 'parent_permlink': 'foobarb', 'author': 'foobarc',
+            'permlink': 'foobard', 'title': 'foobare', 'body': 'foobarf', 'json_metadata': '{"foo": "bar"}',
+        }]],
+        'extensions': [],
+    }
+    assert serialize_transaction(transaction).hex() == (
+        'f68585abf4dce7c804570101'
+        '07666f6f6261726107666f6f6261726207666f6f6261726307666f6f62617264'
+        '07666f6f6261726507666f6f626172660e7b22666f6f223a2022626172227d00'
+    )
+
+
+def make_post(username, body='Body'):
+    return {'username': username, 'parent_permlink': 'cur8', 'permlink': f'{username}-post',
+            'title': 'Title', 'body': body, 'metadata': {'tags': ['cur8']}}
+
+
+def test_batches_are_capped_by_post_count():
+    broadcaster = StubBroadcaster(latency=0, failure_rate=0, max_posts_per_transaction=2)
+    posts = [make_post(f'user{i}') for i in range(5)]
+
+    assert [len(batch) for batch in broadcaster.split_batches(posts)] == [2, 2, 1]
+
+
+def test_batches_are_capped_by_serialized_size():
+    broadcaster = StubBroadcaster(latency=0, failure_rate=0, max_posts_per_transaction=10)
+    posts = [make_post(f'user{i}', body='x' * 12000) for i in range(6)]
+    batches = broadcaster.split_batches(posts)
+
+    assert [len(batch) for batch in batches] == [2, 2, 2]
+    for batch in batches:
+        assert sum(broadcaster.operations_size(post) for post in batch) <= broadcaster.max_transaction_bytes
+
+
+def test_oversized_post_goes_alone():
+    broadcaster = StubBroadcaster(latency=0, failure_rate=0, max_transaction_bytes=1000)
+    posts = [make_post('alice'), make_post('bob', body='x' * 5000), make_post('carol')]
+
+    assert [[post['username'] for post in batch] for batch in broadcaster.split_batches(posts)] == \
+        [['alice'], ['bob'], ['carol']]
+
+
+class FakeSteemClient:
+    api_url = 'https://api.steemit.com'
+
+    def __init__(self):
+        self.calls = []
+
+    def call(self, method, params):
+        self.calls.append((method, params))
+        if method == 'condenser_api.get_dynamic_global_properties':
+            return {'result': {'time': '2026-01-01T00:00:00', 'head_block_number': 123456,
+                               'head_block_id': '0001e240aabbccdd' + '0' * 24}}
+        return {'result': {}}
+
+
+def wif(private_key):
+    payload = b'\x80' + private_key
+    data = payload + hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+    number, text = int.from_bytes(data, 'big'), ''
+    while number:
+        number, digit = divmod(number, 58)
+        text = BASE58_ALPHABET[digit] + text
+    return text
+
+
+def test_steem_broadcaster_signs_the_locally_serialized_transaction():
+    client = FakeSteemClient()
+    broadcaster = SteemBroadcaster(client, {'*': wif(PRIVATE_KEY)})
+
+    assert broadcaster.publish([make_post('alice')]) == [(True, None)]
+    method, (transaction,) = client.calls[-1]
+    assert method == 'condenser_api.broadcast_transaction_synchronous'
+    digest = hashlib.sha256(STEEM_CHAIN_ID + serialize_transaction(transaction)).digest()
+    public_key = ecdsa.SigningKey.from_string(PRIVATE_KEY, curve=ecdsa.SECP256k1).get_verifying_key()
+    assert public_key.verify_digest(bytes.fromhex(transaction['signatures'][0])[1:], digest,
+                                    sigdecode=sigdecode_string)
+
+
+def test_steem_broadcaster_requires_https_with_keys():
+    client = FakeSteemClient()
+    client.api_url = 'http://node.example'
+
+    with pytest.raises(RuntimeError):
+        SteemBroadcaster(client, {'*': wif(PRIVATE_KEY)})
+
+
+def test_broadcaster_without_send_cannot_be_created():
+    class Incomplete(Broadcaster):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,94 @@
+import pytest
+
+from python.crawler_detect import CrawlerMatcher
+
+CRAWLERS = (
+    'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)',
+    'Mozilla/5.0 (compatible; Discordbot/2.0; +https://discordapp.com)',
+    'TelegramBot (like TwitterBot)',
+    'WhatsApp/2.23.20.0',
+    'Slackbot-LinkExpanding 1.0 (+https://api.slack.com/robots)',
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+)
+BROWSERS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+    'curl/8.4.0',
+)
+
+
+def test_preview_crawlers_are_recognised():
+    matcher = CrawlerMatcher()
+
+    assert all(matcher.is_crawler(ua) for ua in CRAWLERS)
+    assert not any(matcher.is_crawler(ua) for ua in BROWSERS)
+    assert not matcher.is_crawler('') and not matcher.is_crawler(None)
+
+
+def test_patterns_from_env_replace_or_extend_the_defaults(monkeypatch):
+    monkeypatch.setenv('CRAWLER_USER_AGENTS', 'MyPreviewBot, ')
+    assert CrawlerMatcher.from_env().patterns == ('MyPreviewBot',)
+
+    monkeypatch.delenv('CRAWLER_USER_AGENTS')
+    monkeypatch.setenv('CRAWLER_USER_AGENTS_EXTRA', 'curl')
+    matcher = CrawlerMatcher.from_env()
+    assert matcher.is_crawler('curl/8.4.0') and matcher.is_crawler(CRAWLERS[0])
+
+
+def test_decision_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(CrawlerMatcher, 'CACHE_SIZE', 4)
+    matcher = CrawlerMatcher()
+    for i in range(10):
+        matcher.is_crawler(f'Browser/{i}')
+
+    assert len(matcher._cache) <= 4
+    assert matcher.is_crawler(CRAWLERS[0])
+
+
+def test_classify_counts_each_decision():
+    matcher = CrawlerMatcher()
+    for ua in CRAWLERS[:2] + BROWSERS:
+        matcher.classify(ua)
+
+    assert matcher.stats() == {'crawler': 2, 'browser': 3, 'patterns': len(matcher.patterns)}
+
+
+@pytest.fixture
+def meta_calls(web_app, monkeypatch):
+    calls = []
+
+    def generate_post_meta(author, permlink, base_url):
+        calls.append((author, permlink))
+        return {'title': 'Post', 'description': 'About', 'image': '', 'type': 'article', 'url': base_url}
+
+    monkeypatch.setattr(web_app.meta_generator, 'generate_post_meta', generate_post_meta)
+    return calls
+
+
+def test_only_crawlers_get_dynamic_post_meta(client, meta_calls):
+    browser = client.get('/app/@alice/post', headers={'User-Agent': BROWSERS[0]})
+    assert b'og:title" content="Post"' not in browser.data
+    assert 'User-Agent' in browser.headers['Vary']
+    assert meta_calls == []
+
+    crawler = client.get('/app/@alice/post', headers={'User-Agent': CRAWLERS[1]})
+    assert b'og:title" content="Post"' in crawler.data
+    assert meta_calls == [('alice', 'post')]
+
+
+def test_crawler_only_meta_can_be_disabled(client, web_app, meta_calls, monkeypatch):
+    monkeypatch.setattr(web_app, 'crawler_only_meta', False)
+
+    browser = client.get('/app/@alice/post', headers={'User-Agent': BROWSERS[0]})
+    assert b'og:title" content="Post"' in browser.data
+    assert meta_calls == [('alice', 'post')]
+
+
+def test_routing_decisions_are_counted_for_post_urls_only(client, web_app, meta_calls):
+    before = web_app.crawler_matcher.stats()
+    client.get('/app/@alice/post', headers={'User-Agent': BROWSERS[0]})
+    client.get('/app/@alice/post', headers={'User-Agent': CRAWLERS[0]})
+    client.get('/app/@alice', headers={'User-Agent': BROWSERS[0]})
+    after = web_app.crawler_matcher.stats()
+
+    assert (after['crawler'] - before['crawler'], after['browser'] - before['browser']) == (1, 1)
@@ -0,0 +1,78 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from python import http_pool
+from python.http_pool import HTTPConnectionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Idle keep-alive connections are closed by the server after this many seconds
+    timeout = 0.2
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.connections.add(self.client_address)
+        body = b'{"result": 1}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    server.daemon_threads = True
+    server.connections = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_pool(server):
+    return HTTPConnectionPool(f'http://127.0.0.1:{server.server_port}/', pool_size=2)
+
+
+def test_sequential_requests_reuse_one_connection(server):
+    pool = make_pool(server)
+    for _ in range(3):
+        assert pool.request('POST', body=b'{}') == (200, b'{"result": 1}')
+
+    assert len(server.connections) == 1
+    assert pool.stats() == {'opened': 1, 'reused': 2, 'discarded': 0, 'idle': 1, 'pool_size': 2}
+    pool.close()
+
+
+def test_child_process_does_not_reuse_inherited_connections(server, monkeypatch):
+    pool = make_pool(server)
+    pool.request('POST', body=b'{}')
+    parent_pid = pool._pid
+
+    # After a fork the pool sees another pid and drops the parent's idle connections
+    monkeypatch.setattr(http_pool.os, 'getpid', lambda: parent_pid + 1)
+    pool.request('POST', body=b'{}')
+
+    assert len(server.connections) == 2
+    assert (pool.opened, pool.reused) == (2, 0)
+    assert pool._pid == parent_pid + 1
+    pool.close()
+
+
+def test_connection_closed_while_idle_is_retried_on_a_new_one(server):
+    pool = make_pool(server)
+    pool.request('POST', body=b'{}')
+    time.sleep(0.5)
+
+    assert pool.request('POST', body=b'{}') == (200, b'{"result": 1}')
+    assert (pool.opened, pool.reused) == (2, 1)
+    pool.close()
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from python.index_template import IndexTemplate
+
+TEMPLATE = """<html>
+<head>
+    <!-- Social Media Sharing Preview Metadata -->
+    <meta property="og:title" content="cur8.fun" />
+    <!-- Server-side rendered meta elements will be generated here -->
+</head>
+<body></body>
+</html>
+"""
+
+CRAWLER = 'facebookexternalhit/1.1'
+BROWSER = 'Mozilla/5.0 (X11; Linux x86_64) Firefox/120.0'
+
+
+@pytest.fixture
+def template(tmp_path):
+    path = tmp_path / 'index.html'
+    path.write_text(TEMPLATE, encoding='utf-8')
+    return IndexTemplate(str(path))
+
+
+def test_meta_tags_replace_the_static_block(template):
+    body, _ = template.render('<title>Post</title>')
+
+    assert b'<title>Post</title>' in body
+    assert b'og:title" content="cur8.fun"' not in body
+    assert body.startswith(b'<html>') and body.endswith(b'</html>\n')
+
+
+def test_etag_depends_on_meta_and_template(template):
+    _, etag = template.render('<title>Post</title>')
+    assert template.render('<title>Post</title>')[1] == etag
+    assert template.render('<title>Other</title>')[1] != etag
+
+    # A new index.html (new mtime) is picked up without a restart
+    path = template.path
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('<!-- deploy -->\n')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert template.render('<title>Post</title>')[1] != etag
+
+
+def test_template_without_markers_gets_meta_before_head_end(tmp_path):
+    path = tmp_path / 'index.html'
+    path.write_text('<html><head></head><body></body></html>', encoding='utf-8')
+
+    body, _ = IndexTemplate(str(path)).render('<title>Post</title>')
+    assert body == b'<html><head>    <title>Post</title>\n</head><body></body></html>'
+
+
+def test_static_index_answers_304_to_a_matching_etag(client):
+    first = client.get('/app')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'no-cache'
+    etag = first.headers['ETag']
+
+    second = client.get('/app', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert client.get('/app', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_crawler_preview_answers_304_to_a_matching_etag(client, web_app, monkeypatch):
+    meta = {'title': 'Post', 'description': 'About', 'image': 'https://example.com/a.png',
+            'type': 'article', 'author': 'alice'}
+    monkeypatch.setattr(web_app.meta_generator, 'generate_post_meta',
+                        lambda author, permlink, base_url: dict(meta, url=base_url))
+
+    first = client.get('/app/@alice/post', headers={'User-Agent': CRAWLER})
+    assert first.status_code == 200
+    assert b'og:title" content="Post"' in first.data
+    assert 'User-Agent' in first.headers['Vary']
+
+    second = client.get('/app/@alice/post', headers={'User-Agent': CRAWLER,
+                                                     'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+
+    # Browsers get the static index, with its own ETag
+    browser = client.get('/app/@alice/post', headers={'User-Agent': BROWSER})
+    assert b'og:title" content="Post"' not in browser.data
+    assert browser.headers['ETag'] != first.headers['ETag']
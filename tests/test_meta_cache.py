@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from python import meta_cache
+from python.meta_cache import MetaCache
+from python.meta_generator import MetaTagGenerator
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl_and_stay_stale_until_stale_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(meta_cache, 'time', clock)
+    cache = MetaCache(ttl=300, stale_ttl=600)
+    cache.set(('alice', 'post'), {'title': 'Hello'})
+
+    clock.now += 299
+    assert cache.get(('alice', 'post')) == {'title': 'Hello'}
+    clock.now += 2
+    assert cache.get(('alice', 'post')) is None
+    assert cache.get_stale(('alice', 'post')) == {'title': 'Hello'}
+    clock.now += 600
+    assert cache.get_stale(('alice', 'post')) is None
+
+
+def test_get_returns_a_copy():
+    cache = MetaCache()
+    cache.set('key', {'title': 'Hello'})
+    cache.get('key')['title'] = 'Changed'
+
+    assert cache.get('key') == {'title': 'Hello'}
+
+
+def test_concurrent_misses_run_the_loader_once():
+    cache = MetaCache()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return {'title': 'Hello'}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(cache.get_or_load, 'key', loader) for _ in range(8)]
+        # Every thread is waiting on the same load before it completes
+        while cache.misses + cache.coalesced < 8:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result(5) for future in futures]
+
+    assert len(calls) == 1
+    assert results == [{'title': 'Hello'}] * 8
+    assert (cache.misses, cache.coalesced) == (1, 7)
+
+
+def test_none_is_not_cached():
+    cache = MetaCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return None
+
+    assert cache.get_or_load('missing', loader) is None
+    assert cache.get_or_load('missing', loader) is None
+    assert len(calls) == 2
+
+
+def test_post_meta_url_does_not_leak_into_the_cache(app):
+    generator = MetaTagGenerator()
+    generator.snapshots.init_app(app)
+    generator.snapshots.save('alice', 'post', {'title': 'Hello', 'description': '', 'image': '',
+                                               'type': 'article'})
+
+    first = generator.generate_post_meta('alice', 'post', base_url='https://a.example')
+    second = generator.generate_post_meta('alice', 'post', base_url='https://b.example')
+
+    assert first['url'] == 'https://a.example/@alice/post'
+    assert second['url'] == 'https://b.example/@alice/post'
+    assert 'url' not in generator.cache.local.get(('alice', 'post'))[0]
@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from python import meta_generator as meta_generator_module
+from python.meta_generator import MetaTagGenerator
+from python.models import db, PostPreview
+
+POST = {
+    'id': 7,
+    'title': 'Fresh title',
+    'body': '![cover](https://x.com/cover.png) Hello from Steem',
+    'json_metadata': '{}',
+    'created': '2026-01-01T10:00:00',
+    'last_update': '2026-01-01T11:00:00',
+}
+
+
+@pytest.fixture
+def steem(monkeypatch):
+    """Fake get_content that counts calls; fetched is set once it has answered"""
+    steem = type('FakeSteem', (), {})()
+    steem.calls = []
+    steem.fetched = threading.Event()
+
+    def get_content(author, permlink):
+        steem.calls.append((author, permlink))
+        steem.fetched.set()
+        return POST
+
+    monkeypatch.setattr(meta_generator_module.steem_client, 'get_content', get_content)
+    return steem
+
+
+@pytest.fixture
+def generator(app):
+    generator = MetaTagGenerator()
+    generator.init_app(app)
+    return generator
+
+
+def age_snapshot(author, permlink, seconds):
+    db.session.execute(update(PostPreview)
+                       .where(PostPreview.author == author, PostPreview.permlink == permlink)
+                       .values(fetched_at=datetime.utcnow() - timedelta(seconds=seconds)))
+    db.session.commit()
+
+
+def wait_for_refresh(generator, key):
+    """Until the background fetch has filled the cache"""
+    for _ in range(200):
+        if generator.cache.get(key) is not None:
+            return
+        time.sleep(0.01)
+    pytest.fail('background refresh did not complete')
+
+
+def test_first_fetch_saves_a_snapshot(generator, steem):
+    meta = generator.generate_post_meta('alice', 'post')
+
+    assert meta['title'] == 'Fresh title'
+    assert meta['image'].endswith('https://x.com/cover.png')
+    snapshot, _ = generator.snapshots.get('alice', 'post')
+    assert snapshot['title'] == 'Fresh title' and 'url' not in snapshot
+    row = db.session.get(PostPreview, ('alice', 'post'))
+    assert row.last_update == datetime(2026, 1, 1, 11)
+
+
+def test_recent_snapshot_is_served_without_steem(generator, steem):
+    generator.snapshots.save('alice', 'post', {'title': 'Saved title', 'description': 'Saved',
+                                               'image': '', 'type': 'article'})
+
+    meta = generator.generate_post_meta('alice', 'post')
+    assert meta['title'] == 'Saved title'
+    assert steem.calls == []
+    assert generator.snapshot_hits == 1
+    # Cached for the rest of the TTL: the next request does not read the database
+    assert generator.generate_post_meta('alice', 'post')['title'] == 'Saved title'
+    assert generator.snapshot_hits == 1
+
+
+def test_old_snapshot_is_served_and_refreshed_in_background(generator, steem):
+    generator.snapshots.save('alice', 'post', {'title': 'Old title', 'description': 'Old',
+                                               'image': '', 'type': 'article'})
+    age_snapshot('alice', 'post', generator.cache.ttl + 60)
+
+    meta = generator.generate_post_meta('alice', 'post')
+    assert meta['title'] == 'Old title'
+    assert steem.fetched.wait(5)
+    wait_for_refresh(generator, ('alice', 'post'))
+
+    assert generator.generate_post_meta('alice', 'post')['title'] == 'Fresh title'
+    assert generator.snapshots.get('alice', 'post')[0]['title'] == 'Fresh title'
+    assert steem.calls == [('alice', 'post')]
+
+
+def test_database_errors_fall_back_to_steem(generator, steem):
+    PostPreview.__table__.drop(db.engine)
+
+    meta = generator.generate_post_meta('alice', 'post')
+    assert meta['title'] == 'Fresh title'
+    assert steem.calls == [('alice', 'post')]
+
+
+def test_prune_drops_snapshots_past_retention(generator):
+    for permlink in ('old', 'new'):
+        generator.snapshots.save('alice', permlink, {'title': permlink})
+    age_snapshot('alice', 'old', generator.snapshots.retention.total_seconds() + 60)
+
+    generator.snapshots.prune()
+    assert generator.snapshots.get('alice', 'old') is None
+    assert generator.snapshots.get('alice', 'new') is not None
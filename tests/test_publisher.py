@@ -0,0 +1,185 @@
+import json
+import random
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from python.broadcaster import BroadcastError
+from python.models import db, PublisherHeartbeat, ScheduledPost
+from python.publisher import AccountRateLimiter, ScheduledPostPublisher
+
+
+@pytest.fixture
+def due_posts(app):
+    now = datetime.utcnow()
+    posts = [ScheduledPost(username=f'user{i}', title='Title', body='Body', tags='cur8',
+                           scheduled_datetime=now - timedelta(minutes=1), status='scheduled')
+             for i in range(5)]
+    db.session.add_all(posts)
+    db.session.commit()
+    return [post.id for post in posts]
+
+
+def make_publisher(app):
+    publisher = ScheduledPostPublisher(app)
+    publisher.lease_seconds = 60
+    return publisher
+
+
+def claimed_ids(posts):
+    return sorted(post.id for post in posts)
+
+
+def test_second_claimer_gets_nothing_while_leased(app, due_posts):
+    first, second = make_publisher(app), make_publisher(app)
+    now = datetime.utcnow()
+
+    assert claimed_ids(first._claim_due_posts(now)) == due_posts
+    assert second._claim_due_posts(now) == []
+
+
+def test_claimers_with_stale_candidates_never_share_a_row(app, due_posts, monkeypatch):
+    first, second = make_publisher(app), make_publisher(app)
+    now = datetime.utcnow()
+    scalars = db.session.scalars
+    claimed = {}
+
+    def race(*args, **kwargs):
+        # The other claimer takes the rows between our SELECT and our UPDATE
+        result = scalars(*args, **kwargs)
+        if not claimed:
+            claimed['second'] = None
+            claimed['second'] = second._claim_due_posts(now)
+        return result
+
+    monkeypatch.setattr(db.session, 'scalars', race)
+    claimed['first'] = first._claim_due_posts(now)
+    monkeypatch.undo()
+
+    assert claimed_ids(claimed['second']) == due_posts
+    assert claimed['first'] == []
+
+
+def test_expired_lease_is_reclaimed(app, due_posts):
+    crashed, survivor = make_publisher(app), make_publisher(app)
+    now = datetime.utcnow()
+    crashed._claim_due_posts(now)
+
+    assert survivor._claim_due_posts(now + timedelta(seconds=30)) == []
+    reclaimed = survivor._claim_due_posts(now + timedelta(seconds=61))
+    assert claimed_ids(reclaimed) == due_posts
+    assert len({post.claimed_by for post in reclaimed}) == 1
+
+
+def test_retry_keeps_scheduled_datetime(app, due_posts):
+    publisher = make_publisher(app)
+    now = datetime.utcnow()
+    post_id = due_posts[0]
+    scheduled = db.session.get(ScheduledPost, post_id).scheduled_datetime
+    publisher._claim_due_posts(now)
+    result = publisher._classify({'post_id': post_id, 'username': 'user0', 'attempts': 0}, False,
+                                 BroadcastError('node timeout', transient=True))
+    publisher._commit_results([result])
+    db.session.expire_all()
+
+    post = db.session.get(ScheduledPost, post_id)
+    assert post.scheduled_datetime == scheduled
+    assert post.next_attempt_at == result.retry_at
+    # Not due again until next_attempt_at, although scheduled_datetime has passed
+    assert post_id not in claimed_ids(publisher._claim_due_posts(now + timedelta(seconds=1)))
+    assert post_id in claimed_ids(publisher._claim_due_posts(result.retry_at + timedelta(seconds=61)))
+
+
+def test_bucket_refills_one_token_per_interval():
+    limiter = AccountRateLimiter(interval=10, burst=2)
+    start = datetime(2026, 1, 1)
+
+    assert limiter.acquire('alice', start) is None
+    assert limiter.acquire('alice', start) is None
+    assert limiter.acquire('alice', start) == start + timedelta(seconds=10)
+    assert limiter.acquire('alice', start + timedelta(seconds=5)) == start + timedelta(seconds=10)
+    assert limiter.acquire('alice', start + timedelta(seconds=10)) is None
+    # Other accounts have their own bucket
+    assert limiter.acquire('bob', start) is None
+
+
+def test_bucket_is_rebuilt_from_publish_history():
+    limiter = AccountRateLimiter(interval=300, burst=1)
+    now = datetime(2026, 1, 1, 12)
+    limiter.load({'alice': [now - timedelta(seconds=100)]}, now)
+
+    assert limiter.acquire('alice', now) == now + timedelta(seconds=200)
+    limiter.refund('alice', now)
+    assert limiter.acquire('alice', now) is None
+
+
+def test_backoff_doubles_up_to_the_maximum(app):
+    publisher = make_publisher(app)
+    publisher.backoff_base, publisher.backoff_max = 30, 300
+    random.seed(0)
+
+    for attempts, delay in ((1, 30), (2, 60), (3, 120), (4, 240), (5, 300), (8, 300)):
+        for _ in range(50):
+            assert delay / 2 <= publisher._backoff(attempts) <= delay
+
+
+def test_post_fails_after_max_attempts(app):
+    publisher = make_publisher(app)
+    publisher.max_attempts = 3
+    error = BroadcastError('node timeout', transient=True)
+    post = {'post_id': 1, 'username': 'alice'}
+
+    assert publisher._classify(dict(post, attempts=1), False, error).kind == 'retry'
+    assert publisher._classify(dict(post, attempts=2), False, error).kind == 'failed'
+
+
+def test_permlinks_differ_for_same_title_and_time(app):
+    when = datetime(2026, 1, 1, 12)
+    posts = [ScheduledPost(username='alice', title='Daily report!', body='Body', tags='cur8',
+                           scheduled_datetime=when, status='scheduled') for _ in range(2)]
+    db.session.add_all(posts)
+    db.session.commit()
+
+    permlinks = [ScheduledPostPublisher._make_permlink(post) for post in posts]
+    assert permlinks[0] != permlinks[1]
+    assert all(p.startswith('daily-report-20260101t120000z-') for p in permlinks)
+    assert all(re.fullmatch(r'[a-z0-9-]+', p) for p in permlinks)
+
+
+def test_wakeup_payload_moves_and_drops_due_times(app):
+    publisher = make_publisher(app)
+    publisher.running = True  # as in the publisher process, without its threads
+    due = datetime(2026, 1, 1, 12)
+    publisher.schedule_many([(1, due), (2, due)])
+
+    publisher._apply_wakeup(json.dumps([[1, (due + timedelta(hours=1)).isoformat()], [2, None]]))
+    assert publisher._due_times == {1: due + timedelta(hours=1)}
+    assert publisher._next_due_locked() == due + timedelta(hours=1)
+
+    publisher._apply_wakeup('not json')
+    assert publisher._due_times == {1: due + timedelta(hours=1)}
+
+
+def test_web_process_does_not_notify_without_postgresql(app, monkeypatch):
+    publisher = make_publisher(app)
+    monkeypatch.setattr(db.session, 'execute', lambda *args, **kwargs: pytest.fail('unexpected query'))
+
+    assert not publisher.supports_wakeup()
+    publisher.schedule(1, datetime(2026, 1, 1, 12))
+    assert publisher._due_times == {}
+
+
+def test_status_reports_the_running_instance_check_interval(app, due_posts):
+    publisher = make_publisher(app)
+    publisher.reconcile_interval = 30
+    status = publisher.get_status()
+    assert (status['running'], status['check_interval'], status['scheduled_posts']) == (False, 30, 5)
+
+    now = datetime.utcnow()
+    db.session.add(PublisherHeartbeat(instance='worker:1:abc', started_at=now, last_seen=now,
+                                      reconcile_interval=300))
+    db.session.commit()
+    publisher._status = None
+    status = publisher.get_status()
+    assert (status['running'], status['check_interval']) == (True, 300)
@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from python.steem_client import RequestCoalescer
+
+ACCOUNTS = RequestCoalescer.ACCOUNTS_METHOD
+
+
+class FakeNode:
+    """send_batch that answers get_accounts from a fixed set of accounts"""
+
+    def __init__(self, accounts=('alice', 'bob', 'carol'), error=None):
+        self.accounts = accounts
+        self.error = error
+        self.batches = []
+
+    def __call__(self, calls):
+        self.batches.append(calls)
+        if isinstance(self.error, Exception):
+            raise self.error
+        responses = []
+        for method, params in calls:
+            if method == ACCOUNTS and self.error:
+                responses.append({'error': self.error})
+            elif method == ACCOUNTS:
+                responses.append({'result': [{'name': n} for n in params[0] if n in self.accounts]})
+            else:
+                responses.append({'result': [method, params]})
+        return responses
+
+
+def submit_together(coalescer, calls):
+    """Submit every call from its own thread at the same time"""
+    barrier = threading.Barrier(len(calls))
+
+    def submit(call):
+        barrier.wait()
+        return coalescer.submit(*call)
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        futures = [pool.submit(submit, call) for call in calls]
+        return [future.result(5) for future in futures]
+
+
+def test_concurrent_get_accounts_are_merged_into_one_call():
+    node = FakeNode()
+    coalescer = RequestCoalescer(node, window=0.2)
+
+    results = submit_together(coalescer, [
+        (ACCOUNTS, [['bob', 'alice']]),
+        (ACCOUNTS, [['carol', 'bob', 'nobody']]),
+        ('condenser_api.get_content', ['alice', 'post']),
+    ])
+
+    assert len(node.batches) == 1
+    methods = [method for method, _ in node.batches[0]]
+    assert sorted(methods) == sorted([ACCOUNTS, 'condenser_api.get_content'])
+    merged = next(params for method, params in node.batches[0] if method == ACCOUNTS)
+    assert sorted(merged[0]) == ['alice', 'bob', 'carol', 'nobody']
+    # Each caller gets its own accounts, in the order it asked for them
+    assert results[0] == {'result': [{'name': 'bob'}, {'name': 'alice'}]}
+    assert results[1] == {'result': [{'name': 'carol'}, {'name': 'bob'}]}
+    assert results[2] == {'result': ['condenser_api.get_content', ['alice', 'post']]}
+    assert coalescer.stats()['calls'] == 3
+
+
+def test_get_accounts_error_reaches_every_caller():
+    node = FakeNode(error={'code': -32000, 'message': 'node busy'})
+    coalescer = RequestCoalescer(node, window=0.2)
+
+    results = submit_together(coalescer, [(ACCOUNTS, [['alice']]), (ACCOUNTS, [['bob']])])
+
+    assert results == [{'error': {'code': -32000, 'message': 'node busy'}}] * 2
+
+
+def test_transport_error_reaches_every_caller():
+    coalescer = RequestCoalescer(FakeNode(error=ConnectionResetError('reset')), window=0.2)
+
+    with pytest.raises(ConnectionResetError):
+        submit_together(coalescer, [(ACCOUNTS, [['alice']]), ('condenser_api.get_content', ['a', 'b'])])
+
+
+def test_full_batch_is_sent_before_the_window_ends():
+    node = FakeNode()
+    coalescer = RequestCoalescer(node, window=5, max_batch=3)
+
+    start = time.monotonic()
+    submit_together(coalescer, [('condenser_api.get_content', ['alice', str(i)]) for i in range(3)])
+
+    assert time.monotonic() - start < 2
+    assert [len(batch) for batch in node.batches] == [3]
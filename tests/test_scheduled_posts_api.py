@@ -0,0 +1,194 @@
+import json
+from datetime import datetime, timedelta
+
+from python.models import db, ScheduledPost
+
+
+def add_posts(web_app, count, username='alice', status='scheduled'):
+    start = datetime(2026, 1, 1, 12)
+    with web_app.app.app_context():
+        # Two posts per minute, so pages also break between equal datetimes
+        posts = [ScheduledPost(username=username, title=f'Post {i}', body='Body', tags='cur8',
+                               scheduled_datetime=start + timedelta(minutes=i // 2), status=status)
+                 for i in range(count)]
+        db.session.add_all(posts)
+        db.session.commit()
+        return [post.id for post in posts]
+
+
+def test_list_without_limit_or_cursor_returns_every_post(client, web_app):
+    ids = add_posts(web_app, 150)
+
+    response = client.get('/api/scheduled_posts?username=alice')
+    assert response.status_code == 200
+    assert [post['id'] for post in response.get_json()] == ids
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_pages_follow_the_cursor_without_gaps(client, web_app):
+    ids = add_posts(web_app, 7)
+    add_posts(web_app, 3, username='bob')
+    seen, url = [], '/api/scheduled_posts?username=alice&limit=3'
+
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page) <= 3
+        seen += [post['id'] for post in page]
+        cursor = response.headers.get('X-Next-Cursor')
+        url = f'/api/scheduled_posts?username=alice&limit=3&cursor={cursor}' if cursor else None
+
+    assert seen == ids
+
+
+def test_cursor_alone_uses_the_default_page_size(client, web_app):
+    add_posts(web_app, 5)
+    first = client.get('/api/scheduled_posts?username=alice&limit=2')
+    cursor = first.headers['X-Next-Cursor']
+
+    response = client.get(f'/api/scheduled_posts?username=alice&cursor={cursor}')
+    assert len(response.get_json()) == 3
+
+
+def test_bad_cursor_and_limit_are_rejected(client, web_app):
+    add_posts(web_app, 2)
+    for cursor in ('not-base64!', 'bm90IGpzb24=', 'WzFd', 'WyJ4IiwgMV0=', 'MQ==', 'é'):
+        response = client.get(f'/api/scheduled_posts?username=alice&cursor={cursor}')
+        assert response.status_code == 400, cursor
+        assert response.get_json() == {'error': 'Invalid cursor'}
+    assert client.get('/api/scheduled_posts?username=alice&limit=ten').status_code == 400
+
+
+def test_status_filter_and_field_projection(client, web_app):
+    add_posts(web_app, 2)
+    add_posts(web_app, 1, status='published')
+
+    response = client.get('/api/scheduled_posts?username=alice&status=published&fields=id,title')
+    posts = response.get_json()
+    assert len(posts) == 1
+    assert set(posts[0]) == {'id', 'title'}
+    assert client.get('/api/scheduled_posts?username=alice&fields=password').status_code == 400
+
+
+def new_post(i, **fields):
+    return dict({'username': 'alice', 'title': f'Post {i}', 'body': 'Body', 'tags': ['cur8', 'steem'],
+                 'scheduled_datetime': f'2026-01-01T12:0{i}:00Z'}, **fields)
+
+
+def count_posts(web_app):
+    with web_app.app.app_context():
+        return ScheduledPost.query.count()
+
+
+def test_bulk_create_returns_ids_in_request_order(client, web_app):
+    response = client.post('/api/scheduled_posts/bulk', json={'posts': [new_post(i) for i in range(3)]})
+
+    assert response.status_code == 201
+    items = response.get_json()['items']
+    assert [item['index'] for item in items] == [0, 1, 2]
+    with web_app.app.app_context():
+        titles = [db.session.get(ScheduledPost, item['id']).title for item in items]
+        post = db.session.get(ScheduledPost, items[0]['id'])
+        assert (post.tags, post.status, post.scheduled_datetime) == ('cur8,steem', 'scheduled',
+                                                                   datetime(2026, 1, 1, 12, 0))
+    assert titles == ['Post 0', 'Post 1', 'Post 2']
+
+
+def test_bulk_create_writes_nothing_if_an_item_is_invalid(client, web_app):
+    posts = [new_post(0), new_post(1, title=None), new_post(2, tags='cur8'), new_post(3, title=5),
+             new_post(4, scheduled_datetime='tomorrow'), 'not a post']
+    response = client.post('/api/scheduled_posts/bulk', json={'posts': posts})
+
+    assert response.status_code == 400
+    assert [item['index'] for item in response.get_json()['items']] == [1, 2, 3, 4, 5]
+    assert count_posts(web_app) == 0
+
+
+def test_bulk_requests_must_carry_a_bounded_array(client):
+    assert client.post('/api/scheduled_posts/bulk', json={'posts': []}).status_code == 400
+    assert client.post('/api/scheduled_posts/bulk', json={'items': [new_post(0)]}).status_code == 400
+    response = client.post('/api/scheduled_posts/bulk', json=[new_post(0)] * 501)
+    assert response.status_code == 400
+    assert client.delete('/api/scheduled_posts/bulk', json={'ids': ['1']}).status_code == 400
+
+
+def test_bulk_patch_applies_every_update(client, web_app):
+    ids = add_posts(web_app, 3)
+    with web_app.app.app_context():
+        db.session.get(ScheduledPost, ids[1]).next_attempt_at = datetime(2026, 1, 1, 13)
+        db.session.commit()
+
+    response = client.patch('/api/scheduled_posts/bulk', json={'posts': [
+        {'id': ids[0], 'title': 'Renamed', 'tags': ['news']},
+        {'id': ids[1], 'scheduled_datetime': '2026-02-01T08:00:00'},
+        {'id': ids[2], 'status': 'draft'},
+    ]})
+
+    assert response.status_code == 200
+    with web_app.app.app_context():
+        first, second, third = (db.session.get(ScheduledPost, post_id) for post_id in ids)
+        assert (first.title, first.tags) == ('Renamed', 'news')
+        # A new time replaces the pending retry slot
+        assert (second.scheduled_datetime, second.next_attempt_at) == (datetime(2026, 2, 1, 8), None)
+        assert third.status == 'draft'
+
+
+def test_bulk_patch_rejects_unknown_ids_and_bad_fields_without_writing(client, web_app):
+    ids = add_posts(web_app, 1)
+
+    response = client.patch('/api/scheduled_posts/bulk', json={'posts': [
+        {'id': ids[0], 'title': 'Renamed'},
+        {'id': ids[0] + 100, 'title': 'Missing'},
+        {'title': 'No id'},
+        {'id': ids[0], 'tags': 'news'},
+    ]})
+
+    assert response.status_code == 400
+    errors = {item['index']: item['error'] for item in response.get_json()['items']}
+    assert errors == {1: 'Not found', 2: 'Missing id', 3: 'Invalid tags: must be a list of strings without commas'}
+    with web_app.app.app_context():
+        assert db.session.get(ScheduledPost, ids[0]).title == 'Post 0'
+
+
+def test_bulk_delete_reports_each_id(client, web_app):
+    ids = add_posts(web_app, 2)
+
+    response = client.delete('/api/scheduled_posts/bulk', json={'ids': [ids[1], ids[0] + 100]})
+
+    assert response.status_code == 200
+    assert [item['status'] for item in response.get_json()['items']] == ['deleted', 'not_found']
+    assert count_posts(web_app) == 1
+
+
+def export(client, query):
+    response = client.get(f'/api/scheduled_posts/export?{query}')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_export_streams_one_json_object_per_line(client, web_app, monkeypatch):
+    # Batches smaller than the result, so rows come from several fetches
+    monkeypatch.setattr(web_app, 'EXPORT_BATCH_SIZE', 2)
+    ids = add_posts(web_app, 5)
+    add_posts(web_app, 2, username='bob')
+
+    posts = export(client, 'username=alice')
+    assert [post['id'] for post in posts] == ids
+    assert posts[0]['title'] == 'Post 0' and posts[0]['body'] == 'Body'
+
+
+def test_export_filters_by_status_and_time_range(client, web_app):
+    ids = add_posts(web_app, 6)
+    published = add_posts(web_app, 1, status='published')
+
+    assert [post['id'] for post in export(client, 'username=alice&status=published')] == published
+    # from is inclusive, to is exclusive (posts are two per minute from 12:00)
+    window = export(client, 'username=alice&status=scheduled&from=2026-01-01T12:01:00Z&to=2026-01-01T12:02:00')
+    assert [post['id'] for post in window] == ids[2:4]
+
+
+def test_export_requires_username_and_valid_dates(client):
+    assert client.get('/api/scheduled_posts/export').status_code == 400
+    assert client.get('/api/scheduled_posts/export?username=alice&from=yesterday').status_code == 400
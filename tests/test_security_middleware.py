@@ -0,0 +1,119 @@
+import os
+import random
+from ipaddress import ip_address, ip_network
+
+import pytest
+from flask import Flask
+
+from security_middleware import CLOUDFLARE_IP_RANGES, CloudflareSecurityMiddleware, IPRangeTable
+
+
+def reference_contains(cidrs, address):
+    """Same answer computed with ipaddress, one network at a time"""
+    ip = ip_address(address)
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return any(ip in ip_network(cidr) for cidr in cidrs)
+
+
+def test_ipv4_boundaries():
+    table = IPRangeTable(['173.245.48.0/20', '104.16.0.0/13'])
+
+    assert '173.245.48.0' in table
+    assert '173.245.63.255' in table
+    assert '173.245.64.0' not in table
+    assert '173.245.47.255' not in table
+    assert '104.23.255.255' in table
+    assert '8.8.8.8' not in table
+
+
+def test_ipv6_boundaries():
+    table = IPRangeTable(['2606:4700::/32', '2a06:98c0::/29'])
+
+    assert '2606:4700::' in table
+    assert '2606:4700:ffff:ffff:ffff:ffff:ffff:ffff' in table
+    assert '2606:4701::' not in table
+    assert '2a06:98c7:1::1' in table
+    assert '2a06:98c8::' not in table
+    assert '::1' not in table
+
+
+def test_ipv4_mapped_addresses_use_the_ipv4_table():
+    table = IPRangeTable(['173.245.48.0/20', '2606:4700::/32'])
+
+    assert '::ffff:173.245.48.1' in table
+    assert '::ffff:adf5:3001' in table  # 173.245.48.1 in hex form
+    assert '::ffff:8.8.8.8' not in table
+
+
+def test_overlapping_and_adjacent_ranges_are_merged():
+    table = IPRangeTable(['10.0.0.0/24', '10.0.1.0/24', '10.0.0.128/25', '192.168.1.7/16'])
+
+    assert table._tables[4] == ([int(ip_address('10.0.0.0')), int(ip_address('192.168.0.0'))],
+                                [int(ip_address('10.0.1.255')), int(ip_address('192.168.255.255'))])
+    assert '10.0.1.200' in table and '192.168.200.1' in table
+    assert table.size == 4
+
+
+def test_invalid_addresses_are_not_contained():
+    table = IPRangeTable(CLOUDFLARE_IP_RANGES)
+
+    for address in ('', 'not-an-ip', '173.245.48', '2606:4700::g', None):
+        assert address not in table
+
+
+def test_matches_ipaddress_on_random_addresses():
+    table = IPRangeTable(CLOUDFLARE_IP_RANGES)
+    rng = random.Random(16)
+    addresses = []
+    for cidr in CLOUDFLARE_IP_RANGES:
+        network = ip_network(cidr)
+        # Edges of each range and a few random neighbours
+        for value in (int(network.network_address) - 1, int(network.network_address),
+                      int(network.broadcast_address), int(network.broadcast_address) + 1):
+            addresses.append(str(ip_address(value)))
+        for _ in range(20):
+            addresses.append(str(ip_address(int(network.network_address) + rng.randrange(2 * network.num_addresses))))
+    addresses += [str(ip_address(rng.getrandbits(32))) for _ in range(500)]
+    addresses += [f'::ffff:{ip_address(rng.getrandbits(32))}' for _ in range(200)]
+
+    for address in addresses:
+        assert (address in table) == reference_contains(CLOUDFLARE_IP_RANGES, address), address
+
+
+@pytest.fixture
+def cloudflare_app(monkeypatch, tmp_path):
+    ips_file = tmp_path / 'cloudflare_ips.txt'
+    ips_file.write_text('# Cloudflare\n203.0.113.0/24\n', encoding='utf-8')
+    monkeypatch.setenv('CLOUDFLARE_ONLY', 'true')
+    monkeypatch.setenv('CLOUDFLARE_IPS_FILE', str(ips_file))
+    monkeypatch.setenv('CLOUDFLARE_IPS_RELOAD_INTERVAL', '0')
+
+    app = Flask(__name__)
+    app.route('/')(lambda: 'ok')
+    app.cf_security = CloudflareSecurityMiddleware(app)
+    app.ips_file = ips_file
+    return app
+
+
+def test_cloudflare_only_rejects_other_addresses(cloudflare_app):
+    client = cloudflare_app.test_client()
+
+    assert client.get('/', environ_base={'REMOTE_ADDR': '203.0.113.9'}).status_code == 200
+    assert client.get('/', environ_base={'REMOTE_ADDR': '198.51.100.1'}).status_code == 403
+    assert not cloudflare_app.cf_security.allows_environ({'REMOTE_ADDR': '198.51.100.1'})
+
+
+def test_ranges_file_is_reloaded_when_it_changes(cloudflare_app):
+    security, ips_file = cloudflare_app.cf_security, cloudflare_app.ips_file
+    assert not security.is_cloudflare_ip('198.51.100.1')
+
+    ips_file.write_text('198.51.100.0/24\n', encoding='utf-8')
+    stat = os.stat(ips_file)
+    os.utime(ips_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert security.is_cloudflare_ip('198.51.100.1')
+
+    # A broken file keeps the last good table
+    ips_file.write_text('not a range\n', encoding='utf-8')
+    os.utime(ips_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+    assert security.is_cloudflare_ip('198.51.100.1')
@@ -0,0 +1,108 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask, request
+
+from python.static_assets import StaticAssetEngine, parse_accept_encoding, version_param
+
+SCRIPT = b'export const answer = 42;\n' * 40
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'components').mkdir()
+    (tmp_path / 'components' / 'app.js').write_bytes(SCRIPT)
+    (tmp_path / 'components' / 'vendor.3f9a1c0d.js').write_bytes(b'export default 1;\n')
+    (tmp_path / 'sw.js').write_bytes(b'self.addEventListener("fetch", () => {});\n')
+    (tmp_path / 'secret.txt').write_bytes(b'not served')
+    return tmp_path
+
+
+def make_engine(root, **kwargs):
+    engine = StaticAssetEngine(str(root), ('components',), root_files={'sw.js'},
+                               cache_overrides={'sw.js': 'no-cache, must-revalidate'}, **kwargs)
+    engine.scan()
+    return engine
+
+
+def test_only_configured_files_are_served(root):
+    engine = make_engine(root)
+
+    assert set(engine.assets) == {'components/app.js', 'components/vendor.3f9a1c0d.js', 'sw.js'}
+    assert engine.get('secret.txt') is None
+    assert engine.get('components/../secret.txt') is None
+
+
+def test_unversioned_urls_are_revalidated(root):
+    asset = make_engine(root).get('components/app.js')
+
+    assert asset.cache_control_for(None) == 'no-cache'
+    assert asset.cache_control_for('0123abcd') == 'no-cache'
+    # Too short to count as a version, even if it is a prefix of the hash
+    assert asset.cache_control_for(asset.hash[:4]) == 'no-cache'
+
+
+def test_matching_version_is_cached_as_immutable(root):
+    asset = make_engine(root, max_age=600).get('components/app.js')
+
+    assert asset.cache_control_for(asset.hash[:8]) == 'public, max-age=600, immutable'
+    assert asset.cache_control_for(asset.hash) == 'public, max-age=600, immutable'
+
+
+def test_fingerprinted_names_and_overrides(root):
+    engine = make_engine(root)
+
+    assert engine.get('components/vendor.3f9a1c0d.js').cache_control_for(None).endswith('immutable')
+    sw = engine.get('sw.js')
+    assert sw.cache_control_for(None) == 'no-cache, must-revalidate'
+    assert sw.cache_control_for(sw.hash) == 'no-cache, must-revalidate'
+
+
+def test_mtime_mode_never_marks_files_immutable(root):
+    engine = make_engine(root, mode='mtime')
+    asset = engine.get('components/app.js')
+
+    assert asset.cache_control_for(asset.hash) == 'no-cache'
+    path = root / 'components' / 'app.js'
+    path.write_bytes(b'export const answer = 43;\n')
+    os.utime(path, ns=(asset.mtime_ns, asset.mtime_ns + 1_000_000_000))
+    assert engine.get('components/app.js').hash != asset.hash
+
+
+def test_compressed_variants_have_their_own_etag(root):
+    asset = make_engine(root).get('components/app.js')
+
+    encoding, body, etag = asset.select('gzip, deflate')
+    assert encoding == 'gzip'
+    assert gzip.decompress(body) == SCRIPT
+    assert etag == f'"{asset.hash}-gz"'
+    assert asset.select('gzip;q=0, identity')[0] is None
+    assert asset.matches(etag) and asset.matches(f'"{asset.hash}"') and asset.matches('*')
+    assert not asset.matches('"0000"')
+
+
+def test_parse_accept_encoding_and_version_param():
+    assert parse_accept_encoding('gzip, br') == ('br', 'gzip')
+    assert parse_accept_encoding('*') == ('gzip',)
+    assert parse_accept_encoding('br;q=0, gzip;q=0.5') == ('gzip',)
+    assert version_param('a=1&v=0123abcd') == '0123abcd'
+    assert version_param('view=1') is None
+
+
+def test_make_response_honours_if_none_match_and_version(root):
+    engine = make_engine(root)
+    asset = engine.get('components/app.js')
+    app = Flask(__name__)
+
+    with app.test_request_context('/components/app.js', headers={'Accept-Encoding': 'gzip'}):
+        response = engine.make_response('components/app.js', request)
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    with app.test_request_context(f'/components/app.js?v={asset.hash[:8]}',
+                                  headers={'If-None-Match': response.headers['ETag']}):
+        response = engine.make_response('components/app.js', request)
+    assert response.status_code == 304
+    assert response.headers['Cache-Control'].endswith('immutable')
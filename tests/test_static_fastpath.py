@@ -0,0 +1,100 @@
+import pytest
+from flask import Flask
+from werkzeug.test import Client
+
+from python.static_assets import StaticAssetEngine, StaticFastPathMiddleware
+
+SCRIPT = b'export const answer = 42;\n' * 40
+
+
+@pytest.fixture
+def engine(tmp_path):
+    (tmp_path / 'components').mkdir()
+    (tmp_path / 'components' / 'app.js').write_bytes(SCRIPT)
+    engine = StaticAssetEngine(str(tmp_path), ('components',))
+    engine.scan()
+    return engine
+
+
+def make_client(engine, **kwargs):
+    """Fast path in front of a Flask app that records the requests reaching it"""
+    flask_app = Flask(__name__)
+    flask_app.reached = []
+
+    @flask_app.route('/<path:path>', methods=['GET', 'HEAD', 'POST'])
+    def fallback(path):
+        flask_app.reached.append(path)
+        return 'flask'
+
+    middleware = StaticFastPathMiddleware(flask_app.wsgi_app, engine, **kwargs)
+    return Client(middleware), middleware, flask_app
+
+
+def test_known_files_are_answered_before_flask(engine):
+    client, middleware, flask_app = make_client(engine, extra_headers=[('X-Frame-Options', 'DENY')])
+
+    response = client.get('/components/app.js')
+    assert response.status_code == 200
+    assert response.get_data() == SCRIPT
+    assert response.headers['Content-Type'] == 'application/javascript; charset=utf-8'
+    assert response.headers['Content-Length'] == str(len(SCRIPT))
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.headers['X-Frame-Options'] == 'DENY'
+    assert (middleware.hits, flask_app.reached) == (1, [])
+
+
+def test_head_has_headers_but_no_body(engine):
+    client, _, _ = make_client(engine)
+
+    response = client.head('/components/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert int(response.headers['Content-Length']) < len(SCRIPT)
+    assert response.get_data() == b''
+
+
+def test_matching_etag_gets_304(engine):
+    client, _, _ = make_client(engine)
+    etag = client.get('/components/app.js').headers['ETag']
+    asset = engine.get('components/app.js')
+
+    response = client.get(f'/components/app.js?v={asset.hash[:8]}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['Cache-Control'].endswith('immutable')
+
+
+def test_other_requests_reach_flask(engine):
+    client, middleware, flask_app = make_client(engine, allow=lambda environ: 'HTTP_X_BLOCKED' not in environ)
+
+    client.post('/components/app.js')
+    client.get('/components/app.js', headers={'Range': 'bytes=0-9'})
+    client.get('/components/missing.js')
+    client.get('/components/app.js', headers={'X-Blocked': '1'})
+
+    assert middleware.hits == 0
+    assert flask_app.reached == ['components/app.js'] * 2 + ['components/missing.js', 'components/app.js']
+
+
+def test_cors_origin_is_echoed_only_when_allowed(engine):
+    client, _, _ = make_client(engine, cors_origins=['https://cur8.fun'])
+
+    allowed = client.get('/components/app.js', headers={'Origin': 'https://cur8.fun'})
+    assert allowed.headers['Access-Control-Allow-Origin'] == 'https://cur8.fun'
+    assert allowed.headers['Vary'] == 'Accept-Encoding, Origin'
+    other = client.get('/components/app.js', headers={'Origin': 'https://evil.example'})
+    assert 'Access-Control-Allow-Origin' not in other.headers
+
+    client, _, _ = make_client(engine, cors_origins=['*'])
+    assert client.get('/components/app.js').headers['Access-Control-Allow-Origin'] == '*'
+
+
+def test_web_app_static_files_keep_the_security_headers(client, web_app):
+    static = client.get('/components/Component.js')
+    dynamic = client.get('/healthz')
+
+    assert static.status_code == 200
+    assert web_app.app.wsgi_app.hits >= 1
+    for name in ('Strict-Transport-Security', 'Content-Security-Policy', 'X-Content-Type-Options'):
+        assert name in static.headers
+        assert static.headers[name] == dynamic.headers[name]
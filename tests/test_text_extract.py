@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from benchmarks.text_extract_bench import corpus, legacy_create_description, legacy_extract_image
+from python.text_extract import extract_preview
+
+# Bodies without plain links: image and description must match the legacy regexes
+SAME_AS_LEGACY = [
+    '# Title\n\nSome **bold** and `code` text.',
+    'Plain text\n\n\nwith   spaces\tand\nnewlines',
+    '<p>Hello <b>world</b></p><br/>bye',
+    '## Header\n### Sub\ntext ' + 'word ' * 60,
+    'intro ![a](https://x.com/a.png) and <img src="https://y.com/b.jpg">',
+    '<img src="https://y.com/b.jpg"> then ![a](https://x.com/a.png)',
+    '<IMG class="big" SRC=\'https://y.com/b.jpg\'> text',
+    'see https://example.com/photo.JPG?size=2 and https://steemitimages.com/0x0/abc',
+    'only host https://steemitimages.com/0x0/abc here',
+    'no image at all http://example.com/page',
+    'word ' * 100 + '![late](https://x.com/late.png)',
+    'word ' * 100 + '<img src="https://y.com/late.jpg">',
+    '[![thumb](https://x.com/t.png)](https://youtube.com/watch?v=1) after',
+    '<a href="https://x.com/pic.jpg">link</a> text',
+    'a#b # c ##d',
+    'x',
+    '*' * 50,
+]
+
+
+@pytest.mark.parametrize('body', SAME_AS_LEGACY, ids=range(len(SAME_AS_LEGACY)))
+def test_matches_the_legacy_regexes(body):
+    preview = extract_preview(body, 160)
+
+    assert preview.image == legacy_extract_image(body)
+    assert preview.description == legacy_create_description(body, 160)
+
+
+# Real posts only: the pathological bodies that follow take seconds with the legacy regexes
+REAL_POSTS = corpus()[:4]
+
+
+@pytest.mark.parametrize('name, body', REAL_POSTS, ids=[name for name, _ in REAL_POSTS])
+def test_benchmark_posts_find_the_legacy_image(name, body):
+    assert extract_preview(body).image == legacy_extract_image(body)
+
+
+def test_links_keep_their_visible_text():
+    body = 'Read [the announcement](https://cur8.fun/@cur8/news) today'
+
+    # The legacy regexes dropped the whole link
+    assert legacy_create_description(body) == 'Read today'
+    assert extract_preview(body).description == 'Read the announcement today'
+
+
+def test_long_text_is_cut_at_max_length():
+    body = '# Title\n\n' + 'Lorem ipsum dolor sit amet. ' * 20
+
+    preview = extract_preview(body, 50)
+    assert preview.description == legacy_create_description(body, 50)
+    assert preview.description.endswith('...') and len(preview.description) == 53
+    assert extract_preview('short', 5).description == 'short'
+
+
+def test_image_search_can_be_skipped():
+    assert extract_preview('![a](https://x.com/a.png) text', find_image=False) == (None, 'text')
+    assert extract_preview('') == (None, '')
+    assert extract_preview(None) == (None, '')
+
+
+@pytest.mark.parametrize('body', ['<a ' * 30000, '![' * 50000, '[' * 100000, '*x ' * 30000,
+                                  '[![' * 30000, '<img src="' * 10000], ids=range(6))
+def test_pathological_bodies_stay_linear(body):
+    start = time.perf_counter()
+    extract_preview(body)
+    assert time.perf_counter() - start < 1